@@ -0,0 +1,69 @@
+import sys
+import argparse
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from .core import run_cases
+from .core import load_history
+from .core import append_history
+from .core import compare
+from .cases import CASES
+
+parser = argparse.ArgumentParser(
+    prog='python -m bench', description='dsp performance benchmarks')
+parser.add_argument('--history', type=str, default='out/bench_history.json',
+                    help='JSON file with the benchmark history')
+commands = parser.add_subparsers(dest='command', required=True)
+
+run_parser = commands.add_parser('run', help='run benchmarks, append results')
+run_parser.add_argument('-k', '--select', type=str, default=None,
+                        help='run only cases which id contains the string')
+run_parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='timings per case, the median is reported')
+run_parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimal duration of one timing, seconds')
+run_parser.add_argument('-l', '--label', type=str, default='',
+                        help='label of the history entry')
+
+compare_parser = commands.add_parser(
+    'compare', help='compare two history entries, flag regressions')
+compare_parser.add_argument('base', type=int, nargs='?', default=-2,
+                            help='history index of the reference, -2 by default')
+compare_parser.add_argument('new', type=int, nargs='?', default=-1,
+                            help='history index to check, -1 by default')
+compare_parser.add_argument('-t', '--threshold', type=float, default=0.1,
+                            help='relative latency increase to flag')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        with SimContext(params=SimParams(fc=4000, fs=48000)):
+            results = run_cases(CASES, select=args.select, repeat=args.repeat,
+                                min_time=args.min_time)
+        entry = append_history(args.history, results, label=args.label)
+        print(f'{len(results)} results appended to {args.history} '
+              f'({entry["revision"]})')
+
+    elif args.command == 'compare':
+        history = load_history(args.history)
+        if len(history) < 2:
+            print(f'{args.history}: at least two runs are needed to compare')
+            sys.exit(2)
+
+        base, new = history[args.base], history[args.new]
+        print(f'base: {base["time"]} {base["revision"]} {base["label"]}\n'
+              f'new:  {new["time"]} {new["revision"]} {new["label"]}')
+
+        rows = compare(base, new, args.threshold)
+        for cid, base_latency, new_latency, ratio, regression in rows:
+            print(f'{cid:60s} {base_latency * 1e3:10.4f} ms '
+                  f'{new_latency * 1e3:10.4f} ms {ratio:7.3f}x'
+                  f'{"  REGRESSION" if regression else ""}')
+
+        regressions = sum(row[-1] for row in rows)
+        print(f'{len(rows)} cases compared, {regressions} regressions '
+              f'beyond {args.threshold:.0%}')
+        sys.exit(1 if regressions else 0)
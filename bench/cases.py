@@ -0,0 +1,238 @@
+import numpy as np
+
+from scipy.signal import lfilter
+
+from channel.path_loss import PathLossChannel
+
+from dsp.common.qam import QAMConstellation
+from dsp.common.resampling.fft import FftUpsampler
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+
+from dsp.tx.qam import QAMModulator
+from dsp.rx.qam import QAMSoftDemodulator
+from dsp.tx.ofdm import OFDM, OFDMconfig
+from dsp.tx.duc import DUC, DUCConfig
+from dsp.common.pilots import data_per_frame
+
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.estimator import OFDMChannleEstimatorConfig
+from dsp.rx.ofdm.chain import OFDMRxChain
+from dsp.rx.correlator import PreambleCorrelator
+from dsp.rx.ddc import DDC, DDCConfig
+from dsp.rx.ddc import B_BP, B_LO
+
+from .core import Case
+
+# Every setup runs under an active SimContext and returns the callable to
+# time together with the number of input samples it processes.
+
+rng = np.random.default_rng(0)
+
+
+def random_symbols(n):
+    return np.exp(2j * np.pi * rng.random(n))
+
+
+def ofdm_config(Nsc):
+    return OFDMconfig(
+        Nsc=Nsc,
+        guard_interval_length=Nsc // 4,
+        guard_interval_type='cyclic_prefix',
+    )
+
+
+def qam_modulator(order, nsymb):
+    constellation = QAMConstellation(order=order)
+    modulator = QAMModulator(constellation=constellation)
+    bits = rng.integers(0, 2, nsymb * constellation.pow)
+    return lambda: modulator.process(bits), len(bits)
+
+
+def qam_demodulator(order, nsymb):
+    constellation = QAMConstellation(order=order)
+    modulator = QAMModulator(constellation=constellation)
+    demodulator = QAMSoftDemodulator(constellation=constellation)
+    symbols = modulator.process(rng.integers(0, 2, nsymb * constellation.pow))
+    symbols = symbols + 0.05 * random_symbols(nsymb)
+    return lambda: demodulator.process(symbols), nsymb
+
+
+def qam_llr(order, nsymb):
+    constellation = QAMConstellation(order=order)
+    modulator = QAMModulator(constellation=constellation)
+    demodulator = QAMSoftDemodulator(constellation=constellation, soft=True)
+    symbols = modulator.process(rng.integers(0, 2, nsymb * constellation.pow))
+    symbols = symbols + 0.05 * random_symbols(nsymb)
+    return lambda: demodulator.process(symbols, noise_var=0.005), nsymb
+
+
+def qam_bytes(order, nbytes):
+    constellation = QAMConstellation(order=order)
+    modulator = QAMModulator(constellation=constellation)
+    demodulator = QAMSoftDemodulator(constellation=constellation)
+    payload = rng.integers(0, 256, nbytes, dtype=np.uint8).tobytes()
+
+    def run():
+        return demodulator.process_bytes(modulator.process_bytes(payload))
+    return run, nbytes
+
+
+def ofdm_modulator(Nsc, nsymb):
+    modulator = OFDM(config=ofdm_config(Nsc))
+    symbols = random_symbols(Nsc * nsymb)
+    return lambda: modulator.process(symbols), len(symbols)
+
+
+def ofdm_rx_chain(Nsc, nsymb):
+    config = ofdm_config(Nsc)
+    chain = OFDMRxChain(
+        frontend=OFDMfrontend(config=config),
+        estimator=OFDMChannleEstimator(),
+        equalizer=OFDMChannleEqualizer(),
+    )
+    signal = OFDM(config=config).process(random_symbols(Nsc * nsymb))
+    return lambda: chain.process(signal), len(signal)
+
+
+def ofdm_estimator(mode, Nsc, nsymb):
+    config = OFDMconfig(Nsc=Nsc, guard_interval_length=Nsc // 4,
+                        guard_interval_type='cyclic_prefix',
+                        pilot_pattern='scattered', pilot_spacing=8,
+                        pilot_period=4)
+    frontend = OFDMfrontend(config=config)
+    estimator = OFDMChannleEstimator(
+        ofdm_config=config, config=OFDMChannleEstimatorConfig(mode=mode))
+    data = random_symbols(data_per_frame(config) * nsymb // 4)
+    symbols = frontend.process(OFDM(config=config).process(data))
+    estimator.process(symbols)  # the matrices are cached once
+    return lambda: estimator.process(symbols), symbols.size
+
+
+def audio_ofdm_tx(baseband, nsymb):
+    # the real 48 kHz signal of 1 kHz wide 64 subcarriers around 4 kHz
+    scale = 48 if baseband == 'real' else 1
+    config = OFDMconfig(Nsc=64, guard_interval_length=28 * scale,
+                        guard_interval_type='cyclic_prefix',
+                        baseband=baseband, fft_size=64 * scale,
+                        subcarrier_offset=224)
+    modulator = OFDM(config=config)
+    duc = DUC(config=DUCConfig(fc=4e3, rate=48000, interpolation=48))
+    symbols = random_symbols(64 * nsymb)
+
+    def run():
+        if baseband == 'real':
+            return modulator.process(symbols)
+        return duc.process(modulator.process(symbols))
+    return run, symbols.size
+
+
+def ddc(method, length):
+    # the 48 kHz audio around 4 kHz to the 1 kHz complex baseband, the
+    # full rate lfilter chain against the polyphase DDC
+    signal = rng.standard_normal(length)
+    unit = DDC(config=DDCConfig(fc=4e3, rate=48000, decimation=48,
+                                bandpass=B_BP, lowpass=B_LO))
+    time = np.arange(length) / 48e3
+    carrier = np.exp(-2j * np.pi * 4e3 * time)
+
+    def run():
+        if method == 'polyphase':
+            return unit.process(signal)
+        filtered = lfilter(B_BP, 1, signal)
+        return lfilter(B_LO, 1, 2 * filtered * carrier)[::48]
+    return run, length
+
+
+def ofdm_batch(batched, frames, Nsc):
+    # many short independent transmissions of 4 OFDM symbols
+    config = ofdm_config(Nsc)
+    modulator = OFDM(config=config)
+    chain = OFDMRxChain(frontend=OFDMfrontend(config=config),
+                        estimator=OFDMChannleEstimator(),
+                        equalizer=OFDMChannleEqualizer())
+    symbols = random_symbols(frames * 4 * Nsc).reshape(frames, 4, Nsc)
+
+    def run():
+        if batched:
+            return chain.process_batch(modulator.process_batch(symbols))
+        return [chain.process(modulator.process(frame.reshape(-1)))
+                for frame in symbols]
+    return run, symbols.size
+
+
+def preamble_correlator(reference, length):
+    correlator = PreambleCorrelator(reference=random_symbols(reference))
+    signal = random_symbols(length)
+    return lambda: correlator.process(signal), length
+
+
+def fft_upsampler(input, scale, length):
+    upsampler = FftUpsampler(scale=scale)
+    signal = random_symbols(length)
+    if input == 'real':
+        signal = np.real(signal)
+    return lambda: upsampler.process(signal), length
+
+
+def poly_resampler(ratio, length):
+    fout, fin = map(int, ratio.split('/'))
+    resampler = PolyResampler(PolyResamplerConfig(fin=fin, fout=fout))
+    signal = rng.standard_normal(length)
+    return lambda: resampler.process(signal), length
+
+
+def poly_resampler_stream(ratio, block):
+    # a second of live audio in blocks
+    fout, fin = map(int, ratio.split('/'))
+    resampler = PolyResampler(PolyResamplerConfig(fin=fin, fout=fout))
+    signal = rng.standard_normal(fin)
+
+    def run():
+        for start in range(0, len(signal), block):
+            resampler.process_block(signal[start:start + block])
+        return resampler.flush()
+    return run, len(signal)
+
+
+def channel(length):
+    unit = PathLossChannel(R=10)
+    signal = random_symbols(length)
+    return lambda: unit.process(signal), length
+
+
+CASES = [
+    Case('qam_modulator', qam_modulator,
+         {'order': (4, 16, 64), 'nsymb': (1000, 100000)}),
+    Case('qam_demodulator', qam_demodulator,
+         {'order': (4, 16, 64, 1024), 'nsymb': (1000, 100000)}),
+    Case('qam_llr', qam_llr,
+         {'order': (4, 16, 64), 'nsymb': (1000, 100000)}),
+    Case('qam_bytes', qam_bytes,
+         {'order': (4, 16, 64, 512, 2048), 'nbytes': (1000, 100000)}),
+    Case('ofdm_modulator', ofdm_modulator,
+         {'Nsc': (64, 256, 1024), 'nsymb': (1, 100)}),
+    Case('ofdm_rx_chain', ofdm_rx_chain,
+         {'Nsc': (64, 256, 1024), 'nsymb': (1, 100)}),
+    Case('ofdm_estimator', ofdm_estimator,
+         {'mode': ('ls', 'lmmse'), 'Nsc': (64, 256), 'nsymb': (4, 100)}),
+    Case('audio_ofdm_tx', audio_ofdm_tx,
+         {'baseband': ('complex', 'real'), 'nsymb': (10, 100)}),
+    Case('ddc', ddc,
+         {'method': ('lfilter', 'polyphase'), 'length': (48000, 480000)}),
+    Case('ofdm_batch', ofdm_batch,
+         {'batched': (False, True), 'frames': (1000, ), 'Nsc': (64, 256)}),
+    Case('preamble_correlator', preamble_correlator,
+         {'reference': (128, 1200), 'length': (100000, 1000000)}),
+    Case('fft_upsampler', fft_upsampler,
+         {'input': ('complex', 'real'), 'scale': (4, 48),
+          'length': (1000, 10000, 10007)}),
+    Case('poly_resampler', poly_resampler,
+         {'ratio': ('1000/48000', '48000/1000', '48000/44100'),
+          'length': (10000, 100000)}),
+    Case('poly_resampler_stream', poly_resampler_stream,
+         {'ratio': ('1000/48000', '48000/44100'), 'block': (480, 4800)}),
+    Case('channel', channel, {'length': (10000, 1000000)}),
+]
@@ -0,0 +1,120 @@
+import json
+import time
+import platform
+import itertools
+import subprocess
+
+import numpy as np
+import scipy
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    setup: callable  # setup(**params) -> (run, samples)
+    grid: dict  # parameter name -> values
+
+    def points(self):
+        keys = list(self.grid.keys())
+        for values in itertools.product(*(self.grid[key] for key in keys)):
+            yield dict(zip(keys, values))
+
+
+def case_id(name: str, params: dict) -> str:
+    return name + '[' + ','.join(f'{k}={v}' for k, v in params.items()) + ']'
+
+
+def measure(run, repeat: int, min_time: float) -> list[float]:
+    run()  # warm up caches and lazy initialisation
+
+    # calls per timing so that one timing takes at least min_time
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def run_cases(cases: list[Case], select: str = None,
+              repeat: int = 5, min_time: float = 0.05, log=print) -> dict:
+    results = {}
+    for case in cases:
+        for params in case.points():
+            cid = case_id(case.name, params)
+            if select and select not in cid:
+                continue
+
+            run, samples = case.setup(**params)
+            timings = measure(run, repeat, min_time)
+            latency = float(np.median(timings))
+            results[cid] = {
+                'samples': samples,
+                'latency': latency,
+                'latency_min': float(np.min(timings)),
+                'throughput': samples / latency,
+            }
+            log(f'{cid:60s} {latency * 1e3:10.4f} ms '
+                f'{samples / latency / 1e6:10.3f} Msamples/s')
+    return results
+
+
+def revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def load_history(filename: str) -> list[dict]:
+    try:
+        with open(filename, 'r') as fd:
+            return json.load(fd)
+    except FileNotFoundError:
+        return []
+
+
+def append_history(filename: str, results: dict, label: str = '') -> dict:
+    entry = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision(),
+        'label': label,
+        'machine': platform.node(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'results': results,
+    }
+    history = load_history(filename)
+    history.append(entry)
+    with open(filename, 'w') as fd:
+        json.dump(history, fd, indent=1)
+    return entry
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[tuple]:
+    # (case id, base latency, new latency, ratio, regression) for common cases
+    rows = []
+    for cid, result in new['results'].items():
+        reference = base['results'].get(cid, None)
+        if reference is None:
+            continue
+        ratio = result['latency'] / reference['latency']
+        rows.append((cid, reference['latency'], result['latency'], ratio,
+                     ratio > 1 + threshold))
+    return rows
@@ -1,3 +1,5 @@
+import numpy as np
+
 from abc import ABC
 from abc import abstractmethod
 from numpy import array
@@ -9,6 +11,7 @@ from simulation.unit import SimUnit
 class ChannelBase(ABC, SimUnit):
     def __init__(self) -> None:
         super().__init__()
+        self.reset()
 
     def process(self, signal):
         pass_loss = self._pass_loss()
@@ -16,6 +19,22 @@ class ChannelBase(ABC, SimUnit):
 
         return pass_loss * lfilter(channel_ir, array([1]), signal, axis=0)
 
+    def process_block(self, signal):
+        pass_loss = self._pass_loss()
+        channel_ir = self._impulse_responce()
+
+        if self.__zi is None:
+            self.__zi = np.zeros(
+                (len(channel_ir) - 1, *np.shape(signal)[1:]),
+                dtype=np.result_type(channel_ir, signal))
+
+        output, self.__zi = lfilter(channel_ir, array([1]), signal,
+                                    axis=0, zi=self.__zi)
+        return pass_loss * output
+
+    def reset(self):
+        self.__zi = None
+
     @abstractmethod
     def _pass_loss(self):
         pass
@@ -0,0 +1,54 @@
+import functools
+import numpy as np
+
+from fractions import Fraction
+
+MAX_TABLE = 1 << 16  # phasors of a lookup table period
+
+
+@functools.lru_cache(maxsize=None)
+def phasor_table(numerator: int, denominator: int) -> np.array:
+    # a period of exp(2j pi n numerator / denominator)
+    n = np.arange(denominator)
+    table = np.exp(2j * np.pi * (n * numerator % denominator) / denominator)
+    table.flags.writeable = False
+    return table
+
+
+class Nco:
+    # Numerically controlled oscillator exp(2j pi frequency / rate * n),
+    # phase continuous over the calls. A rational frequency with a period of
+    # up to MAX_TABLE samples reads a lookup table, other frequencies keep
+    # a phase accumulator in cycles.
+
+    def __init__(self, frequency: float, rate: float) -> None:
+        self.step = Fraction(frequency) / Fraction(rate)  # cycles per sample
+        numerator, denominator = self.step.numerator, self.step.denominator
+        if denominator <= MAX_TABLE:
+            self.__table = phasor_table(numerator % denominator, denominator)
+        else:
+            self.__table = None
+        self.reset()
+
+    def phasors(self, start: int, n: int) -> np.array:
+        # phasors of the samples [start, start + n)
+        if self.__table is not None:
+            # whole periods are tiled, cheaper than a gather
+            period = len(self.__table)
+            first = start % period
+            return np.tile(self.__table, -(-(first + n) // period))[
+                first:first + n]
+
+        phase = float(start * self.step % 1)
+        return np.exp(2j * np.pi * (phase + float(self.step) * np.arange(n)))
+
+    def process(self, n: int) -> np.array:
+        # the next n phasors of the stream
+        output = self.phasors(self.__next, n)
+        self.__next += n
+        if self.__table is not None:
+            self.__next %= len(self.__table)
+        return output
+
+    def reset(self):
+        self.__next = 0  # sample index of the next phasor
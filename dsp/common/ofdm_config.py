@@ -1,8 +1,46 @@
 from dataclasses import dataclass
 
+BASEBANDS = ('complex', 'real')
+
 
 @dataclass(frozen=True)
 class OFDMconfig:
     Nsc: int  # subcarriers number
     guard_interval_length: int
     guard_interval_type: str
+    pilot_pattern: str = 'none'  # none | comb | block | scattered
+    pilot_spacing: int = 4  # subcarriers between comb/scattered pilots
+    pilot_period: int = 4  # OFDM symbols in a block/scattered pilot frame
+    # A real baseband signal has a Hermitian symmetric spectrum: the
+    # subcarriers take the rfft bins [subcarrier_offset, + Nsc) of an
+    # fft_size long symbol, DC, Nyquist and the bins around are null
+    baseband: str = 'complex'  # complex | real
+    fft_size: int = None  # real baseband, 2 * (offset + Nsc) by default
+    subcarrier_offset: int = 1  # real baseband, the first subcarrier bin
+
+    def __post_init__(self):
+        assert self.baseband in BASEBANDS
+        if self.baseband == 'real':
+            assert self.subcarrier_offset >= 1
+            assert self.subcarrier_offset + self.Nsc <= self.fft_len // 2
+
+    @property
+    def real(self) -> bool:
+        return self.baseband == 'real'
+
+    @property
+    def fft_len(self) -> int:
+        # samples of the FFT window of an OFDM symbol
+        if not self.real:
+            return self.Nsc
+        return self.fft_size or 2 * (self.subcarrier_offset + self.Nsc)
+
+    @property
+    def symbol_len(self) -> int:
+        return self.fft_len + self.guard_interval_length
+
+    @property
+    def bins(self) -> slice:
+        # FFT bins of the subcarriers
+        offset = self.subcarrier_offset if self.real else 0
+        return slice(offset, offset + self.Nsc)
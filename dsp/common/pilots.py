@@ -0,0 +1,55 @@
+import functools
+import numpy as np
+
+from .ofdm_config import OFDMconfig
+
+PATTERNS = ('none', 'comb', 'block', 'scattered')
+
+
+@functools.lru_cache(maxsize=None)
+def pilot_mask(config: OFDMconfig) -> np.array:
+    # (frame symbols, Nsc) cells carrying pilots, a frame is the period of
+    # the pattern in OFDM symbols
+    assert config.pilot_pattern in PATTERNS
+    Nsc, spacing, period = \
+        config.Nsc, config.pilot_spacing, config.pilot_period
+    k = np.arange(Nsc)
+
+    if config.pilot_pattern == 'none':
+        mask = np.zeros((1, Nsc), dtype=bool)
+
+    elif config.pilot_pattern == 'comb':
+        mask = ((k % spacing == 0) | (k == Nsc - 1))[None, :]
+
+    elif config.pilot_pattern == 'block':
+        mask = np.zeros((period, Nsc), dtype=bool)
+        mask[0, :] = True
+
+    else:  # scattered, the comb shifts every symbol
+        assert spacing % period == 0
+        shift = spacing // period
+        n = np.arange(period)[:, None]
+        mask = k[None, :] % spacing == n * shift % spacing
+        mask[:, Nsc - 1] = True  # no extrapolation at the upper edge
+
+    mask.flags.writeable = False
+    return mask
+
+
+@functools.lru_cache(maxsize=None)
+def pilot_symbols(config: OFDMconfig) -> np.array:
+    # BPSK values of the pilot cells of a frame in row major order
+    rng = np.random.default_rng(0)
+    count = np.count_nonzero(pilot_mask(config))
+    symbols = (1 - 2 * rng.integers(0, 2, count)).astype(np.complex128)
+
+    symbols.flags.writeable = False
+    return symbols
+
+
+def frame_symbols(config: OFDMconfig) -> int:
+    return pilot_mask(config).shape[0]
+
+
+def data_per_frame(config: OFDMconfig) -> int:
+    return int(np.count_nonzero(~pilot_mask(config)))
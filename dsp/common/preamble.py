@@ -0,0 +1,23 @@
+import functools
+import numpy as np
+
+from .ofdm_config import OFDMconfig
+
+
+@functools.lru_cache(maxsize=None)
+def training_symbol(config: OFDMconfig) -> np.array:
+    # Schmidl-Cox training symbol: BPSK on the even subcarriers only, so the
+    # two halves of the symbol are the same. The power matches data symbols.
+    rng = np.random.default_rng(1)
+    fft_len = config.fft_len
+    bins = np.arange(fft_len)[config.bins]
+    even = bins[bins % 2 == 0]
+    spectrum = np.zeros(fft_len, dtype=np.complex128)
+    spectrum[even] = np.sqrt(2) * (1 - 2 * rng.integers(0, 2, len(even)))
+
+    if config.real:
+        symbol = np.fft.irfft(spectrum[:fft_len // 2 + 1], n=fft_len)
+    else:
+        symbol = np.fft.ifft(spectrum)
+    symbol.flags.writeable = False
+    return symbol
@@ -1,35 +1,143 @@
+import functools
 import numpy as np
 
 
+def _gray(n):
+    return n ^ (n >> 1)
+
+
+def _readonly(*arrays):
+    for array in arrays:
+        array.flags.writeable = False
+    return arrays
+
+
+def _cross_grid(pow: int, mapping: str):
+    # Quasi Gray cross constellation: a 2W x W rectangle with folded outer
+    # columns, e.g. 32-QAM is 6x6 and 128-QAM is 12x12 without the corners
+    height = 2 ** (pow // 2)
+    width = 2 * height
+    fold = width // 8  # columns folded from every side
+    side = width - 2 * fold
+
+    _, rect_values = _rect_grid(width * height, pow, mapping)
+    values = np.full((side, side), -1)
+    values[fold:fold + height, :] = rect_values[:, fold:width - fold]
+
+    half = height // 2
+    for x in range(fold):
+        for y in range(height):
+            left, right = rect_values[y, x], rect_values[y, width - 1 - x]
+            if y >= half:  # upper halves go to the top band
+                values[side - 1 - x, fold + height - 1 - y] = left
+                values[side - 1 - x, fold + y] = right
+            else:  # lower halves go to the bottom band
+                values[x, fold + y] = left
+                values[x, fold + height - 1 - y] = right
+
+    axis = np.linspace(-1, 1, side)
+    re, im = np.meshgrid(axis, axis)
+    symbols = np.where(values >= 0, re + 1j * im, np.nan)
+    return symbols, values
+
+
+def _rect_grid(order: int, pow: int, mapping: str):
+    ytiks = 2 ** int(np.floor(pow / 2))
+    xtiks = order // ytiks
+    x = np.linspace(-1, 1, xtiks)
+    y = np.linspace(-1, 1, ytiks) if ytiks > 1 else 0
+
+    re, im = np.meshgrid(x, y)
+    symbols = re + 1j * im
+
+    # row * columns + column: the low bits select a column, the high a row
+    rows, columns = np.meshgrid(np.arange(ytiks), np.arange(xtiks),
+                                indexing='ij')
+    if mapping == 'gray':
+        rows, columns = _gray(rows), _gray(columns)
+    values = rows * xtiks + columns
+    return symbols, values
+
+
+@functools.lru_cache(maxsize=None)
+def _tables(order: int, mapping: str, shape: str):
+    # memoized per constellation, modems of a sweep share the tables
+    pow = int(np.round(np.log2(order)))
+    if shape == 'cross':
+        symbols, values = _cross_grid(pow, mapping)
+    else:
+        symbols, values = _rect_grid(order, pow, mapping)
+
+    valid = values >= 0
+    points = np.zeros(order, dtype=np.complex128)
+    points[values[valid]] = symbols[valid]
+    return _readonly(symbols, values, points)
+
+
+@functools.lru_cache(maxsize=None)
+def _decision_table(order: int, mapping: str, shape: str):
+    # Point values of the grid cells. The nearest point of a sample in the
+    # cell of a point is the point itself, the cross corner cells are -1,
+    # their samples are decided against all the points.
+    symbols, values, points = _tables(order, mapping, shape)
+
+    nrows, ncols = symbols.shape
+    scale = ((ncols - 1) / 2, (nrows - 1) / 2)  # cells per unit
+    table = values.astype(np.int64).flatten()
+
+    return _readonly(table)[0], ncols, nrows, scale
+
+
 class QAMConstellation:
-    def __init__(self, order) -> None:
+    MAPPINGS = ('natural', 'gray')
+    SHAPES = ('rectangular', 'cross')
+
+    def __init__(self, order, mapping: str = 'natural',
+                 shape: str = 'rectangular') -> None:
 
         assert ((order & (order - 1)) == 0)
+        assert mapping in self.MAPPINGS and shape in self.SHAPES
         pow = int(np.round(np.log2(order)))
+        # cross constellations exist for odd powers from 32 on
+        assert shape != 'cross' or (pow % 2 == 1 and pow >= 5)
 
         self.order = order
         self.pow = pow
+        self.mapping_type = mapping
+        self.shape = shape
 
-        ytiks = 2 ** int(np.floor(pow / 2))
-        xtiks = order // ytiks
-        x = np.linspace(-1, 1, xtiks)
-        y = np.linspace(-1, 1, ytiks) if ytiks > 1 else 0
-
-        re, im = np.meshgrid(x, y)
-        self.__symbols = re + 1j * im
-        self.__values = np.arange(order).reshape(self.__symbols.shape)
+        self.__symbols, self.__values, self.__points = \
+            _tables(order, mapping, shape)
 
     @property
     def symbols(self):
+        # grid of points, the cross corners are nan
         return self.__symbols
 
     @property
     def values(self):
+        # grid of the point values, the cross corners are -1
         return self.__values
 
+    @property
+    def points(self):
+        # points indexed by value
+        return self.__points
+
+    def decision_table(self):
+        # (values, columns, rows, (column, row) cells per unit) of the grid
+        # spanning [-1, 1] on every axis
+        return _decision_table(self.order, self.mapping_type, self.shape)
+
+    @property
+    def separable(self) -> bool:
+        # every bit depends either on the real or on the imaginary part only
+        return self.shape == 'rectangular'
+
     @property
     def mapping(self):
+        valid = self.__values.flatten() >= 0
         return zip(
-            self.__symbols.flatten(),
-            self.__values.flatten(),
+            self.__symbols.flatten()[valid],
+            self.__values.flatten()[valid],
         )
@@ -1,27 +1,110 @@
 import numpy as np
 
-from numpy.fft import fft
-from numpy.fft import ifft
+from scipy.fft import fft
+from scipy.fft import ifft
+from scipy.fft import rfft
+from scipy.fft import irfft
 
 from simulation.unit import SimUnit
 
 
 class FftUpsampler(SimUnit):
 
-    def __init__(self, scale):
+    def __init__(self, scale, margin=256, axis=-1):
+        super().__init__()
+
         self.scale = scale
+        # streaming: every block is upsampled with `margin` input samples of
+        # context on each side, the output is delayed by `margin` samples
+        self.margin = margin
+        # the time axis, the others are independent channels or frames
+        self.axis = axis
+        self.__spectrum = None  # zero padded spectrum buffer of the last call
+        self.__spectrum_key = None  # (shape, input length, real) of it
+        self.reset()
 
     def process(self, x: np.array) -> np.array:
-        X = fft(x).reshape((2, -1))
-        Xu = np.concatenate(
-            (
-                X[0, :],
-                np.zeros(len(x) * (self.scale - 1)),
-                X[1, :]
-            ),
-            axis=0)
-
-        if np.iscomplexobj(x):
-            return self.scale * ifft(Xu)
+        # periodic interpolation of any length: zero padding in time would
+        # change the period, so the transforms take the exact lengths, which
+        # scipy.fft handles in O(n log n) also for primes
+        x = np.moveaxis(np.asarray(x), self.axis, -1)
+        n = x.shape[-1]
+        real = not np.iscomplexobj(x)
+        if n == 0:
+            return np.moveaxis(np.zeros(x.shape, dtype=np.float64 if real
+                                        else np.complex128), -1, self.axis)
+        M = n * self.scale
+        half = n // 2  # the Nyquist bin of an even n
+        split = n % 2 == 0 and self.scale > 1  # it has two sides in M bins
+
+        if real:
+            Y = self.__zero_padded((*x.shape[:-1], M // 2 + 1), n, real)
+            Y[..., :half + 1] = rfft(x, axis=-1)
+            if split:  # irfft mirrors the split half
+                Y[..., half] /= 2
+            y = irfft(Y, M, axis=-1)
         else:
-            return self.scale * np.real(ifft(Xu))
+            X = fft(x, axis=-1)
+            Y = self.__zero_padded((*x.shape[:-1], M), n, real)
+            positive = (n + 1) // 2  # bins below the Nyquist one
+            Y[..., :positive] = X[..., :positive]
+            Y[..., M - (n - positive):] = X[..., positive:]
+            if split:  # the Nyquist bin is split between both sides
+                Y[..., M - half] /= 2
+                Y[..., half] = Y[..., M - half]
+            y = ifft(Y, axis=-1)
+
+        y *= self.scale
+        return np.moveaxis(y, -1, self.axis)
+
+    def __zero_padded(self, shape, n, real) -> np.array:
+        # the zero padding region is never written, so the buffer is reused
+        # only for the same bins: a real and a complex input, or two lengths
+        # of the same scaled rfft size, write different ones
+        key = (shape, n, real)
+        if self.__spectrum_key != key:
+            self.__spectrum = np.zeros(shape, dtype=np.complex128)
+            self.__spectrum_key = key
+        return self.__spectrum
+
+    def process_block(self, x: np.array) -> np.array:
+        x = np.moveaxis(np.asarray(x), self.axis, -1)
+        self.__consumed += x.shape[-1]
+        if self.__buffer is None:
+            self.__buffer = np.zeros((*x.shape[:-1], self.margin),
+                                     dtype=x.dtype)
+        buffer = np.concatenate((self.__buffer, x), axis=-1)
+
+        # the core keeps at least a sample
+        core = buffer.shape[-1] - 2 * self.margin
+        if core <= 0:
+            self.__buffer = buffer
+            return np.moveaxis(np.zeros((*x.shape[:-1], 0),
+                                        dtype=buffer.dtype), -1, self.axis)
+
+        window = np.moveaxis(buffer, -1, self.axis)
+        output = np.moveaxis(self.process(window), self.axis, -1)[
+            ..., self.margin * self.scale:(self.margin + core) * self.scale]
+
+        self.__buffer = buffer[..., core:]
+        self.__produced += output.shape[-1]
+        return np.moveaxis(output, -1, self.axis)
+
+    def flush(self):
+        if self.__buffer is None:
+            self.reset()
+            return None
+
+        expected = self.__consumed * self.scale - self.__produced
+        tail = np.zeros((*self.__buffer.shape[:-1], self.margin + 1),
+                        dtype=self.__buffer.dtype)
+
+        output = self.process_block(np.moveaxis(tail, -1, self.axis))
+        output = np.moveaxis(output, self.axis, -1)[..., :expected]
+        self.reset()
+        return np.moveaxis(output, -1, self.axis)
+
+    def reset(self):
+        self.__buffer = None  # shaped after the first block
+        self.__consumed = 0
+        self.__produced = 0
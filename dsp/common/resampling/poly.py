@@ -1,9 +1,11 @@
+import functools
 import numpy as np
 
 from dataclasses import dataclass
 from fractions import Fraction
 
-from scipy.signal import resample_poly
+from scipy.signal import firwin
+from scipy.signal import upfirdn
 
 from simulation.unit import SimUnit
 
@@ -12,9 +14,45 @@ from simulation.unit import SimUnit
 class PolyResamplerConfig:
     fin: int
     fout: int
+    window: tuple = ('kaiser', 5.0)  # of the anti-aliasing FIR design
+    taps: tuple = None  # a FIR at the upsampled rate instead of the design
+
+
+def _align(taps: np.array, down: int) -> tuple:
+    # zeros in front of the taps make the filter centre land on an output
+    # sample, the delay is in outputs
+    half_len = (len(taps) - 1) // 2
+    n_pre_pad = down - half_len % down
+    taps = np.concatenate((np.zeros(n_pre_pad), taps))
+    taps.flags.writeable = False
+    return taps, (half_len + n_pre_pad) // down
+
+
+@functools.lru_cache(maxsize=None)
+def design_filter(up: int, down: int, window) -> tuple:
+    # (taps, delay in outputs) shared by the resamplers of a rate pair, the
+    # same filter and alignment as resample_poly uses
+    max_rate = max(up, down)
+    if max_rate == 1:
+        taps = np.ones(1)
+        taps.flags.writeable = False
+        return taps, 0
+
+    half_len = 10 * max_rate
+    return _align(up * firwin(2 * half_len + 1, 1. / max_rate,
+                              window=window), down)
+
+
+@functools.lru_cache(maxsize=None)
+def custom_filter(taps: tuple, down: int) -> tuple:
+    # (taps, delay in outputs) of the given FIR, aligned the same way
+    return _align(np.array(taps, dtype=np.float64), down)
 
 
 class PolyResampler(SimUnit):
+    # the output is the same whether the input comes in one process() call
+    # or in any number of process_block() calls and a flush()
+
     def __init__(self, config: PolyResamplerConfig) -> None:
         super().__init__()
 
@@ -26,7 +64,119 @@ class PolyResampler(SimUnit):
         self.up = ratio.numerator
         self.down = ratio.denominator
 
+        if config.taps is not None:
+            self.taps, self.delay = custom_filter(tuple(config.taps),
+                                                  self.down)
+        else:
+            window = config.window
+            if isinstance(window, list):  # from yaml
+                window = tuple(window)
+            self.taps, self.delay = design_filter(self.up, self.down, window)
+
+        # [phase, tap] rows of the filter in the time order of the inputs,
+        # output m is the dot product of the row (m * down) % up with the
+        # last taps per phase inputs up to (m * down) // up
+        self.__phase_len = -(-len(self.taps) // self.up)
+        padded = np.zeros(self.__phase_len * self.up)
+        padded[:len(self.taps)] = self.taps
+        self.__polyphase = np.ascontiguousarray(
+            padded.reshape(self.__phase_len, self.up).T[:, ::-1])
+        self.reset()
+
         self.logger.info(f'resampling {self.up}/{self.down}')
 
     def process(self, input) -> np.array:
-        return resample_poly(input, up=self.up, down=self.down)
+        input = np.asarray(input)
+        if self.up == self.down == 1 and self.config.taps is None:
+            return np.array(input, copy=True)
+
+        n_out = -(-len(input) * self.up // self.down)
+        output = upfirdn(self.taps, input, self.up, self.down, axis=0)[
+            self.delay:self.delay + n_out]
+        if len(output) < n_out:  # the filter tail is longer than the input
+            output = np.concatenate((output, np.zeros(
+                (n_out - len(output), *output.shape[1:]), output.dtype)))
+        return output
+
+    def process_block(self, input) -> np.array:
+        if self.up == self.down == 1 and self.config.taps is None:
+            return np.array(input, copy=True)
+
+        input = np.asarray(input)
+        if self.__history is None:  # channels follow the first block
+            # the stream is preceded by zeros
+            self.__start = self.__history_start(0)
+            self.__history = np.zeros((-self.__start, *input.shape[1:]),
+                                      input.dtype)
+        self.__consumed += len(input)
+        return self.__advance(input, self.__ready())
+
+    def flush(self):
+        if self.up == self.down == 1 and self.config.taps is None or \
+                self.__history is None:
+            self.reset()
+            return None
+
+        n_out = -(-self.__consumed * self.up // self.down)
+        last = self.delay + n_out - 1
+
+        # feed zeros until the last output does not need future input
+        n_zeros = max(0, -(-(last * self.down + 1) // self.up) - self.__end)
+        output = self.__advance(
+            np.zeros((n_zeros, *self.__history.shape[1:])), last)
+
+        self.reset()
+        return output
+
+    def reset(self):
+        self.__history = None  # shaped after the first block
+        self.__start = 0  # input index of the first history sample
+        self.__end = 0  # input index after the last history sample
+        self.__consumed = 0  # input samples of the stream
+        self.__next = self.delay  # next output index of the full convolution
+
+    def __ready(self):
+        # the last output which depends only on already received input
+        return (self.__end * self.up - 1) // self.down
+
+    def __advance(self, input, last) -> np.array:
+        # only the outputs [next, last] are computed, the history holds the
+        # inputs of the filter span behind the next output
+        history = np.concatenate((self.__history, input))
+        self.__end += len(input)
+
+        first = self.__next
+        if last < first:
+            self.__history = history
+            return np.zeros((0, *history.shape[1:]), dtype=history.dtype)
+
+        if self.up == 1 or self.down == 1:
+            # the rows q of the outputs, a strided view of the input windows
+            # times the phases in a single matmul
+            q0, q1 = first // self.up, last // self.up
+            windows = np.lib.stride_tricks.sliding_window_view(
+                history, self.__phase_len, axis=0)
+            origin = q0 * self.down - self.__phase_len + 1 - self.__start
+            rows = windows[origin:origin + (q1 - q0) * self.down + 1:
+                           self.down]
+            output = np.moveaxis(rows @ self.__polyphase.T, -1, 1).reshape(
+                -1, *history.shape[1:])[first - q0 * self.up:
+                                        last - q0 * self.up + 1]
+        else:
+            # the history is the polyphase state of a few inputs, upfirdn
+            # over it yields outputs from start * up / down
+            output = upfirdn(self.taps, history, self.up, self.down, axis=0)
+            offset = self.__start * self.up // self.down
+            output = output[first - offset:last - offset + 1]
+
+        self.__next = last + 1
+        drop = self.__history_start(self.__next) - self.__start
+        self.__history = history[drop:]
+        self.__start += drop
+
+        return output
+
+    def __history_start(self, output_idx) -> int:
+        # the first input of the output, on a multiple of `down` for upfirdn
+        first = (output_idx * self.down) // self.up - self.__phase_len + 1
+        return first - first % self.down
@@ -0,0 +1,60 @@
+import numpy as np
+
+from dataclasses import dataclass
+from dataclasses import asdict
+
+# set bits of every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)],
+                    dtype=np.uint8)
+
+
+@dataclass
+class BitErrorCounter:
+    errors: int = 0
+    bits: int = 0
+
+    @property
+    def ber(self) -> float:
+        return self.errors / self.bits if self.bits else 0.0
+
+    def update(self, tx, rx):
+        # packed bits: bytes, memoryview or uint8 arrays of the same length
+        tx = np.frombuffer(tx, dtype=np.uint8)
+        rx = np.frombuffer(rx, dtype=np.uint8)
+        self.errors += int(np.sum(POPCOUNT[tx ^ rx], dtype=np.int64))
+        self.bits += 8 * len(tx)
+
+    def update_bits(self, tx: np.array, rx: np.array):
+        # a bit per element
+        self.errors += int(np.count_nonzero(tx != rx))
+        self.bits += len(tx)
+
+    def merge(self, other: 'BitErrorCounter'):
+        self.errors += other.errors
+        self.bits += other.bits
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), 'ber': self.ber}
+
+
+@dataclass
+class SymbolErrorCounter:
+    errors: int = 0
+    symbols: int = 0
+
+    @property
+    def ser(self) -> float:
+        return self.errors / self.symbols if self.symbols else 0.0
+
+    def update(self, tx: np.array, rx: np.array):
+        # symbol values or the constellation points themselves
+        self.errors += int(np.count_nonzero(tx != rx))
+        self.symbols += len(tx)
+
+    def merge(self, other: 'SymbolErrorCounter'):
+        self.errors += other.errors
+        self.symbols += other.symbols
+
+    def as_dict(self) -> dict:
+        return {'symbol_errors': self.errors, 'symbols': self.symbols,
+                'ser': self.ser}
@@ -0,0 +1,50 @@
+import numpy as np
+
+
+class EvmMeter:
+    # RMS error vector magnitude against the reference points, accumulated
+    # per subcarrier when Nsc is given, symbols are laid out (Nsymb, Nsc)
+    # or carry their subcarrier indices, e.g. the data cells of pilot frames
+
+    def __init__(self, Nsc: int = 1) -> None:
+        self.Nsc = Nsc
+        self.error_power = np.zeros(Nsc)
+        self.ref_power = np.zeros(Nsc)
+        self.symbols = 0
+
+    def update(self, reference: np.array, received: np.array,
+               subcarriers: np.array = None):
+        if subcarriers is not None:
+            error = np.abs(np.ravel(received) - np.ravel(reference)) ** 2
+            power = np.abs(np.ravel(reference)) ** 2
+            self.error_power += np.bincount(subcarriers, error, self.Nsc)
+            self.ref_power += np.bincount(subcarriers, power, self.Nsc)
+            self.symbols += power.size
+            return
+
+        reference = np.reshape(reference, (-1, self.Nsc))
+        received = np.reshape(received, (-1, self.Nsc))
+        self.error_power += np.sum(np.abs(received - reference) ** 2, axis=0)
+        self.ref_power += np.sum(np.abs(reference) ** 2, axis=0)
+        self.symbols += reference.size
+
+    def merge(self, other: 'EvmMeter'):
+        assert other.Nsc == self.Nsc
+        self.error_power += other.error_power
+        self.ref_power += other.ref_power
+        self.symbols += other.symbols
+
+    @property
+    def evm(self) -> float:
+        ref_power = np.sum(self.ref_power)
+        return float(np.sqrt(np.sum(self.error_power) / ref_power)) \
+            if ref_power else 0.0
+
+    @property
+    def mer_db(self) -> np.array:
+        # modulation error ratio per subcarrier, nan without data symbols
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 10 * np.log10(self.ref_power / self.error_power)
+
+    def as_dict(self) -> dict:
+        return {'evm': self.evm, 'symbols': self.symbols}
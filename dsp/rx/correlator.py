@@ -0,0 +1,153 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+from scipy.fft import fft
+from scipy.fft import ifft
+from scipy.fft import next_fast_len
+from scipy.ndimage import maximum_filter1d
+
+from simulation.unit import SimUnit
+
+
+@dataclass(frozen=True)
+class PreambleCorrelatorConfig:
+    fft_size: int = None  # overlap-save FFT, ~4 reference lengths by default
+    threshold: float = 20.0  # peak power over the CFAR noise estimate, a
+    # false alarm probability of about exp(-threshold) per sample
+    guard: int = 16  # CFAR cells next to the tested one, left out
+    window: int = 256  # CFAR cells averaged on every side
+    min_distance: int = None  # between peaks, the reference length by default
+
+
+@dataclass
+class Peak:
+    index: float  # stream position of the first reference sample
+    value: complex  # correlation at the integer peak
+    snr: float  # peak power over the CFAR noise estimate
+
+
+class PreambleCorrelator(SimUnit):
+    # c[n] = sum_m conj(reference[m]) * signal[n + m] with FFT overlap-save,
+    # for every n with a whole reference inside the signal
+
+    def __init__(self, reference: np.array,
+                 config: PreambleCorrelatorConfig = None) -> None:
+        super().__init__()
+
+        self.config = config or PreambleCorrelatorConfig()
+        self.length = len(reference)
+        self.fft_size = self.config.fft_size or \
+            next_fast_len(4 * self.length)
+        assert self.fft_size >= 2 * self.length
+        self.step = self.fft_size - self.length + 1  # outputs per FFT
+
+        # the reference spectrum is computed once
+        self.spectrum = np.conj(fft(reference, self.fft_size))
+
+        self.min_distance = self.config.min_distance or self.length
+        # correlation samples around a peak candidate it is decided with
+        self.margin = max(self.config.guard + self.config.window,
+                          self.min_distance) + 1
+        self.reset()
+
+    def process(self, signal: np.array) -> np.array:
+        corr = self.__correlate(signal)
+        self.peaks = []
+        self.__detect(corr, 0, 0, len(corr), self.peaks)
+        return corr
+
+    def process_block(self, signal: np.array) -> np.array:
+        buffer = np.concatenate((self.__tail, signal))
+        corr = self.__correlate(buffer)
+        self.__tail = buffer[len(corr):]
+
+        # peaks are decided once the CFAR and the peak windows are complete
+        history = np.concatenate((self.__history, corr))
+        last = len(history) - self.margin
+        if last > self.__decided:
+            self.__detect(history, self.__start, self.__decided, last,
+                          self.peaks)
+            self.__decided = last
+
+        drop = max(0, self.__decided - self.margin)
+        self.__history = history[drop:]
+        self.__start += drop
+        self.__decided -= drop
+        return corr
+
+    def flush(self):
+        self.__detect(self.__history, self.__start, self.__decided,
+                      len(self.__history), self.peaks)
+        self.__start += len(self.__history)
+        self.__history = self.__history[len(self.__history):]
+        self.__decided = 0
+        return None
+
+    def reset(self):
+        self.peaks = []
+        self.__tail = np.zeros(0, dtype=np.complex128)
+        self.__history = np.zeros(0, dtype=np.complex128)
+        self.__start = 0  # stream position of the first history sample
+        self.__decided = 0  # history samples already searched for peaks
+
+    def __correlate(self, signal: np.array) -> np.array:
+        count = len(signal) - self.length + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.complex128)
+
+        # all the overlapping segments go through one batched FFT
+        nseg = -(-count // self.step)
+        padded = np.zeros(nseg * self.step + self.length - 1,
+                          dtype=np.result_type(signal, np.complex64))
+        padded[:len(signal)] = signal
+        segments = np.lib.stride_tricks.sliding_window_view(
+            padded, self.fft_size)[::self.step] \
+            if len(padded) >= self.fft_size else \
+            np.pad(padded, (0, self.fft_size - len(padded)))[None, :]
+
+        corr = ifft(fft(segments, axis=1) * self.spectrum, axis=1)
+        return corr[:, :self.step].reshape(-1)[:count]
+
+    def __detect(self, corr: np.array, start: int, first: int, last: int,
+                 peaks: list[Peak]):
+        # CA-CFAR: the noise is the mean power of `window` cells on both
+        # sides beyond `guard` cells, truncated at the stream edges.
+        # Peaks of corr[first:last] are appended, start is the stream
+        # position of corr[0].
+        if last <= first:
+            return
+        guard, window = self.config.guard, self.config.window
+        power = np.abs(corr) ** 2
+        cumsum = np.concatenate(([0], np.cumsum(power)))
+        n = len(power)
+
+        idx = np.arange(first, last)
+        lo = (np.maximum(idx - guard - window, 0), np.maximum(idx - guard, 0))
+        hi = (np.minimum(idx + guard + 1, n),
+              np.minimum(idx + guard + window + 1, n))
+        total = cumsum[lo[1]] - cumsum[lo[0]] + cumsum[hi[1]] - cumsum[hi[0]]
+        cells = lo[1] - lo[0] + hi[1] - hi[0]
+        noise = total / np.maximum(cells, 1)
+
+        local_max = maximum_filter1d(
+            power, 2 * self.min_distance + 1, mode='constant')[first:last]
+        candidates = (power[first:last] >= local_max) & \
+            (power[first:last] > self.config.threshold * noise)
+
+        for k in np.flatnonzero(candidates):
+            i = first + k
+            if peaks and start + i - peaks[-1].index < self.min_distance:
+                continue  # a flat top
+            index = start + i + self.__fraction(corr, i)
+            peaks.append(Peak(index=float(index), value=complex(corr[i]),
+                              snr=float(power[i] / max(noise[k], 1e-300))))
+
+    @staticmethod
+    def __fraction(corr: np.array, i: int) -> float:
+        # parabolic interpolation of the magnitude around the peak
+        if i == 0 or i == len(corr) - 1:
+            return 0.0
+        a, b, c = np.abs(corr[i - 1:i + 2])
+        denominator = a - 2 * b + c
+        return float(0.5 * (a - c) / denominator) if denominator else 0.0
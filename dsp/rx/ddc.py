@@ -0,0 +1,80 @@
+import numpy as np
+
+from dataclasses import dataclass
+from fractions import Fraction
+
+from scipy.signal import lfilter
+
+from simulation.unit import SimUnit
+
+from ..common.nco import Nco
+from ..common.resampling.poly import PolyResampler
+from ..common.resampling.poly import PolyResamplerConfig
+
+# FIR 16 taps, Low pass filter, cutoff = 2 kHz at 48 kHz
+B_LO = (0.03157319, 0.04156552, 0.05169825, 0.06138433, 0.07002734,
+        0.07707174, 0.08205098, 0.08462865, 0.08462865, 0.08205098,
+        0.07707174, 0.07002734, 0.06138433, 0.05169825, 0.04156552,
+        0.03157319)
+
+# FIR 16 taps, Band pass filter, F_lo = 3 kHz F_hi = 5 kHz at 48 kHz
+B_BP = (-0.06280036, -0.09516154, -0.10379872, -0.0815819, -0.03158135,
+        0.03292086, 0.09244693, 0.12802351, 0.12802351, 0.09244693,
+        0.03292086, -0.03158135, -0.0815819, -0.10379872, -0.09516154,
+        -0.06280036)
+
+
+@dataclass(frozen=True)
+class DDCConfig:
+    fc: float  # carrier, Hz
+    rate: int  # input sample rate, Hz
+    decimation: int  # input samples per output sample
+    bandpass: tuple = None  # linear phase FIR before the mixer, e.g. B_BP
+    lowpass: tuple = None  # decimating FIR, None designs it, e.g. B_LO
+
+
+class DDC(SimUnit):
+    # real passband signal to the complex baseband, the inverse of DUC:
+    # 2 x(t) exp(-2j pi fc t) through a polyphase decimating FIR, which
+    # computes the kept outputs only
+
+    def __init__(self, config: DDCConfig) -> None:
+        super().__init__()
+
+        self.config = config
+        self.bandpass = np.array(config.bandpass) \
+            if config.bandpass is not None else None
+        # the bandpass group delay turns the carrier phase, it is taken back
+        delay = (len(self.bandpass) - 1) / 2 if self.bandpass is not None \
+            else 0
+        self.__rotation = 2 * np.exp(2j * np.pi * float(Fraction(
+            config.fc) / Fraction(config.rate)) * delay)
+        self.decimator = PolyResampler(PolyResamplerConfig(
+            fin=config.decimation, fout=1, taps=config.lowpass))
+        self.nco = Nco(config.fc, config.rate)
+        self.reset()
+
+    def process(self, signal: np.array) -> np.array:
+        if self.bandpass is not None:
+            signal = lfilter(self.bandpass, 1, signal)
+        mixed = self.__rotation * signal * \
+            np.conj(self.nco.phasors(0, len(signal)))
+        return self.decimator.process(mixed)
+
+    def process_block(self, signal: np.array) -> np.array:
+        if self.bandpass is not None:
+            signal, self.__zi = lfilter(self.bandpass, 1, signal, zi=self.__zi)
+        mixed = self.__rotation * signal * \
+            np.conj(self.nco.process(len(signal)))
+        return self.decimator.process_block(mixed)
+
+    def flush(self):
+        output = self.decimator.flush()
+        self.reset()
+        return output
+
+    def reset(self):
+        self.decimator.reset()
+        self.nco.reset()
+        self.__zi = np.zeros(len(self.bandpass) - 1) \
+            if self.bandpass is not None else None
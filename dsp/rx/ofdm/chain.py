@@ -5,6 +5,7 @@ from simulation.unit import SimUnit
 from .frontend import OFDMfrontend
 from .equalizer import OFDMChannleEqualizer
 from .estimator import OFDMChannleEstimator
+from ...common.pilots import pilot_mask
 
 
 class OFDMRxChain(SimUnit):
@@ -12,9 +13,14 @@ class OFDMRxChain(SimUnit):
                  frontend: OFDMfrontend,
                  estimator: OFDMChannleEstimator,
                  equalizer: OFDMChannleEqualizer) -> None:
+        super().__init__()
+
         self.frontend = frontend
         self.estimator = estimator
         self.equalizer = equalizer
+        self.__data = ~pilot_mask(frontend.config)
+        # noise variance of the last returned symbols, None when unknown
+        self.noise_var = None
 
         self.logger.info(f"Init chain with\n"
                          f"\tfrontend={frontend}\n"
@@ -22,9 +28,53 @@ class OFDMRxChain(SimUnit):
                          f"\tequalizer={equalizer}")
 
     def process(self, ofdm_symbols: np.array) -> np.array:
-        symbols = self.frontend.process(ofdm_symbols)
-        chest = self.estimator.process(symbols)
+        return self.__process_symbols(self.frontend.process(ofdm_symbols))
+
+    def process_block(self, ofdm_symbols: np.array) -> np.array:
+        return self.__process_symbols(self.frontend.process_block(ofdm_symbols))
+
+    def process_batch(self, ofdm_signals: np.array) -> np.array:
+        # (frames, samples) signals of independent transmissions to
+        # (frames, data symbols); noise_var is (frames, data symbols) then
+        symbols = self.frontend.process_batch(ofdm_signals)
+        data, chest = self.__process_frames(symbols,
+                                            self.estimator.process_batch)
+        self.store(symbols=symbols, chest=chest)
+        return data
+
+    def reset(self):
+        self.frontend.reset()
+        self.estimator.reset()
+        self.equalizer.reset()
+
+    def __process_symbols(self, symbols: np.array) -> np.array:
+        def estimate(frames):
+            chest, noise_var = self.estimator.process(frames[0])
+            return chest, None if noise_var is None else np.array([noise_var])
+
+        data, chest = self.__process_frames(symbols[None], estimate)
+        self.store(symbols=symbols, chest=chest)
+        if self.noise_var is not None:
+            self.noise_var = self.noise_var.flatten()
+        return data.flatten()
+
+    def __process_frames(self, symbols: np.array, estimate) -> tuple:
+        # (frames, Nsymb, Nsc) symbols, the noise variance of every frame
+        chest, noise_var = estimate(symbols)
+        if noise_var is not None:
+            noise_var = noise_var[:, None, None]
+
+        eqsymbols = self.equalizer.process(symbols=symbols, chest=chest,
+                                           noise_var=noise_var)
 
-        eqsymbols = self.equalizer.process(symbols=symbols, chest=chest)
+        # pilots are dropped, data cells go in the order OFDM takes them
+        batch = len(symbols)
+        frames = eqsymbols.reshape(batch, -1, *self.__data.shape)
+        if noise_var is not None:
+            gains = np.broadcast_to(chest, symbols.shape)
+            gains = np.abs(gains.reshape(frames.shape)[:, :, self.__data]) ** 2
+            self.noise_var = noise_var[:, :, 0] / gains.reshape(batch, -1)
+        else:
+            self.noise_var = None
 
-        return eqsymbols.flatten()
+        return frames[:, :, self.__data].reshape(batch, -1), chest
@@ -1,11 +1,25 @@
 import numpy as np
 
+from dataclasses import dataclass
+
 from simulation.unit import SimUnit
 
 
+@dataclass(frozen=True)
+class OFDMChannleEqualizerConfig:
+    mode: str = 'zf'  # zf | mmse
+
+
 class OFDMChannleEqualizer(SimUnit):
-    def __init__(self) -> None:
-        self.config = []
+    def __init__(self, config: OFDMChannleEqualizerConfig = None) -> None:
+        super().__init__()
+
+        self.config = config or OFDMChannleEqualizerConfig()
+        assert self.config.mode in ('zf', 'mmse')
+
+    def process(self, symbols: np.array, chest: np.array,
+                noise_var: float = None) -> np.array:
+        if self.config.mode == 'zf' or noise_var is None:
+            return symbols / chest
 
-    def process(self, symbols: np.array, chest: np.array) -> np.array:
-        return symbols / chest
+        return symbols * np.conj(chest) / (np.abs(chest) ** 2 + noise_var)
@@ -1,12 +1,259 @@
+import functools
 import numpy as np
 
+from dataclasses import dataclass
+from scipy import sparse
+
 from simulation.unit import SimUnit
 
+from ...common.ofdm_config import OFDMconfig
+from ...common.pilots import pilot_mask
+from ...common.pilots import pilot_symbols
+
+SNR_RANGE_DB = (-10, 50)  # Wiener matrices are built within
+
+
+@dataclass(frozen=True)
+class OFDMChannleEstimatorConfig:
+    mode: str = 'ls'  # ls | lmmse
+    delay_spread: float = 1.0  # rms delay spread of the channel, samples
+    snr_step_db: float = 3.0  # SNR bucket of the cached Wiener matrices
+
+
+def _linear_weights(positions: np.array, length: int) -> tuple:
+    # (lower, upper, upper weight) of the linear interpolation from the
+    # sorted positions to [0, length), the edges are held as np.interp does
+    x = np.arange(length)
+    if len(positions) == 1:
+        zeros = np.zeros(length, dtype=int)
+        return zeros, zeros, np.zeros(length)
+    upper = np.clip(np.searchsorted(positions, x), 1, len(positions) - 1)
+    lower = upper - 1
+    weight = (x - positions[lower]) / (positions[upper] - positions[lower])
+    return lower, upper, np.clip(weight, 0, 1)
+
+
+def _interpolation_operator(rows, lower, upper, weight, shape):
+    # sparse rows of w_lower * lower + w_upper * upper
+    return sparse.csr_matrix(
+        (np.concatenate((1 - weight, weight)),
+         (np.concatenate((rows, rows)), np.concatenate((lower, upper)))),
+        shape=shape)
+
+
+@functools.lru_cache(maxsize=None)
+def interpolation_matrix(config: OFDMconfig) -> sparse.csr_matrix:
+    # sparse (frame cells, pilots) map of the 2-D linear interpolation:
+    # along time for every subcarrier with pilots first, then along
+    # frequency, at most four pilots per cell
+    mask = pilot_mask(config)
+    nsymb, Nsc = mask.shape
+    pilot_id = np.full(mask.shape, -1)
+    pilot_id[mask] = np.arange(np.count_nonzero(mask))
+    carriers = np.flatnonzero(np.any(mask, axis=0))
+
+    # (nsymb, carriers) grid from the pilots
+    rows, lower, upper, weight = [], [], [], []
+    for j, k in enumerate(carriers):
+        times = np.flatnonzero(mask[:, k])
+        lo, hi, w = _linear_weights(times, nsymb)
+        rows.append(np.arange(nsymb) * len(carriers) + j)
+        lower.append(pilot_id[times[lo], k])
+        upper.append(pilot_id[times[hi], k])
+        weight.append(w)
+    in_time = _interpolation_operator(
+        *map(np.concatenate, (rows, lower, upper, weight)),
+        (nsymb * len(carriers), np.count_nonzero(mask)))
+
+    # (nsymb, Nsc) cells from the grid
+    lo, hi, w = _linear_weights(carriers, Nsc)
+    offsets = np.repeat(np.arange(nsymb) * len(carriers), Nsc)
+    in_frequency = _interpolation_operator(
+        np.arange(nsymb * Nsc), offsets + np.tile(lo, nsymb),
+        offsets + np.tile(hi, nsymb), np.tile(w, nsymb),
+        (nsymb * Nsc, nsymb * len(carriers)))
+
+    matrix = (in_frequency @ in_time).tocsr()
+    matrix.data.flags.writeable = False
+    return matrix
+
+
+def _frequency_correlation(config: OFDMconfig, delay_spread: float,
+                           columns: np.array):
+    # exponential power delay profile, the channel is static within a
+    # frame: the correlation of every frame cell with the columns
+    mask = pilot_mask(config)
+    k = np.tile(np.arange(config.Nsc), mask.shape[0])
+    dk = k[:, None] - k[None, columns]
+    return 1 / (1 + 2j * np.pi * delay_spread * dk / config.fft_len)
+
+
+# a matrix is frame cells x pilots, e.g. 33 MB of a 1024 subcarriers block
+# pattern: a few SNR buckets of the running configs are kept
+@functools.lru_cache(maxsize=8)
+def wiener_matrix(config: OFDMconfig, delay_spread: float,
+                  snr_db: float) -> np.array:
+    # (frame cells, pilots) LMMSE map R_hp (R_pp + I / snr)^-1
+    pilots = np.flatnonzero(pilot_mask(config))
+    r_hp = _frequency_correlation(config, delay_spread, pilots)
+    r_pp = r_hp[pilots]
+
+    regularized = r_pp + np.eye(len(pilots)) / 10 ** (snr_db / 10)
+    matrix = np.linalg.solve(regularized.T, r_hp.T).T
+    matrix.flags.writeable = False
+    return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def pilot_neighbours(config: OFDMconfig):
+    # pilots next to each other within an OFDM symbol at the most common
+    # subcarrier spacing, their phase turn is the mean delay of the channel
+    # up to fft_len / (2 spacing) samples
+    rows, cols = np.nonzero(pilot_mask(config))
+    adjacent = np.diff(rows) == 0
+    if not np.any(adjacent):
+        return None
+    steps = np.diff(cols)[adjacent]
+    spacing = int(np.bincount(steps).argmax())
+    first = np.flatnonzero(adjacent & (np.diff(cols) == spacing))
+    first.flags.writeable = False
+    return first, spacing
+
+
+@functools.lru_cache(maxsize=None)
+def noise_projection(config: OFDMconfig):
+    # The channel response at the pilots lies in the span of the first
+    # guard interval + 1 delays, the rest of the LS estimates is noise
+    mask = pilot_mask(config)
+    k = np.nonzero(mask)[1] + config.bins.start  # FFT bins
+    delays = np.arange(config.guard_interval_length + 1)
+    basis = np.exp(-2j * np.pi * k[:, None] * delays[None, :] /
+                   config.fft_len)
+
+    rank = np.linalg.matrix_rank(basis)
+    q, _ = np.linalg.qr(basis)
+    projection = np.eye(len(k)) - q @ q.conj().T
+    projection.flags.writeable = False
+    return projection, len(k) - rank
+
 
 class OFDMChannleEstimator(SimUnit):
-    def __init__(self) -> None:
-        self.config = []
+    def __init__(self, ofdm_config: OFDMconfig = None,
+                 config: OFDMChannleEstimatorConfig = None) -> None:
+        super().__init__()
+
+        self.ofdm_config = ofdm_config
+        self.config = config or OFDMChannleEstimatorConfig()
+        assert self.config.mode in ('ls', 'lmmse')
+
+        self.__pilots = pilot_symbols(ofdm_config) \
+            if ofdm_config is not None else np.zeros(0)
+        if len(self.__pilots):
+            mask = pilot_mask(ofdm_config)
+            self.__frame_shape = mask.shape
+            self.__pilot_idx = np.flatnonzero(mask)
+            self.__pilot_carriers = np.nonzero(mask)[1]
+        self.__warned = False  # of a missing noise variance estimate
+
+    def process(self, symbols: np.array):
+        # the channel estimate of every cell and the noise variance of a
+        # subcarrier, which is unknown (None) without pilots
+        nsymb, Nsc = symbols.shape
+        if not len(self.__pilots):
+            return np.ones(Nsc), None
+
+        chest, noise_var = self.process_batch(symbols[None])
+        return chest[0], None if noise_var is None else float(noise_var[0])
+
+    def process_batch(self, symbols: np.array):
+        # (frames, Nsymb, Nsc) symbols of independent transmissions, the
+        # noise variance and the LMMSE SNR bucket are estimated per frame
+        batch, nsymb, Nsc = symbols.shape
+        if not len(self.__pilots):
+            return np.ones((1, 1, Nsc)), None
+
+        frame_cells = self.__frame_shape[0] * Nsc
+        frames = symbols.reshape(batch, -1, frame_cells)
+        ls = frames[:, :, self.__pilot_idx] / self.__pilots
+
+        noise_var = self.__noise_var(ls)
+        if self.config.mode == 'ls':
+            # a single sparse product for all the frames
+            matrix = interpolation_matrix(self.ofdm_config)
+            chest = (matrix @ ls.reshape(-1, ls.shape[-1]).T).T.reshape(
+                *ls.shape[:2], frame_cells)
+        else:
+            buckets = self.__snr_bucket(ls, noise_var)
+            # the correlation model is centred on a zero delay, a capture
+            # delay or an early FFT window turns the phase over the
+            # subcarriers: it is taken out before the Wiener filter
+            slope = self.__delay_slope(ls)
+            ls = ls * np.exp(-1j * slope * self.__pilot_carriers)
+            chest = np.empty((*ls.shape[:2], frame_cells), dtype=np.complex128)
+            for snr_db in np.unique(buckets):
+                selected = buckets == snr_db
+                matrix = wiener_matrix(self.ofdm_config,
+                                       self.config.delay_spread,
+                                       float(snr_db))
+                chest[selected] = ls[selected] @ matrix.T
+            chest *= np.exp(1j * slope * (np.arange(frame_cells) % Nsc))
+
+        return chest.reshape(batch, nsymb, Nsc), noise_var
+
+    def __noise_var(self, ls: np.array) -> np.array:
+        # (frames, pilot frames, pilots) LS estimates to a noise variance
+        # per frame
+        batch, nframes, npilots = ls.shape
+        if nframes == 0:
+            return None
+
+        projection, dof = noise_projection(self.ofdm_config)
+        if dof > 0:
+            residual = ls @ projection.T
+            return np.sum(np.abs(residual) ** 2, axis=(1, 2)) / \
+                (dof * nframes)
+
+        if nframes > 1:
+            # pilots over the GI + 1 delays leave no noise subspace, but the
+            # channel is static within a transmission: the pilot frame
+            # differences are noise of twice the variance once the common
+            # phase turn is taken out
+            turn = np.sum(ls[:, 1:] * np.conj(ls[:, :-1]), axis=2,
+                          keepdims=True)
+            turn = np.exp(1j * np.angle(turn))
+            diff = ls[:, 1:] - ls[:, :-1] * turn
+            return np.sum(np.abs(diff) ** 2, axis=(1, 2)) / \
+                (2 * (nframes - 1) * (npilots - 1))
+
+        if not self.__warned:
+            self.logger.warning(
+                f'{npilots} pilots of a single pilot frame do not estimate '
+                f'the noise of a {self.ofdm_config.guard_interval_length + 1} '
+                'taps channel, noise_var is None: MMSE falls back to ZF and '
+                'LLRs have no noise variance')
+            self.__warned = True
+        return None
+
+    def __delay_slope(self, ls: np.array) -> np.array:
+        # (frames, 1, 1) phase turn from a subcarrier to the next one in
+        # excess of the mean delay of the model, which is its delay spread
+        neighbours = pilot_neighbours(self.ofdm_config)
+        if neighbours is None:
+            return np.zeros((len(ls), 1, 1))
+        first, spacing = neighbours
+        turn = np.sum(ls[:, :, first + 1] * np.conj(ls[:, :, first]),
+                      axis=(1, 2), keepdims=True)
+        return np.angle(turn) / spacing + \
+            2 * np.pi * self.config.delay_spread / self.ofdm_config.fft_len
 
-    def process(self, symbols: np.array) -> np.array:
-        _, Nsc = symbols.shape
-        return np.ones(Nsc)
+    def __snr_bucket(self, ls: np.array, noise_var: np.array) -> np.array:
+        low, high = SNR_RANGE_DB
+        if noise_var is None:
+            return np.full(len(ls), float(high))
+        power = np.maximum(np.mean(np.abs(ls) ** 2, axis=(1, 2)) - noise_var,
+                           noise_var / 1e3)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            snr_db = 10 * np.log10(power / noise_var)
+        snr_db = np.where(noise_var > 0, snr_db, high)
+        step = self.config.snr_step_db
+        return np.clip(np.round(snr_db / step) * step, low, high)
@@ -1,7 +1,9 @@
 import numpy as np
 from numpy.fft import fft
+from numpy.fft import rfft
 
 from ...common.ofdm_config import OFDMconfig
+from ...common.pilots import frame_symbols
 from simulation.unit import SimUnit
 
 
@@ -10,24 +12,62 @@ class OFDMfrontend(SimUnit):
         super().__init__()
 
         self.config = config
-        self.__rm_gi_protector = {
-            'zero_padding': self.__rm_prefix_protector,
-            'cyclic_prefix': self.__rm_prefix_protector,
-            'cyclic_suffix': self.__rm_suffix_protector,
-        }[config.guard_interval_type]
+        # samples of the FFT window within an OFDM symbol
+        gi = config.guard_interval_length
+        self.__window = slice(0, config.fft_len) \
+            if config.guard_interval_type == 'cyclic_suffix' \
+            else slice(gi, gi + config.fft_len)
+        # OFDM symbols of a pilot frame
+        self.__frame_len = frame_symbols(config) * config.symbol_len
+        self.reset()
 
-    def __rm_prefix_protector(self, ofdm_symbols: np.array) -> np.array:
-        return ofdm_symbols[:, self.config.guard_interval_length:]
+    def process(self, ofdm_signal: np.array, out: np.array = None) -> np.array:
+        # the FFT reads a strided view of the signal, out is an optional
+        # complex128 (Nsymb, Nsc) buffer
+        symbol_len = self.config.symbol_len
+        if len(ofdm_signal) % self.__frame_len:
+            raise ValueError(f'{len(ofdm_signal)} samples is not a whole '
+                             f'number of OFDM frames of {self.__frame_len}')
 
-    def __rm_suffix_protector(self, ofdm_symbols: np.array) -> np.array:
-        return ofdm_symbols[:, :-self.config.guard_interval_length]
-
-    def process(self, ofdm_signal: np.array) -> np.array:
-        symbol_len = self.config.Nsc + self.config.guard_interval_length
         Nsymb = len(ofdm_signal) // symbol_len  # number of OFDM symbols
-        ofdm_symbols = np.resize(ofdm_signal, (Nsymb, symbol_len))
+        ofdm_symbols = ofdm_signal.reshape(Nsymb, symbol_len)[:, self.__window]
+
+        return self.__fft(ofdm_symbols, out)
+
+    def process_batch(self, ofdm_signals: np.array,
+                      out: np.array = None) -> np.array:
+        # (frames, samples) signals of independent transmissions to
+        # (frames, Nsymb, Nsc) symbols with a single FFT
+        symbol_len = self.config.symbol_len
+        batch, length = ofdm_signals.shape
+        if length % self.__frame_len:
+            raise ValueError(f'{length} samples per frame is not a whole '
+                             f'number of OFDM frames of {self.__frame_len}')
+
+        ofdm_symbols = ofdm_signals.reshape(
+            batch, length // symbol_len, symbol_len)[:, :, self.__window]
+
+        return self.__fft(ofdm_symbols, out)
+
+    def __fft(self, ofdm_symbols: np.array, out: np.array) -> np.array:
+        if not self.config.real:
+            return fft(ofdm_symbols, axis=-1, out=out)
+
+        # half the FFT of a complex signal, the subcarrier bins are taken
+        spectrum = rfft(ofdm_symbols, axis=-1)[..., self.config.bins]
+        if out is None:
+            return spectrum
+        out[...] = spectrum
+        return out
+
+    def process_block(self, ofdm_signal: np.array) -> np.array:
+        # samples of an incomplete OFDM frame wait for the next block
+        if len(self.__leftover):
+            ofdm_signal = np.concatenate((self.__leftover, ofdm_signal))
+        n = len(ofdm_signal) - len(ofdm_signal) % self.__frame_len
+        self.__leftover = ofdm_signal[n:]
 
-        ofdm_symbols = self.__rm_gi_protector(ofdm_symbols)
-        symbols = fft(ofdm_symbols, axis=1)
+        return self.process(ofdm_signal[:n])
 
-        return symbols
+    def reset(self):
+        self.__leftover = np.zeros(0, dtype=np.complex128)
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 from simulation.unit import SimUnit
@@ -6,39 +7,151 @@ from dsp.common.qam import QAMConstellation
 
 
 class QAMSoftDemodulator(SimUnit):
-    def __init__(self, constellation: QAMConstellation) -> None:
-        self.constellation = constellation
-
-        # suppose that constellation has rectangular layout
-        symbols = constellation.symbols
+    def __init__(self, constellation: QAMConstellation,
+                 soft: bool = False, chunk_size: int = 1 << 16) -> None:
+        super().__init__()
 
-        re_borders = np.zeros(symbols.shape[1], dtype=np.float64)
-        im_borders = np.zeros(symbols.shape[0], dtype=np.float64)
+        self.constellation = constellation
+        self.soft = soft  # LLRs instead of hard bits
+        self.chunk_size = chunk_size
 
-        re_borders[0] = -np.Inf
-        for k in range(1, symbols.shape[1]):
-            re_borders[k] = np.mean(np.real(symbols[0, k-1:k+1]))
+        self.nbits = constellation.pow
+        self.group = self.nbits // math.gcd(self.nbits, 8)  # bytes
 
-        im_borders[0] = -np.Inf
-        for k in range(1, symbols.shape[0]):
-            im_borders[k] = np.mean(np.imag(symbols[k-1:k+1, 0]))
+        # hard decisions quantize I/Q into a cell of the lookup table
+        self.__table, self.__ncols, self.__nrows, self.__scale = \
+            constellation.decision_table()
 
-        self.re_borders = re_borders
-        self.im_borders = im_borders
-        self.nbits = constellation.pow
+        if constellation.separable:
+            # values are row * columns + column, so the low bits select
+            # a column and the high bits a row: the LLR of a bit depends on
+            # one axis only
+            symbols, values = constellation.symbols, constellation.values
+            self.__axes = [
+                (np.real, np.real(symbols[0, :]).astype(np.float32),
+                 self.__bit_masks(values[0, :], self.nbits)),
+                (np.imag, np.imag(symbols[:, 0]).astype(np.float32),
+                 self.__bit_masks(values[:, 0], self.nbits)),
+            ]
+        else:
+            self.__axes = None
+            self.__masks = self.__bit_masks(np.arange(constellation.order),
+                                            self.nbits)
 
-    def process(self, symbols: np.array) -> np.array:
+    @staticmethod
+    def __bit_masks(values, nbits) -> list:
+        # (bit, points with the bit set) for every bit the axis defines
+        masks = []
+        for bit in range(nbits):
+            is_set = (values >> bit) & 1 == 1
+            if np.any(is_set) and not np.all(is_set):
+                masks.append((bit, is_set))
+        return masks
 
-        re = np.real(symbols)
-        im = np.imag(symbols)
+    def process(self, symbols: np.array, noise_var=1.0) -> np.array:
+        if self.soft:
+            return self.llr(symbols, noise_var)
 
-        re_idx = np.searchsorted(self.re_borders, re) - 1
-        im_idx = np.searchsorted(self.im_borders, im) - 1
+        return self.__bits(self.__decide(symbols))
 
-        values = self.constellation.values[im_idx, re_idx]
-        bits = np.unpackbits(values.astype(np.uint8)
-                                   .reshape((-1, 1)),
+    def __bits(self, values: np.array) -> np.array:
+        width = -(-self.nbits // 8)  # bytes per value
+        bits = np.unpackbits(values.astype(f'<u{width}')
+                                   .view(np.uint8)
+                                   .reshape((-1, width)),
                              axis=1,
                              bitorder='little',
                              )[:, :self.nbits].flatten()
         return bits
+
+    def process_batch(self, symbols: np.array, noise_var=1.0) -> np.array:
+        # (frames, ...) symbols of independent transmissions to (frames, bits)
+        # or LLRs; noise_var broadcasts to symbols, e.g. (frames, 1) per frame
+        if self.soft:
+            noise_var = np.broadcast_to(noise_var, symbols.shape)
+        return self.process(symbols, noise_var).reshape(len(symbols), -1)
+
+    def process_bytes(self, symbols: np.array, nbytes: int = None) -> np.array:
+        # hard decisions packed into uint8 little endian bit streams, the
+        # inverse of QAMModulator.process_bytes; zero padding bits are dropped
+        # whole bytes per symbol row when nbits divides 8, otherwise words of
+        # `group` bytes are shifted together in uint64, groups of 9 and 11
+        # bytes in two words. The padding of the last symbol may hold a whole
+        # zero byte when nbits is over 8, nbytes cuts it off.
+        if nbytes is None:
+            nbytes = np.size(symbols) * self.nbits // 8
+
+        dtype = np.dtype(np.uint8 if self.group == 1 else '<u8')
+        values = self.__decide(symbols).astype(dtype)
+        per_word = 8 * self.group // self.nbits  # symbols
+
+        padded = np.zeros(-(-len(values) // per_word) * per_word, dtype=dtype)
+        padded[:len(values)] = values
+        padded = padded.reshape((-1, per_word))
+
+        if self.group == 1:
+            words = np.zeros(len(padded), dtype=dtype)
+            for k in range(per_word):
+                words |= padded[:, k] << dtype.type(k * self.nbits)
+            return words[:nbytes]
+
+        nwords = -(-self.group // 8)
+        words = np.zeros((len(padded), nwords), dtype=dtype)
+        for k in range(per_word):
+            word, shift = divmod(k * self.nbits, 64)
+            words[:, word] |= padded[:, k] << np.uint64(shift)
+            if shift + self.nbits > 64:
+                words[:, word + 1] |= padded[:, k] >> np.uint64(64 - shift)
+
+        output = words.view(np.uint8)[:, :self.group]
+        return output.reshape(-1)[:nbytes]
+
+    def __decide(self, symbols: np.array) -> np.array:
+        col_scale, row_scale = self.__scale
+        cols = np.rint((np.real(symbols) + 1) * col_scale)
+        idxs = np.clip(cols, 0, self.__ncols - 1).astype(np.intp)
+        if self.__nrows > 1:
+            rows = np.rint((np.imag(symbols) + 1) * row_scale)
+            idxs += self.__ncols * \
+                np.clip(rows, 0, self.__nrows - 1).astype(np.intp)
+
+        values = self.__table[idxs]
+        corner = values < 0
+        if np.any(corner):
+            points = self.constellation.points
+            values[corner] = np.argmin(np.abs(
+                symbols[corner][:, None] - points[None, :]), axis=1)
+        return values
+
+    @staticmethod
+    def __min_distances(llrs, dist, masks):
+        for bit, is_set in masks:
+            llrs[:, bit] = np.min(dist[:, is_set], axis=1)
+            llrs[:, bit] -= np.min(dist[:, ~is_set], axis=1)
+
+    def llr(self, symbols: np.array, noise_var=1.0) -> np.array:
+        # max-log LLR = log P(b = 0) / P(b = 1), bits are laid out as process()
+        # lays them out. noise_var is a scalar or has the trailing shape of
+        # symbols, e.g. per subcarrier of (Nsymb * Nsc) flattened symbols.
+        noise_var = np.asarray(noise_var, dtype=np.float32)
+        symbols = np.asarray(symbols).reshape((-1, *noise_var.shape))
+        scale = np.broadcast_to(1 / noise_var, symbols.shape).reshape(-1)
+        symbols = symbols.reshape(-1)
+
+        llrs = np.empty((len(symbols), self.nbits), dtype=np.float32)
+        points = self.constellation.points.astype(np.complex64)
+        for start in range(0, len(symbols), self.chunk_size):
+            chunk = slice(start, start + self.chunk_size)
+            if self.__axes:
+                for part, axis_points, masks in self.__axes:
+                    axis = part(symbols[chunk]).astype(np.float32)
+                    dist = np.square(axis[:, None] - axis_points[None, :])
+                    self.__min_distances(llrs[chunk], dist, masks)
+            else:
+                # distances to all the points
+                received = symbols[chunk].astype(np.complex64)
+                dist = np.abs(received[:, None] - points[None, :]) ** 2
+                self.__min_distances(llrs[chunk], dist, self.__masks)
+            llrs[chunk] *= scale[chunk, None]
+
+        return llrs.reshape(-1)
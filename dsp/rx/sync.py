@@ -0,0 +1,82 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+from simulation.unit import SimUnit
+
+from ..common.ofdm_config import OFDMconfig
+
+
+@dataclass(frozen=True)
+class SchmidlCoxSyncConfig:
+    threshold: float = 0.4  # of the timing metric, detects the preamble
+    plateau: float = 0.9  # of the metric maximum, bounds the CP plateau
+    backoff: int = 0  # samples to start the FFT windows early, into the CP
+
+
+def _window_sum(values: np.array, length: int) -> np.array:
+    # sums of all the `length` long windows in O(N) with a running sum
+    cumsum = np.concatenate(([0], np.cumsum(values)))
+    return cumsum[length:] - cumsum[:-length]
+
+
+class SchmidlCoxSync(SimUnit):
+    def __init__(self, ofdm_config: OFDMconfig,
+                 config: SchmidlCoxSyncConfig = None) -> None:
+        super().__init__()
+
+        self.ofdm_config = ofdm_config
+        self.config = config or SchmidlCoxSyncConfig()
+
+        self.detected = False
+        self.offset = None  # first sample after the training symbol
+        self.cfo = 0.0  # fractional, cycles per sample
+
+    def metric(self, signal: np.array):
+        # M(d) = |P(d)|^2 / R(d)^2 of the halves starting at d, R is the
+        # mean energy of both halves, so M <= 1 also where noise follows
+        # the signal
+        half = self.ofdm_config.fft_len // 2
+        corr = _window_sum(np.conj(signal[:-half]) * signal[half:], half)
+        power = np.abs(signal) ** 2
+        energy = (_window_sum(power[:-half], half) +
+                  _window_sum(power[half:], half)) / 2
+
+        floor = 1e-3 * np.mean(energy) if len(energy) else 0
+        return np.abs(corr) ** 2 / np.maximum(energy, floor) ** 2, corr
+
+    def process(self, signal: np.array) -> np.array:
+        # returns the CFO corrected signal after the training symbol, the
+        # signal is returned as it is when there is no preamble. A real
+        # baseband signal has no CFO to correct.
+        fft_len = self.ofdm_config.fft_len
+        gi = self.ofdm_config.guard_interval_length
+        metric, corr = self.metric(signal)
+
+        peak = int(np.argmax(metric)) if len(metric) else 0
+        self.detected = len(metric) > 0 and \
+            metric[peak] >= self.config.threshold
+        if not self.detected:
+            self.logger.warning('no preamble detected')
+            self.offset, self.cfo = None, 0.0
+            return signal
+
+        # the metric has a plateau over the CP, it starts gi before the
+        # training symbol. The data following the training symbol keeps the
+        # metric up past the plateau end, the start edge is the sharp one.
+        above = metric >= self.config.plateau * metric[peak]
+        first = peak - np.argmin(above[peak::-1]) + 1 \
+            if not np.all(above[:peak + 1]) else 0
+        start = first + gi
+
+        self.cfo = 0.0 if self.ofdm_config.real else \
+            float(np.angle(corr[peak]) / (np.pi * fft_len))
+        self.offset = max(start + fft_len - self.config.backoff, 0)
+        self.logger.debug(f'preamble at {start}, metric {metric[peak]:.3f}, '
+                          f'cfo {self.cfo:.3e} cycles per sample')
+        self.store(sync_metric=metric)
+
+        if self.ofdm_config.real:
+            return signal[self.offset:]
+        n = np.arange(self.offset, len(signal))
+        return signal[self.offset:] * np.exp(-2j * np.pi * self.cfo * n)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+from simulation.unit import SimUnit
+
+from ..common.nco import Nco
+from ..common.resampling.poly import PolyResampler
+from ..common.resampling.poly import PolyResamplerConfig
+
+
+@dataclass(frozen=True)
+class DUCConfig:
+    fc: float  # carrier, Hz
+    rate: int  # output sample rate, Hz
+    interpolation: int  # output samples per input sample
+    taps: tuple = None  # interpolation FIR at the output rate, None designs it
+
+
+class DUC(SimUnit):
+    # complex baseband to the real passband signal Re{x(t) exp(2j pi fc t)}:
+    # a polyphase interpolating FIR and the NCO mixing in one pass
+
+    def __init__(self, config: DUCConfig) -> None:
+        super().__init__()
+
+        self.config = config
+        self.interpolator = PolyResampler(PolyResamplerConfig(
+            fin=1, fout=config.interpolation, taps=config.taps))
+        self.nco = Nco(config.fc, config.rate)
+
+    def process(self, envelope: np.array) -> np.array:
+        signal = self.interpolator.process(envelope)
+        return self.__mix(signal, self.nco.phasors(0, len(signal)))
+
+    def process_block(self, envelope: np.array) -> np.array:
+        signal = self.interpolator.process_block(envelope)
+        return self.__mix(signal, self.nco.process(len(signal)))
+
+    def flush(self):
+        tail = self.interpolator.flush()
+        output = self.__mix(tail, self.nco.process(len(tail))) \
+            if tail is not None else None
+        self.nco.reset()
+        return output
+
+    def reset(self):
+        self.interpolator.reset()
+        self.nco.reset()
+
+    @staticmethod
+    def __mix(signal: np.array, phasors: np.array) -> np.array:
+        # the real part of the product only
+        return np.real(signal) * phasors.real - np.imag(signal) * phasors.imag
@@ -1,7 +1,11 @@
 import numpy as np
 from numpy.fft import ifft
+from numpy.fft import irfft
 
 from ..common.ofdm_config import OFDMconfig
+from ..common.pilots import pilot_mask
+from ..common.pilots import pilot_symbols
+from ..common.pilots import data_per_frame
 from simulation.unit import SimUnit
 
 
@@ -10,36 +14,93 @@ class OFDM(SimUnit):
         super().__init__()
 
         self.config = config
-        self.__add_gi_protector = {
-            'zero_padding': self.__add_zero_padding,
-            'cyclic_prefix': self.__add_cyclic_prefix,
-            'cyclic_suffix': self.__add_cyclic_suffix
+        self.__fill_gi = {
+            'zero_padding': self.__fill_zero_padding,
+            'cyclic_prefix': self.__fill_cyclic_prefix,
+            'cyclic_suffix': self.__fill_cyclic_suffix
         }[config.guard_interval_type]
+        # where the IFFT output goes within a frame row
+        gi = config.guard_interval_length
+        self.__body = slice(0, config.fft_len) \
+            if config.guard_interval_type == 'cyclic_suffix' \
+            else slice(gi, gi + config.fft_len)
 
-    def __add_cyclic_prefix(self, ofdm_symbols: np.array) -> np.array:
-        n, _ = ofdm_symbols.shape
-        return np.concatenate((
-            ofdm_symbols[:, -self.config.guard_interval_length:],
-            ofdm_symbols,
-        ), axis=1)
-
-    def __add_cyclic_suffix(self, ofdm_symbols: np.array) -> np.array:
-        n, _ = ofdm_symbols.shape
-        return np.concatenate((
-            ofdm_symbols,
-            ofdm_symbols[:, :self.config.guard_interval_length],
-        ), axis=1)
-
-    def __add_zero_padding(self, ofdm_symbols: np.array) -> np.array:
-        n, _ = ofdm_symbols.shape
-        return np.concatenate((
-            np.zeros((n, self.config.guard_interval_length)),
-            ofdm_symbols,
-        ), axis=1)
-
-    def process(self, symbols: np.array) -> np.array:
-        L = len(symbols) // self.config.Nsc  # number of OFDM symbols
-        symbols = symbols.reshape(L, self.config.Nsc)
-        ofdm_symbols = ifft(symbols, axis=1)
-
-        return self.__add_gi_protector(ofdm_symbols).flatten()
+        self.__mask = pilot_mask(config)
+        self.__pilots = pilot_symbols(config)
+        self.__per_frame = data_per_frame(config)  # data symbols
+        self.reset()
+
+    def __fill_cyclic_prefix(self, frame: np.array):
+        gi = self.config.guard_interval_length
+        frame[:, :gi] = frame[:, frame.shape[1] - gi:]
+
+    def __fill_cyclic_suffix(self, frame: np.array):
+        gi = self.config.guard_interval_length
+        frame[:, self.config.fft_len:] = frame[:, :gi]
+
+    def __fill_zero_padding(self, frame: np.array):
+        frame[:, :self.config.guard_interval_length] = 0
+
+    def process(self, symbols: np.array, out: np.array = None) -> np.array:
+        # out is an optional complex128 (float64 for the real baseband) buffer
+        # of the output length, the IFFT writes straight into the symbol part
+        # of every frame row
+        Nsc = self.config.Nsc
+        if len(symbols) % self.__per_frame:
+            raise ValueError(f'{len(symbols)} symbols is not a whole number '
+                             f'of OFDM frames of {self.__per_frame} symbols')
+
+        F = len(symbols) // self.__per_frame  # number of pilot frames
+        L = F * self.__mask.shape[0]  # number of OFDM symbols
+        symbol_len = self.config.symbol_len
+        if out is None:
+            out = np.empty(L * symbol_len, dtype=np.float64
+                           if self.config.real else np.complex128)
+        frame = out.reshape(L, symbol_len)  # a view, out has to be flat
+
+        if len(self.__pilots):
+            grid = np.empty((F, *self.__mask.shape), dtype=np.complex128)
+            grid[:, self.__mask] = self.__pilots
+            grid[:, ~self.__mask] = symbols.reshape(F, -1)
+            symbols = grid
+
+        if self.config.real:
+            # the subcarriers go to their bins of the one sided spectrum,
+            # irfft makes the signal real
+            fft_len = self.config.fft_len
+            spectrum = np.zeros((L, fft_len // 2 + 1), dtype=np.complex128)
+            spectrum[:, self.config.bins] = symbols.reshape(L, Nsc)
+            irfft(spectrum, n=fft_len, axis=1, out=frame[:, self.__body])
+        else:
+            ifft(symbols.reshape(L, Nsc), axis=1, out=frame[:, self.__body])
+        self.__fill_gi(frame)
+
+        return out
+
+    def process_batch(self, symbols: np.array, out: np.array = None) -> np.array:
+        # (frames, ...) data symbols of independent transmissions, e.g.
+        # (frames, symbols, Nsc) without pilots, to (frames, samples) signals.
+        # OFDM symbols do not depend on each other, so all the frames go
+        # through a single IFFT.
+        batch = len(symbols)
+        symbols = symbols.reshape(batch, -1)
+        if symbols.shape[1] % self.__per_frame:
+            raise ValueError(f'{symbols.shape[1]} symbols per frame is not a '
+                             f'whole number of OFDM frames of '
+                             f'{self.__per_frame} symbols')
+
+        signal = self.process(symbols.reshape(-1),
+                              out=None if out is None else out.reshape(-1))
+        return signal.reshape(batch, -1)
+
+    def process_block(self, symbols: np.array) -> np.array:
+        # symbols of an incomplete OFDM frame wait for the next block
+        if len(self.__leftover):
+            symbols = np.concatenate((self.__leftover, symbols))
+        n = len(symbols) - len(symbols) % self.__per_frame
+        self.__leftover = symbols[n:]
+
+        return self.process(symbols[:n])
+
+    def reset(self):
+        self.__leftover = np.zeros(0, dtype=np.complex128)
@@ -0,0 +1,29 @@
+import numpy as np
+
+from ..common.ofdm_config import OFDMconfig
+from ..common.preamble import training_symbol
+from simulation.unit import SimUnit
+
+
+class SchmidlCoxPreamble(SimUnit):
+    def __init__(self, config: OFDMconfig) -> None:
+        super().__init__()
+
+        self.config = config
+        symbol = training_symbol(config)
+        gi = config.guard_interval_length
+        # the training symbol is protected with a cyclic prefix
+        self.preamble = np.concatenate((symbol[len(symbol) - gi:], symbol))
+        self.reset()
+
+    def process(self, ofdm_signal: np.array) -> np.array:
+        return np.concatenate((self.preamble, ofdm_signal))
+
+    def process_block(self, ofdm_signal: np.array) -> np.array:
+        if self.__sent:
+            return ofdm_signal
+        self.__sent = True
+        return self.process(ofdm_signal)
+
+    def reset(self):
+        self.__sent = False
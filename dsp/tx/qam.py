@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 from simulation.unit import SimUnit
@@ -7,16 +8,76 @@ from dsp.common.qam import QAMConstellation
 
 class QAMModulator(SimUnit):
     def __init__(self, constellation: QAMConstellation) -> None:
+        super().__init__()
+
         self.constellation = constellation
 
-        table = np.zeros(constellation.order, dtype=np.complex128)
-        for symb, val in constellation.mapping:
-            table[val] = symb
+        table = constellation.points
         self.table = table
         self.nbits = constellation.pow
 
+        # bytes are little endian bit streams, the same bit order as process()
+        # packs bits in. Bytes hold a whole number of symbols, when nbits
+        # divides 8, so every byte maps to a row of symbols.
+        self.group = self.nbits // math.gcd(self.nbits, 8)  # bytes
+        if self.group == 1:
+            shifts = np.arange(0, 8, self.nbits)
+            mask = constellation.order - 1
+            self.byte_table = table[(np.arange(256)[:, None] >> shifts) & mask]
+        self.reset()
+
     def process(self, data: np.array) -> np.array:
         idxs = np.packbits(data.reshape((-1, self.nbits)),
-                           axis=1, bitorder='little').flatten()
+                           axis=1, bitorder='little')
+        if idxs.shape[1] > 1:  # orders above 256
+            idxs = idxs.view('<u2')
+        idxs = idxs.flatten()
 
         return self.table[idxs]
+
+    def process_batch(self, data: np.array) -> np.array:
+        # (frames, bits) of independent transmissions to (frames, symbols)
+        return self.process(data.reshape(-1)).reshape(len(data), -1)
+
+    def process_bytes(self, data) -> np.array:
+        # bytes, bytearray, memoryview or uint8 array, the last symbol is
+        # padded with zero bits
+        data = np.frombuffer(data, dtype=np.uint8)
+        if self.group == 1:
+            return self.byte_table[data].reshape(-1)
+
+        # groups of 9 and 11 bytes take two uint64 words, a symbol crossing
+        # the word boundary gets its high bits from the second one
+        nsymb = -(-8 * len(data) // self.nbits)
+        nwords = -(-self.group // 8)
+        padded = np.zeros(-(-len(data) // self.group) * self.group,
+                          dtype=np.uint8)
+        padded[:len(data)] = data
+        words = np.zeros((len(padded) // self.group, 8 * nwords),
+                         dtype=np.uint8)
+        words[:, :self.group] = padded.reshape((-1, self.group))
+        words = words.view('<u8')
+
+        shifts = np.arange(0, 8 * self.group, self.nbits, dtype=np.uint64)
+        if nwords == 1:
+            idxs = words >> shifts
+        else:
+            idxs = np.empty((len(words), len(shifts)), dtype=np.uint64)
+            for k, offset in enumerate(shifts):
+                word, shift = divmod(int(offset), 64)
+                idxs[:, k] = words[:, word] >> np.uint64(shift)
+                if shift + self.nbits > 64:
+                    idxs[:, k] |= words[:, word + 1] << np.uint64(64 - shift)
+        idxs &= np.uint64(self.constellation.order - 1)
+        return self.table[idxs.reshape(-1)[:nsymb]]
+
+    def process_block(self, data: np.array) -> np.array:
+        # bits of an incomplete symbol wait for the next block
+        data = np.concatenate((self.__leftover, data))
+        n = len(data) - len(data) % self.nbits
+        self.__leftover = data[n:]
+
+        return self.process(data[:n])
+
+    def reset(self):
+        self.__leftover = np.zeros(0, dtype=np.int64)
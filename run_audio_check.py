@@ -4,6 +4,7 @@ import logging
 import matplotlib.pyplot as plt
 
 from simulation.params import SimParams
+from simulation.context import SimContext
 from simulation.datastore import DataStore
 from simulation.datastore import DataStoreConfig
 
@@ -17,17 +18,18 @@ from scipy.signal import chirp
 # Config
 #
 
-SimParams(
-    fc=int(10e3),
-    fs=int(20e3),
+context = SimContext(
+    params=SimParams(
+        fc=int(10e3),
+        fs=int(20e3),
+    ),
+    datastore=DataStore(
+        DataStoreConfig(
+            names=[],
+            path='',
+        )),
 )
 
-DataStore(
-    DataStoreConfig(
-        names=[],
-        path='',
-    ))
-
 RATE = 48000
 
 # Configure Logger
@@ -53,7 +55,8 @@ if __name__ == "__main__":
                 channels=1,
                 format='',
                 device="default",
-            )) as ch:
+            ),
+            context=context) as ch:
         input_q = ch.route_audio(signal_q)
 
     t_in = np.arange(len(input_q)) / RATE
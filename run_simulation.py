@@ -1,19 +1,43 @@
+import csv
 import logging
 import argparse
-import importlib
-import traceback
 import yaml
 
-from simulation.params import SimParams
-from simulation.datastore import DataStore
-from simulation.datastore import DataStoreConfig
+from simulation import profiling
+from simulation.cache import ResultCache
+from simulation.distributed import serve
+from simulation.sweep import build_axes
+from simulation.sweep import expand_grid
+from simulation.sweep import run_point
+from simulation.sweep import run_sweep
+from simulation.sweep import collect_table
+from simulation.sweep import format_table
 
 parser = argparse.ArgumentParser(description='update YAML configuration.')
 parser.add_argument('-c', '--config', type=str,
                     help='path to the YAML initial config file.')
 parser.add_argument('--set', action='append', nargs=2, metavar=('key', 'value'),
-                    help='Set config parameter. Example: --set param1.name value1')
-parser.add_argument('scenario', type=str, help='a scenario to run')
+                    help='Set config parameter. Example: --set param1.name value1, '
+                    'comma separated values are swept: --set param1.name v1,v2')
+parser.add_argument('-j', '--jobs', type=int, default=None,
+                    help='number of worker processes for a sweep, all cores by default')
+parser.add_argument('-o', '--output', type=str, default=None,
+                    help='path to the CSV file with sweep results')
+parser.add_argument('--profile', action='store_true', default=False,
+                    help='time every unit and print the per-stage table')
+parser.add_argument('--profile-output', type=str, default='out/profile.json',
+                    help='path to the JSON file with the per-stage profile')
+parser.add_argument('--cache', type=str, default='out/cache.sqlite',
+                    help='SQLite cache of seeded simulation results')
+parser.add_argument('--no-cache', action='store_true', default=False,
+                    help='neither look up nor store results in the cache')
+parser.add_argument('--serve', type=str, default=None, metavar='HOST:PORT',
+                    help='run as a sweep worker, listening on HOST:PORT')
+parser.add_argument('--workers', type=str, nargs='+', default=None,
+                    metavar='HOST:PORT',
+                    help='run the sweep points on remote --serve workers')
+parser.add_argument('scenario', type=str, nargs='?',
+                    help='a scenario to run')
 
 
 def include_constructor(loader, node):
@@ -40,6 +64,15 @@ if __name__ == '__main__':
 
     args = parser.parse_args()
 
+    if args.serve:
+        # a worker gets the scenario and the config with every job
+        logging.basicConfig(level=logging.INFO)
+        serve(args.serve)
+        parser.exit()
+
+    if not args.scenario or not args.config:
+        parser.error('a config and a scenario are required')
+
     config = load_config(args.config)
     if isinstance(config, list):
         combined_data = {}
@@ -47,30 +80,59 @@ if __name__ == '__main__':
             combined_data.update(item)
         config = combined_data
 
-    if args.set:
-        for key, value in args.set:
-            field = config
-            for entry in key.split('.'):
-                field = field[entry]
-            field = value
+    axes = build_axes(config, args.set)
+
     logging.basicConfig(**config['logging'])
     for module in ['matplotlib', 'PIL']:
         logger = logging.getLogger(module)
         logger.setLevel(level=logging.CRITICAL)
 
-    SimParams(**config['SimParams'])
-
-    dsconfig = DataStoreConfig(**config['DataStore'])
-    ds = DataStore(config=dsconfig)
-
-    scenario = importlib.import_module(args.scenario).Scenario()
-
-    try:
-        scenario.run(config)
-
-    except Exception as e:
-        logging.critical(f"Oops: {type(e).__name__}: {e}. Simulation stopped")
-        traceback.print_exception(e)
-
-    finally:
-        ds.flush()
+    if args.profile:
+        profiling.enable()
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+    failed = False
+
+    if not axes:
+        key = cache.key(args.scenario, config) if cache else None
+        result = cache.get(key) if cache else None
+        if result is not None:
+            logging.info(f'cached result: {result}')
+            print(f'cached result: {result}')
+
+        else:
+            outcome = run_point(args.scenario, config)
+            if outcome['error']:
+                failed = True
+                logging.error(f'point failed: {outcome["error"]}')
+                print(f'error: {outcome["error"]}')
+            else:
+                logging.info(f'result: {outcome["result"]}')
+                print(f'result: {outcome["result"]}')
+                if cache:
+                    cache.put(key, args.scenario, config, outcome['result'],
+                              outcome['probes'])
+
+    else:
+        results = run_sweep(args.scenario, config,
+                            points=expand_grid(axes),
+                            processes=args.jobs,
+                            profile=args.profile,
+                            cache=cache,
+                            workers=args.workers)
+
+        columns, rows = collect_table(results)
+        print(format_table(columns, rows))
+
+        if args.output:
+            with open(args.output, 'w', newline='') as fd:
+                writer = csv.writer(fd)
+                writer.writerow(columns)
+                writer.writerows(rows)
+
+    if args.profile:
+        print(profiling.report())
+        profiling.dump(args.profile_output)
+
+    if failed:
+        parser.exit(1)
@@ -1,129 +1,192 @@
 import numpy as np
 import logging
 
-from scipy.signal import lfilter
-from numpy import concatenate as cat
-
 from test.audio import AudioChannelConfig
-from test.audio import RawAudioChannel
 
-from simulation.params import SimParams
-from simulation.datastore import DataStore
+from simulation.context import SimContext
+from simulation.montecarlo import MonteCarloConfig
+from simulation.montecarlo import run_until
 
 from dsp.common.qam import QAMConstellation
-from dsp.common.resampling.fft import FftUpsampler
 
 from dsp.tx.qam import QAMModulator
 from dsp.rx.qam import QAMSoftDemodulator
 
 from dsp.tx.ofdm import OFDM, OFDMconfig
+from dsp.tx.duc import DUC, DUCConfig
+from dsp.tx.preamble import SchmidlCoxPreamble
+from dsp.rx.ddc import DDC, DDCConfig
+from dsp.rx.sync import SchmidlCoxSync
+from dsp.rx.sync import SchmidlCoxSyncConfig
+from dsp.common.pilots import frame_symbols
+from dsp.common.pilots import data_per_frame
+from dsp.common.pilots import pilot_mask
 
 from dsp.rx.ofdm.frontend import OFDMfrontend
 from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizerConfig
 from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.estimator import OFDMChannleEstimatorConfig
 from dsp.rx.ofdm.chain import OFDMRxChain
 
-# FIR 16 taps, Low pass filter, cutoff = 2 kHz
-b_lo = np.array([0.03157319, 0.04156552, 0.05169825, 0.06138433, 0.07002734,
-                 0.07707174, 0.08205098, 0.08462865, 0.08462865, 0.08205098,
-                 0.07707174, 0.07002734, 0.06138433, 0.05169825, 0.04156552,
-                 0.03157319])
-
-# FIR 16 taps, Band pass filter, F_lo = 3 kHz F_hi = 5 kHz
-b_bp = np.array([-0.06280036, -0.09516154, -0.10379872, -0.0815819, -0.03158135,
-                 0.03292086,  0.09244693,  0.12802351,  0.12802351,  0.09244693,
-                 0.03292086, -0.03158135, -0.0815819, -0.10379872, -0.09516154,
-                 -0.06280036])
+from dsp.metrics.evm import EvmMeter
+from dsp.metrics.errors import BitErrorCounter
 
 
 class Scenario:
 
     def run(self, config: dict):
 
-        params = SimParams()
-        ds = DataStore()
+        context = SimContext.current()
+        params = context.params
+        ds = context.datastore
 
         scenario_cfg = config['scenario']
         audio_cfg = AudioChannelConfig(**config['AudioChannelConfig'])
 
+        ofdm_config = OFDMconfig(**config['OFDMconfig'])
+
+        # Nsymb OFDM symbols make whole pilot frames
         Nsymb = scenario_cfg['Nsymb']
-        payload_len = Nsymb * config['OFDMconfig']['Nsc'] * \
-            int(np.log2(scenario_cfg['constellation']['order']))
-        audio_upscale_factor = audio_cfg.rate // params.fs
+        Nframes = Nsymb // frame_symbols(ofdm_config)
+        assert Nframes * frame_symbols(ofdm_config) == Nsymb
+        # the payload bytes take the data cells, the bits short of a whole
+        # byte fill the last cells with zeros
+        data_cells = Nframes * data_per_frame(ofdm_config)
+        payload_len = data_cells * \
+            int(np.log2(scenario_cfg['constellation']['order'])) // 8  # bytes
+        # the real baseband OFDM symbols are generated at the audio rate
+        audio_upscale_factor = 1 if ofdm_config.real \
+            else audio_cfg.rate // params.fs
         logging.info(f'\t Symbols amount: {Nsymb}')
-        logging.info(f'\t bit len: {payload_len}')
+        logging.info(f'\t bit len: {8 * payload_len}')
         logging.info(f'\t Audio upscale factor: {audio_upscale_factor}')
 
+        # a single frame unless the Monte-Carlo section is configured
+        mc_config = MonteCarloConfig(**config['MonteCarloConfig']) \
+            if 'MonteCarloConfig' in config \
+            else MonteCarloConfig(target_errors=0, max_bits=8 * payload_len)
+
         logging.info(f'============ Build up a transmitter ============')
-        ofdm_config = OFDMconfig(**config['OFDMconfig'])
         ofdm_modulator = OFDM(config=ofdm_config)
 
         constellation = QAMConstellation(**scenario_cfg['constellation'])
         modulator = QAMModulator(constellation=constellation)
 
-        upsampler = FftUpsampler(scale=audio_upscale_factor)
-
-        payload = np.random.randint(0, 2, payload_len)
-        tx_symbols = modulator.process(payload)
-        ofdm_signal = ofdm_modulator.process(tx_symbols)
-        ds.store(payload=payload, tx_symbols=tx_symbols,
-                 ofdm_signal=ofdm_signal)
-
-        # Upconversion
-        envelope = upsampler.process(ofdm_signal)
-        time = np.arange(len(envelope)) / audio_cfg.rate
-        ref = np.exp(-1j*2*np.pi*params.fc*time)
-        iq_signal = envelope * ref
-        signal = np.real(iq_signal)
-        ds.store(tx_envelope=envelope)
-
-        #
-        # TODO: Transmit & Receive over the audio device
-        #
-        prefix_len = 0  # np.random.randint(100, 1000)
-        suffix_len = 0  # np.random.randint(100, 1000)
-        recv_iq_signal = np.pad(signal, (prefix_len, suffix_len))
-        ds.store(tx_signal=signal,
-                 prefix_len=prefix_len,
-                 suffix_len=suffix_len,
-                 recv_iq_signal=recv_iq_signal)
-
-        #
-        # Receiver
-        #
+        preamble = SchmidlCoxPreamble(config=ofdm_config)
+        duc = DUC(config=DUCConfig(fc=params.fc, rate=audio_cfg.rate,
+                                   interpolation=audio_upscale_factor,
+                                   **scenario_cfg.get('duc', {})))
+
         logging.info(f'============ Build up a receiver ============')
+        ddc = DDC(config=DDCConfig(fc=params.fc, rate=audio_cfg.rate,
+                                   decimation=audio_upscale_factor,
+                                   **scenario_cfg.get('ddc', {})))
+        sync = SchmidlCoxSync(
+            ofdm_config=ofdm_config,
+            config=SchmidlCoxSyncConfig(**scenario_cfg.get('sync', {})))
         ofdm_rx_chain = OFDMRxChain(
             frontend=OFDMfrontend(config=ofdm_config),
-            estimator=OFDMChannleEstimator(),
-            equalizer=OFDMChannleEqualizer(),
+            estimator=OFDMChannleEstimator(
+                ofdm_config=ofdm_config,
+                config=OFDMChannleEstimatorConfig(
+                    **scenario_cfg.get('estimator', {}))),
+            equalizer=OFDMChannleEqualizer(
+                config=OFDMChannleEqualizerConfig(
+                    **scenario_cfg.get('equalizer', {}))),
         )
         demodulator = QAMSoftDemodulator(constellation=constellation)
 
-        # Filtering
-        filt_iq_signal = lfilter(
-            x=cat((recv_iq_signal, np.zeros(len(b_bp)))),
-            b=b_bp,
-            a=1)
-
-        # Downconversion
-        time = np.arange(len(filt_iq_signal)) / audio_cfg.rate
-        ref = np.exp(-1j*2*np.pi*params.fc*time)
-        downconv_iq_signal = filt_iq_signal * ref
-        filtered_iq_signal = lfilter(
-            x=cat((downconv_iq_signal, np.zeros(len(b_lo)))),
-            b=b_lo,
-            a=1)
-        rx_ofdm_signal = filtered_iq_signal[15::audio_upscale_factor]
-        ds.store(downconv_iq_signal=downconv_iq_signal,
-                 rx_ofdm_signal=rx_ofdm_signal)
-
-        # OFDM demodulation
-        rx_symbols = ofdm_rx_chain.process(rx_ofdm_signal)
-        ds.store(rx_symbols=rx_symbols)
-
-        # symbol demodulation
-        payload_hat = demodulator.process(rx_symbols)
-
-        ber = np.sum(
-            np.abs(payload - payload_hat)) / payload.shape[0]
-        logging.info(f'Simulation has finished. Estimated BER: {ber}')
+        snr_db = scenario_cfg.get('snr_db', None)
+        max_delay = scenario_cfg.get('max_delay', 0)  # audio samples
+        # per subcarrier, the ones carrying only pilots have no MER
+        evm_meter = EvmMeter(Nsc=ofdm_config.Nsc)
+        subcarriers = np.tile(np.nonzero(~pilot_mask(ofdm_config))[1], Nframes)
+
+        def frame():
+            payload = np.random.randint(0, 256, payload_len, dtype=np.uint8)
+            tx_symbols = modulator.process_bytes(payload)
+            tx_symbols = np.concatenate((tx_symbols, np.full(
+                data_cells - len(tx_symbols), constellation.points[0])))
+            ofdm_signal = ofdm_modulator.process(tx_symbols)
+            if ds.enabled:
+                ds.store(payload=payload, tx_symbols=tx_symbols,
+                         ofdm_signal=ofdm_signal)
+
+            if ofdm_config.real:
+                # the subcarriers are in the passband at the audio rate
+                # already, the signal is real
+                signal = preamble.process(ofdm_signal)
+            else:
+                envelope = preamble.process(ofdm_signal)
+                signal = duc.process(envelope)
+                if ds.enabled:
+                    ds.store(tx_envelope=envelope)
+
+            #
+            # TODO: Transmit & Receive over the audio device
+            #
+            prefix_len = np.random.randint(0, max_delay + 1)
+            suffix_len = np.random.randint(0, max_delay + 1)
+            recv_iq_signal = np.pad(signal, (prefix_len, suffix_len))
+
+            if snr_db is not None:
+                noise_power = np.mean(signal ** 2) / 10 ** (snr_db / 10)
+                recv_iq_signal = recv_iq_signal + \
+                    np.sqrt(noise_power) * np.random.randn(len(recv_iq_signal))
+            if ds.enabled:
+                ds.store(tx_signal=signal,
+                         prefix_len=prefix_len,
+                         suffix_len=suffix_len,
+                         recv_iq_signal=recv_iq_signal)
+
+            #
+            # Receiver
+            #
+
+            if ofdm_config.real:
+                # the receiver FFT picks the subcarrier bins out
+                rx_baseband = recv_iq_signal
+            else:
+                rx_baseband = ddc.process(recv_iq_signal)
+                if ds.enabled:
+                    ds.store(rx_baseband=rx_baseband)
+
+            # Synchronization, the data follows the training symbol. The
+            # delay and filter tails make a partial OFDM symbol at the end.
+            rx_ofdm_signal = sync.process(rx_baseband)[:len(ofdm_signal)]
+            rx_ofdm_signal = np.pad(
+                rx_ofdm_signal, (0, len(ofdm_signal) - len(rx_ofdm_signal)))
+            if ds.enabled:
+                ds.store(rx_ofdm_signal=rx_ofdm_signal,
+                         sync_offset=sync.offset,
+                         sync_cfo=sync.cfo)
+
+            # OFDM demodulation
+            rx_symbols = ofdm_rx_chain.process(rx_ofdm_signal)
+            if ds.enabled:
+                ds.store(rx_symbols=rx_symbols)
+            evm_meter.update(tx_symbols, rx_symbols[:data_cells], subcarriers)
+
+            # symbol demodulation
+            nsymb = -(-8 * payload_len // constellation.pow)
+            payload_hat = demodulator.process_bytes(rx_symbols[:nsymb],
+                                                    payload_len)
+
+            counter = BitErrorCounter()
+            counter.update(payload, payload_hat)
+            return counter
+
+        if snr_db is not None:
+            logging.info(f'\t AWGN: snr {snr_db} dB')
+
+        estimate = run_until(frame, mc_config)
+        logging.info(f'Simulation has finished. Estimated BER: {estimate.ber}, '
+                     f'{mc_config.confidence:.0%} CI '
+                     f'[{estimate.ci_low}, {estimate.ci_high}]')
+
+        logging.info(f'EVM: {evm_meter.evm}, MER per subcarrier, dB: '
+                     f'{np.round(evm_meter.mer_db, 1)}')
+        ds.store(mer_db=evm_meter.mer_db)
+
+        return {**estimate.as_dict(), 'evm': evm_meter.evm}
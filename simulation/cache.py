@@ -0,0 +1,179 @@
+import os
+import ast
+import json
+import time
+import pickle as pkl
+import hashlib
+import logging
+import platform
+import sqlite3
+import importlib.util
+import importlib.metadata
+
+# config sections which do not change the simulation results
+IGNORED_SECTIONS = ('logging', 'DataStore', 'cache')
+
+
+def _to_json(value):
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    return str(value)
+
+
+def _find_spec(name: str):
+    try:
+        return importlib.util.find_spec(name)
+    except (ImportError, ValueError):  # a name imported from a module
+        return None
+
+
+def _imported_names(origin: str, package: str) -> list[str]:
+    # absolute names of the modules, and of the names from them, which the
+    # source imports, parent packages included
+    with open(origin, 'rb') as fd:
+        tree = ast.parse(fd.read(), filename=origin)
+
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ''
+            if node.level:
+                parts = package.split('.')
+                parts = parts[:len(parts) - node.level + 1]
+                base = '.'.join(parts + ([base] if base else []))
+            names.append(base)
+            names.extend(f'{base}.{alias.name}' for alias in node.names)
+
+    parents = [name.rsplit('.', k)[0] for name in names
+               for k in range(1, name.count('.') + 1)]
+    return names + parents
+
+
+def _dependencies(module: str) -> tuple[dict, set]:
+    # the sources of the modules of the scenario tree the module imports,
+    # directly or not, and the top level names of the other imports
+    top = importlib.util.find_spec(module.partition('.')[0])
+    root = os.path.dirname(top.submodule_search_locations[0]
+                           if top.submodule_search_locations else top.origin)
+
+    sources, external = {}, set()
+    pending = [module] + [module.rsplit('.', k)[0]
+                          for k in range(1, module.count('.') + 1)]
+    while pending:
+        name = pending.pop()
+        if name in sources or name.partition('.')[0] in external:
+            continue
+        spec = _find_spec(name)
+        if spec is None or not spec.has_location:
+            continue
+        if not os.path.abspath(spec.origin).startswith(root + os.sep):
+            external.add(name.partition('.')[0])
+            continue
+
+        sources[name] = spec.origin
+        package = name if spec.submodule_search_locations else \
+            name.rpartition('.')[0]
+        pending.extend(_imported_names(spec.origin, package))
+
+    return sources, external
+
+
+def _versions(names: set) -> dict:
+    # installed distribution versions, the standard library goes with
+    # the Python version
+    distributions = importlib.metadata.packages_distributions()
+    versions = {'python': platform.python_version()}
+    for name in sorted(names):
+        for distribution in distributions.get(name, []):
+            versions[distribution] = importlib.metadata.version(distribution)
+    return versions
+
+
+class ResultCache:
+    # Results of simulation points keyed by the hash of the merged config,
+    # the code and the seed. Only seeded runs are cached: without a seed
+    # two runs of the same config are different experiments. The code is
+    # the sources of the scenario and of every project module it imports,
+    # and the versions of the installed packages these import.
+
+    def __init__(self, filename: str) -> None:
+        self.logger = logging.getLogger('simulation.ResultCache')
+        self.filename = filename
+        self.sources = {}
+
+        dirname = os.path.dirname(filename)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        with self.__connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS results ('
+                       'key TEXT PRIMARY KEY, scenario TEXT, config TEXT, '
+                       'result TEXT, probes BLOB, created TEXT)')
+
+    def __connect(self):
+        return sqlite3.connect(self.filename, timeout=30)
+
+    def __source_hash(self, scenario: str) -> str:
+        digest = self.sources.get(scenario, None)
+        if digest is None:
+            sources, external = _dependencies(scenario)
+            sha = hashlib.sha256()
+            for name in sorted(sources):
+                with open(sources[name], 'rb') as fd:
+                    content = fd.read()
+                sha.update(f'{name} {len(content)}\n'.encode() + content)
+            sha.update(json.dumps(_versions(external),
+                                  sort_keys=True).encode())
+            digest = sha.hexdigest()
+            self.sources[scenario] = digest
+            self.logger.debug(f'{scenario}: {len(sources)} sources, '
+                              f'{sorted(external)} imports')
+        return digest
+
+    def key(self, scenario: str, config: dict):
+        if config.get('seed', None) is None:
+            return None
+
+        relevant = {name: section for name, section in config.items()
+                    if name not in IGNORED_SECTIONS}
+        identity = json.dumps({
+            'scenario': scenario,
+            'source': self.__source_hash(scenario),
+            'seed': config['seed'],
+            'config': relevant,
+        }, sort_keys=True, default=_to_json)
+
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def get(self, key: str):
+        if key is None:
+            return None
+
+        with self.__connect() as db:
+            row = db.execute('SELECT result FROM results WHERE key = ?',
+                             (key, )).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def probes(self, key: str) -> dict:
+        with self.__connect() as db:
+            row = db.execute('SELECT probes FROM results WHERE key = ?',
+                             (key, )).fetchone()
+        return pkl.loads(row[0]) if row and row[0] else {}
+
+    def put(self, key: str, scenario: str, config: dict, result: dict,
+            probes: dict = None):
+        if key is None:
+            return
+
+        with self.__connect() as db:
+            db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', (
+                key,
+                scenario,
+                json.dumps(config, sort_keys=True, default=_to_json),
+                json.dumps(result, default=_to_json),
+                pkl.dumps(probes) if probes else None,
+                time.strftime('%Y-%m-%dT%H:%M:%S'),
+            ))
+        self.logger.debug(f'stored {key}: {result}')
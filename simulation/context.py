@@ -0,0 +1,38 @@
+import threading
+import contextvars
+
+from .params import SimParams
+from .datastore import DataStore
+from .datastore import DataStoreConfig
+
+_current = contextvars.ContextVar('simulation.context', default=None)
+
+
+class SimContext:
+    def __init__(self, params: SimParams, datastore: DataStore = None) -> None:
+        self.params = params
+        self.datastore = datastore if datastore else DataStore(
+            DataStoreConfig(path='', names=[]))
+
+        # the same context can be entered from several threads at once
+        self.__local = threading.local()
+
+    def __enter__(self):
+        tokens = self.__local.__dict__.setdefault('tokens', [])
+        tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, type, value, tb):
+        _current.reset(self.__local.tokens.pop())
+
+    def __repr__(self) -> str:
+        return f'SimContext(params={self.params})'
+
+    @staticmethod
+    def current() -> 'SimContext':
+        context = _current.get()
+        if context is None:
+            raise RuntimeError('no active simulation context, '
+                               'run under `with SimContext(...)` or pass '
+                               '`context=` to the unit')
+        return context
@@ -1,23 +1,213 @@
 import os
+import json
 import logging
 import pickle as pkl
 
+import numpy as np
+
+from dataclasses import field
 from dataclasses import dataclass
 from collections import defaultdict
 
-from utils import Singleton
+from .retention import RetentionPolicies
+
+INDEX_NAME = 'index.jsonl'
+
+
+class Lazy():
+    # a probe value computed only when the entry is actually kept, e.g.
+    # store(spectrum=Lazy(fft, x)). Any other value is stored as it is,
+    # functions and callable objects included. Callers that build the
+    # arguments anyway should check `enabled` first.
+    def __init__(self, fn, *args, **kwargs) -> None:
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        return self.fn(*self.args, **self.kwargs)
 
 
 class StoreHandler():
-    def __init__(self) -> None:
+    enabled = True
+
+    def __init__(self, probes: dict = None) -> None:
         self.impl = defaultdict(list)
+        self.calls = defaultdict(list)
+        self.counts = defaultdict(int)
+        self.policies = RetentionPolicies(probes)
+
+    def store(self, **kwargs):
+        for point, data in kwargs.items():
+            count = self.counts[point]
+            self.counts[point] += 1
+
+            slot = self.policies[point].slot(count)
+            if slot is None:
+                continue
+
+            if isinstance(data, Lazy):
+                data = data()
+
+            entries, calls = self.impl[point], self.calls[point]
+            if slot < len(entries):
+                entries[slot], calls[slot] = data, count
+            else:
+                entries.append(data)
+                calls.append(count)
+
+    @property
+    def points(self) -> list[str]:
+        return list(self.impl.keys())
+
+    def entries(self) -> dict[str, list]:
+        # kept entries in call order
+        return {point: [entries[idx] for idx in np.argsort(self.calls[point])]
+                for point, entries in self.impl.items()}
+
+    def flush(self, path: str, name: str) -> str:
+        filename = os.path.join(path, name + '.pkl')
+        with open(filename, 'wb') as fd:
+            pkl.dump(self.entries(), fd)
+        return filename
+
+
+class DiskStoreHandler():
+    enabled = True
+
+    # every kept store() call goes straight to its <point>/<slot>.npy file,
+    # or <slot>.pkl when it is not a plain array (None, lists of objects).
+    # index.jsonl lists the complete segments in the order they were
+    # written, it is compacted to the live slots as overwritten ones pile up.
+    def __init__(self, path: str, probes: dict = None) -> None:
+        self.path = path
+        self.counts = defaultdict(int)
+        self.policies = RetentionPolicies(probes)
+        self.live = {}  # (point, slot) -> index record, in write order
+        self.lines = 0  # records in the index file
+
+        os.makedirs(path, exist_ok=True)
+        self.index = open(os.path.join(path, INDEX_NAME), 'w')
 
     def store(self, **kwargs):
         for point, data in kwargs.items():
-            self.impl[point].append(data)
+            count = self.counts[point]
+            self.counts[point] += 1
+
+            slot = self.policies[point].slot(count)
+            if slot is None:
+                continue
+
+            if not count:
+                os.makedirs(os.path.join(self.path, point), exist_ok=True)
+
+            data = data() if isinstance(data, Lazy) else data
+            try:
+                array = np.asarray(data)
+            except ValueError:  # ragged sequences
+                array = None
+            pickled = array is None or array.dtype.hasobject
+            filename = os.path.join(
+                point, f'{slot:06d}.' + ('pkl' if pickled else 'npy'))
+
+            # replace atomically, readers may still map the overwritten slot
+            tmpname = os.path.join(self.path, filename + '.tmp')
+            try:
+                with open(tmpname, 'wb') as fd:
+                    if pickled:
+                        pkl.dump(data, fd)
+                    else:
+                        np.save(fd, array, allow_pickle=False)
+                os.replace(tmpname, os.path.join(self.path, filename))
+            except BaseException:
+                if os.path.exists(tmpname):
+                    os.remove(tmpname)
+                raise
+
+            previous = self.live.pop((point, slot), None)
+            if previous is not None and previous['file'] != filename:
+                os.remove(os.path.join(self.path, previous['file']))
+
+            record = {
+                'point': point,
+                'call': count,
+                'slot': slot,
+                'file': filename,
+                'shape': None if pickled else array.shape,
+                'dtype': None if pickled else array.dtype.str,
+            }
+            self.live[(point, slot)] = record
+            self.index.write(json.dumps(record) + '\n')
+            self.index.flush()
+            self.lines += 1
+            if self.lines > 2 * len(self.live) + 64:
+                self.__compact()
+
+    def __compact(self):
+        # rewrite the index with the live records only, atomically
+        self.index.close()
+        filename = os.path.join(self.path, INDEX_NAME)
+        with open(filename + '.tmp', 'w') as fd:
+            for record in self.live.values():
+                fd.write(json.dumps(record) + '\n')
+        os.replace(filename + '.tmp', filename)
+        self.index = open(filename, 'a')
+        self.lines = len(self.live)
+
+    @property
+    def points(self) -> list[str]:
+        return list(self.counts.keys())
+
+    def entries(self) -> dict[str, list]:
+        return load_dump(self.path)
+
+    def flush(self, path: str, name: str) -> str:
+        self.index.close()
+        return self.path
+
+
+class SegmentList():
+    # lazy list of memory mapped segments, pickles as a list of file names
+    def __init__(self, path: str, files: list[str]) -> None:
+        self.path = path
+        self.files = files
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return SegmentList(self.path, self.files[idx])
+        filename = os.path.join(self.path, self.files[idx])
+        if filename.endswith('.pkl'):
+            with open(filename, 'rb') as fd:
+                return pkl.load(fd)
+        return np.load(filename, mmap_mode='r')
+
+    def __iter__(self):
+        return (self[idx] for idx in range(len(self)))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def load_dump(path: str) -> dict[str, SegmentList]:
+    slots = defaultdict(dict)
+    with open(os.path.join(path, INDEX_NAME), 'r') as fd:
+        for line in fd:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # the last record of an interrupted run
+            slots[entry['point']][entry['slot']] = (entry['call'], entry['file'])
+
+    return {point: SegmentList(path, [name for _, name in sorted(files.values())])
+            for point, files in slots.items()}
 
 
 class NoStoreHandler():
+    enabled = False
+
     def __init__(self) -> None:
         pass
 
@@ -25,13 +215,18 @@ class NoStoreHandler():
         pass
 
 
+NO_STORE = NoStoreHandler()
+
+
 @dataclass(frozen=True)
 class DataStoreConfig:
     path: str
     names: list[str]
+    backend: str = 'memory'  # memory | disk
+    probes: dict = field(default_factory=dict)  # probe -> retention policy
 
 
-class DataStore(metaclass=Singleton):
+class DataStore:
     def __init__(self, config: DataStoreConfig) -> None:
         self.data = {}
         self.config = config
@@ -39,22 +234,25 @@ class DataStore(metaclass=Singleton):
         self.logger.info('init DataStore')
 
         for name in config.names:
-            self.data[name] = StoreHandler()
-            self.logger.debug(f'set {name} class')
+            self.data[name] = {
+                'memory': lambda: StoreHandler(config.probes),
+                'disk': lambda: DiskStoreHandler(os.path.join(config.path, name),
+                                                 config.probes),
+            }[config.backend]()
+            self.logger.debug(f'set {name} class, {config.backend} backend')
 
-        main_store = self.data.get('__main__', None)
-        self.store = main_store.store if main_store else NoStoreHandler()
+        main_store = self.data.get('__main__', NO_STORE)
+        self.store = main_store.store
+        self.enabled = main_store.enabled
 
     def flush(self):
-        if not self.config:
+        if not self.config or not self.data:
             self.logger.info(f'nothing to write')
             return
 
         path = self.config.path
         os.makedirs(path, exist_ok=True)
         for name, storage in self.data.items():
-            filename = os.path.join(self.config.path, name + '.pkl')
-            with open(filename, 'wb') as fd:
-                pkl.dump(storage.impl, fd)
+            filename = storage.flush(path, name)
             self.logger.info(
-                f'succesfully write {filename} file, {storage.impl.keys()}')
+                f'succesfully write {filename}, {storage.points}')
@@ -0,0 +1,213 @@
+import json
+import time
+import queue
+import base64
+import socket
+import logging
+import threading
+import socketserver
+
+import numpy as np
+
+from simulation import profiling
+from simulation.cache import _to_json
+
+logger = logging.getLogger('simulation.distributed')
+
+# The protocol is JSON lines over TCP. The coordinator keeps one connection
+# per worker, sends a job and waits for its outcome before sending the next:
+#
+#   -> {"index": 3, "scenario": "scenario.audio_ofdm", "point": {...},
+#       "config": {...}, "profile": false}
+#   <- {"index": 3, "point": {...}, "result": {...}, "error": null,
+#       "probes": {"name": [{"dtype": "<f8", "shape": [2, 3],
+#                            "data": "<base64 of the raw buffer>"}]},
+#       "profile": {...}}
+#
+# A job is retried on another connection when the transport fails, the
+# scenario errors are results and are not retried. Nothing received is
+# unpickled: probes are plain numeric arrays, object ones stay on the worker.
+
+
+def parse_address(address: str) -> tuple[str, int]:
+    host, _, port = address.rpartition(':')
+    return host or 'localhost', int(port)
+
+
+def _send(wfile, message: dict):
+    wfile.write(json.dumps(message, default=_to_json).encode() + b'\n')
+    wfile.flush()
+
+
+def _receive(rfile) -> dict:
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError('connection closed')
+    return json.loads(line)
+
+
+def _encode_array(array: np.ndarray) -> dict:
+    array = np.ascontiguousarray(array)
+    return {'dtype': array.dtype.str, 'shape': list(array.shape),
+            'data': base64.b64encode(array.tobytes()).decode()}
+
+
+def _decode_array(message: dict) -> np.ndarray:
+    dtype = np.dtype(message['dtype'])
+    if dtype.hasobject or dtype.fields is not None:
+        raise ValueError(f'not a plain array dtype {dtype}')
+    data = base64.b64decode(message['data'], validate=True)
+    shape = tuple(int(n) for n in message['shape'])
+    return np.frombuffer(data, dtype=dtype).reshape(shape).copy()
+
+
+def _encode_probes(probes: dict) -> dict:
+    encoded = {}
+    for name, entries in probes.items():
+        if any(entry.dtype.hasobject or entry.dtype.fields is not None
+               for entry in entries):
+            logger.warning(f'probe {name} is not a plain numeric array, '
+                           'it is not sent to the coordinator')
+            continue
+        encoded[name] = [_encode_array(entry) for entry in entries]
+    return encoded
+
+
+def _decode_probes(probes: dict) -> dict:
+    return {name: [_decode_array(entry) for entry in entries]
+            for name, entries in probes.items()}
+
+
+class _WorkerHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        # run_sweep imports this module, so the import is deferred
+        from simulation.sweep import run_point
+
+        peer = '%s:%d' % self.client_address[:2]
+        logger.info(f'coordinator {peer} connected')
+        while True:
+            try:
+                job = _receive(self.rfile)
+            except ConnectionError:
+                break
+
+            # a profiled job does not leave the profiling on for the next
+            # jobs of the worker
+            was_enabled = profiling.enabled()
+            if job.get('profile', False) and not was_enabled:
+                profiling.enable()
+            try:
+                profiling.reset()
+                outcome = run_point(job['scenario'], job['config'],
+                                    job['index'])
+                probes = outcome.pop('probes', None)
+                _send(self.wfile, {
+                    **outcome,
+                    'index': job['index'],
+                    'point': job['point'],
+                    'probes': _encode_probes(probes) if probes else None,
+                    'profile': profiling.snapshot(),
+                })
+            finally:
+                if profiling.enabled() and not was_enabled:
+                    profiling.disable()
+        logger.info(f'coordinator {peer} disconnected')
+
+
+class WorkerServer(socketserver.TCPServer):
+    # one job at a time: a worker process is supposed to use one core,
+    # run several workers per host to use more
+    allow_reuse_address = True
+
+    def __init__(self, address: tuple[str, int]) -> None:
+        super().__init__(address, _WorkerHandler)
+
+
+def serve(address: str):
+    with WorkerServer(parse_address(address)) as server:
+        logger.info('serving simulation jobs on %s:%d' %
+                    server.server_address[:2])
+        server.serve_forever()
+
+
+def run_remote(jobs: list, workers: list[str], profile: bool = False,
+               retries: int = 2, timeout: float = None):
+    # yields outcomes in the order of completion, the same as imap_unordered
+    pending = queue.Queue()
+    for job in jobs:
+        pending.put((job, 0))
+    outcomes = queue.Queue()
+    stop = threading.Event()
+
+    def fail(job, attempts, error):
+        index, scenario, point, config = job
+        if attempts < retries:
+            logger.warning(f'point {point}: {error}, retrying')
+            pending.put((job, attempts + 1))
+        else:
+            outcomes.put({'index': index, 'point': point, 'result': {},
+                          'error': f'{type(error).__name__}: {error}'})
+
+    def connection(address):
+        failures = 0
+        while not stop.is_set() and failures <= retries:
+            try:
+                sock = socket.create_connection(parse_address(address),
+                                                timeout=timeout)
+            except OSError as e:
+                failures += 1
+                logger.warning(f'worker {address}: {e}')
+                time.sleep(0.1 * 2 ** failures)
+                continue
+
+            with sock, sock.makefile('rb') as rfile, \
+                    sock.makefile('wb') as wfile:
+                while not stop.is_set():
+                    try:
+                        job, attempts = pending.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+
+                    index, scenario, point, config = job
+                    try:
+                        _send(wfile, {'index': index, 'scenario': scenario,
+                                      'point': point, 'config': config,
+                                      'profile': profile})
+                        outcome = _receive(rfile)
+                        if outcome['probes']:
+                            outcome['probes'] = _decode_probes(
+                                outcome['probes'])
+                    except (OSError, ValueError, TypeError, KeyError) as e:
+                        failures += 1
+                        fail(job, attempts, e)
+                        break
+
+                    failures = 0
+                    outcomes.put(outcome)
+
+            # back off, so that the healthy workers pick up the retried job
+            if not stop.is_set():
+                time.sleep(0.1 * 2 ** failures)
+
+        logger.info(f'worker {address} is done')
+
+    threads = [threading.Thread(target=connection, args=(address, ),
+                                daemon=True) for address in workers]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for _ in range(len(jobs)):
+            while True:
+                try:
+                    yield outcomes.get(timeout=0.1)
+                    break
+                except queue.Empty:
+                    if not any(thread.is_alive() for thread in threads):
+                        raise RuntimeError('no simulation workers left')
+
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
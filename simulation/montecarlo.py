@@ -0,0 +1,102 @@
+import logging
+
+import numpy as np
+
+from dataclasses import asdict
+from dataclasses import dataclass
+from scipy.stats import beta
+from scipy.stats import norm
+
+from dsp.metrics.errors import BitErrorCounter
+
+logger = logging.getLogger('simulation.montecarlo')
+
+
+@dataclass(frozen=True)
+class MonteCarloConfig:
+    target_errors: int = 100  # stop after that many bit errors
+    target_rel_ci: float = None  # or when the CI half-width / BER is below
+    max_bits: int = 10 ** 7  # bit budget
+    min_bits: int = 0
+    confidence: float = 0.95
+    interval: str = 'wilson'  # wilson | clopper_pearson
+
+
+@dataclass
+class BerEstimate:
+    errors: int
+    bits: int
+    frames: int
+    ber: float
+    ci_low: float
+    ci_high: float
+    stop_reason: str
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def wilson_interval(errors: int, bits: int, confidence: float):
+    if not bits:
+        return 0.0, 1.0
+
+    z = norm.ppf(1 - (1 - confidence) / 2)
+    p = errors / bits
+    denominator = 1 + z ** 2 / bits
+    center = (p + z ** 2 / (2 * bits)) / denominator
+    half = z * np.sqrt(p * (1 - p) / bits + z ** 2 / (4 * bits ** 2)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def clopper_pearson_interval(errors: int, bits: int, confidence: float):
+    if not bits:
+        return 0.0, 1.0
+
+    alpha = 1 - confidence
+    low = beta.ppf(alpha / 2, errors, bits - errors + 1) if errors else 0.0
+    high = beta.ppf(1 - alpha / 2, errors + 1, bits - errors) \
+        if errors < bits else 1.0
+    return float(low), float(high)
+
+
+INTERVALS = {
+    'wilson': wilson_interval,
+    'clopper_pearson': clopper_pearson_interval,
+}
+
+
+def run_until(frame, config: MonteCarloConfig) -> BerEstimate:
+    # frame() simulates one more frame and returns its BitErrorCounter
+    interval = INTERVALS[config.interval]
+    counter = BitErrorCounter()
+    frames = 0
+
+    while True:
+        counter.merge(frame())
+        errors, bits = counter.errors, counter.bits
+        frames += 1
+
+        low, high = interval(errors, bits, config.confidence)
+        ber = counter.ber
+
+        stop_reason = None
+        if bits >= config.min_bits:
+            if config.target_errors and errors >= config.target_errors:
+                stop_reason = 'errors'
+            elif config.target_rel_ci and errors and \
+                    (high - low) / 2 / ber <= config.target_rel_ci:
+                stop_reason = 'confidence'
+        if stop_reason is None and bits >= config.max_bits:
+            stop_reason = 'budget'
+
+        logger.debug(f'frame {frames}: {errors}/{bits} errors, '
+                     f'BER {ber:.3e} [{low:.3e}, {high:.3e}]')
+        if stop_reason:
+            break
+
+    logger.info(f'{frames} frames, {errors}/{bits} errors, BER {ber:.3e}, '
+                f'{config.confidence:.0%} CI [{low:.3e}, {high:.3e}], '
+                f'stopped by {stop_reason}')
+
+    return BerEstimate(errors=errors, bits=bits, frames=frames, ber=ber,
+                       ci_low=low, ci_high=high, stop_reason=stop_reason)
@@ -1,9 +1,7 @@
 from dataclasses import dataclass
 
-from utils import Singleton
-
 
 @dataclass(frozen=True)
-class SimParams(metaclass=Singleton):
+class SimParams:
     fc: int
     fs: int
@@ -0,0 +1,138 @@
+import time
+import queue
+import logging
+import threading
+
+from dataclasses import dataclass
+
+from .unit import SimUnit
+
+logger = logging.getLogger('simulation.Pipeline')
+
+_END = object()  # end of stream marker
+
+
+@dataclass
+class StageStats:
+    name: str
+    blocks: int = 0
+    busy: float = 0.0  # seconds spent in process_block()/flush()
+    occupancy_sum: int = 0  # input queue length summed over blocks
+    occupancy_max: int = 0
+
+    @property
+    def occupancy(self) -> float:
+        return self.occupancy_sum / self.blocks if self.blocks else 0.0
+
+
+class _Failure:
+    def __init__(self, stage: str, error: BaseException) -> None:
+        self.stage = stage
+        self.error = error
+
+
+class Pipeline:
+    # Runs every unit in its own thread, connected with bounded queues. The
+    # units are fed with process_block(), numpy, FFT and lfilter release the
+    # GIL, so the stages really work concurrently on consecutive blocks.
+
+    def __init__(self, units: list[SimUnit], queue_size: int = 4) -> None:
+        self.units = units
+        self.queue_size = queue_size
+        self.stats = self.__new_stats()
+
+    def __new_stats(self) -> list[StageStats]:
+        return [StageStats(name=type(unit).__name__) for unit in self.units]
+
+    def run(self, blocks):
+        self.stats = self.__new_stats()  # every run reports on its own
+        queues = [queue.Queue(maxsize=self.queue_size)
+                  for _ in range(len(self.units) + 1)]
+        stop = threading.Event()
+
+        def put(q, item):
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def stage(unit, stats, inbox, outbox):
+            try:
+                unit.reset()
+                while True:
+                    occupancy = inbox.qsize()
+                    item = get(inbox)
+                    if item is _END or isinstance(item, _Failure):
+                        break
+
+                    start = time.perf_counter()
+                    output = unit.process_block(item)
+                    stats.busy += time.perf_counter() - start
+                    stats.blocks += 1
+                    stats.occupancy_sum += occupancy
+                    stats.occupancy_max = max(stats.occupancy_max, occupancy)
+
+                    put(outbox, output)
+
+                if item is _END:
+                    start = time.perf_counter()
+                    tail = unit.flush()
+                    stats.busy += time.perf_counter() - start
+                    if tail is not None:
+                        put(outbox, tail)
+
+            except BaseException as e:
+                item = _Failure(stats.name, e)
+
+            put(outbox, item)
+
+        def feed():
+            try:
+                for block in blocks:
+                    if stop.is_set():
+                        return
+                    put(queues[0], block)
+                item = _END
+            except BaseException as e:
+                item = _Failure('source', e)
+            put(queues[0], item)
+
+        threads = [threading.Thread(target=feed, daemon=True)] + [
+            threading.Thread(target=stage, daemon=True,
+                             args=(unit, stats, queues[k], queues[k + 1]))
+            for k, (unit, stats) in enumerate(zip(self.units, self.stats))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _END:
+                    break
+                if isinstance(item, _Failure):
+                    raise RuntimeError(
+                        f'pipeline stage {item.stage} failed') from item.error
+                yield item
+
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            logger.info(f'pipeline finished\n{self.report()}')
+
+    def report(self) -> str:
+        return '\n'.join(
+            f'{stats.name}: {stats.blocks} blocks, busy {stats.busy:.4f} s, '
+            f'input queue avg {stats.occupancy:.2f} max {stats.occupancy_max}'
+            f'/{self.queue_size}'
+            for stats in self.stats)
@@ -0,0 +1,195 @@
+import json
+import time
+import logging
+import functools
+import threading
+import tracemalloc
+
+import numpy as np
+
+from dataclasses import asdict
+from dataclasses import dataclass
+
+logger = logging.getLogger('simulation.profiling')
+
+# the entry points of a unit, process() is reported under the unit name
+# and the others under <unit>.<method>
+ENTRY_POINTS = ('process', 'process_block', 'flush', 'process_batch',
+                'process_bytes')
+
+_units = []  # SimUnit classes which define their own entry points
+_stats = {}
+_lock = threading.Lock()
+_local = threading.local()
+_state = {'enabled': False, 'memory': False}
+
+
+@dataclass
+class UnitStats:
+    calls: int = 0
+    time: float = 0.0  # wall time including nested units
+    self_time: float = 0.0  # wall time excluding nested units
+    samples_in: int = 0
+    samples_out: int = 0
+    peak_alloc: int = 0  # bytes, the largest over calls
+
+    @property
+    def throughput(self) -> float:
+        return self.samples_in / self.time if self.time else 0.0
+
+    def merge(self, other: 'UnitStats'):
+        self.calls += other.calls
+        self.time += other.time
+        self.self_time += other.self_time
+        self.samples_in += other.samples_in
+        self.samples_out += other.samples_out
+        self.peak_alloc = max(self.peak_alloc, other.peak_alloc)
+
+
+def _samples(data) -> int:
+    if isinstance(data, np.ndarray):
+        return data.size
+    if isinstance(data, (tuple, list)):
+        return sum(_samples(entry) for entry in data)
+    return 0
+
+
+def _profiled(process, suffix: str = ''):
+    @functools.wraps(process)
+    def wrapper(self, *args, **kwargs):
+        stack = _local.__dict__.setdefault('stack', [])
+        memory = _state['memory'] and tracemalloc.is_tracing()
+
+        # frame: [traced memory at entry, peak so far, time of nested units]
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:  # keep the caller peak before it is reset
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current, 0.0])
+        else:
+            stack.append([0, 0, 0.0])
+
+        start = time.perf_counter()
+        try:
+            result = process(self, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            frame = stack.pop()
+            alloc = 0
+            if memory:
+                _, peak = tracemalloc.get_traced_memory()
+                peak = max(frame[1], peak)
+                alloc = peak - frame[0]
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+            if stack:
+                stack[-1][2] += elapsed
+
+        data = args[0] if args else next(iter(kwargs.values()), None)
+        with _lock:
+            stats = _stats.setdefault(type(self).full_cls_name + suffix,
+                                      UnitStats())
+            stats.calls += 1
+            stats.time += elapsed
+            stats.self_time += elapsed - frame[2]
+            stats.samples_in += _samples(data)
+            stats.samples_out += _samples(result)
+            stats.peak_alloc = max(stats.peak_alloc, alloc)
+
+        return result
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def _wrap(cls):
+    for name in ENTRY_POINTS:
+        method = cls.__dict__.get(name, None)
+        if method is not None and not getattr(method, '__profiled__', False):
+            suffix = '' if name == 'process' else f'.{name}'
+            setattr(cls, name, _profiled(method, suffix))
+
+
+def _unwrap(cls):
+    for name in ENTRY_POINTS:
+        method = cls.__dict__.get(name, None)
+        if getattr(method, '__profiled__', False):
+            setattr(cls, name, method.__wrapped__)
+
+
+def register(cls):
+    if not any(name in cls.__dict__ for name in ENTRY_POINTS):
+        return
+    _units.append(cls)
+    if _state['enabled']:
+        _wrap(cls)
+
+
+def enabled() -> bool:
+    return _state['enabled']
+
+
+def enable(memory: bool = True):
+    _state['enabled'] = True
+    _state['memory'] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    for cls in _units:
+        _wrap(cls)
+    logger.info(f'profiling {len(_units)} units, memory: {memory}')
+
+
+def disable():
+    _state['enabled'] = False
+    for cls in _units:
+        _unwrap(cls)
+    if _state['memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def snapshot() -> dict:
+    with _lock:
+        return {name: asdict(stats) for name, stats in _stats.items()}
+
+
+def merge(snapshot: dict):
+    with _lock:
+        for name, stats in snapshot.items():
+            _stats.setdefault(name, UnitStats()).merge(UnitStats(**stats))
+
+
+def report() -> str:
+    with _lock:
+        stats = sorted(_stats.items(), key=lambda item: -item[1].self_time)
+
+    total = sum(entry.self_time for _, entry in stats) or 1.0
+    columns = ('unit', 'calls', 'time, s', 'self, s', 'self, %',
+               'samples in', 'samples out', 'Msamples/s', 'peak, KiB')
+    rows = [(name, f'{entry.calls}', f'{entry.time:.4f}',
+             f'{entry.self_time:.4f}', f'{100 * entry.self_time / total:.1f}',
+             f'{entry.samples_in}', f'{entry.samples_out}',
+             f'{entry.throughput / 1e6:.3f}', f'{entry.peak_alloc / 1024:.1f}')
+            for name, entry in stats]
+
+    widths = [max(len(row[k]) for row in (columns, *rows))
+              for k in range(len(columns))]
+    lines = ['  '.join([row[0].ljust(widths[0])] +
+                       [v.rjust(w) for v, w in zip(row[1:], widths[1:])])
+             for row in (columns, *rows)]
+    lines.insert(1, '  '.join('-' * w for w in widths))
+    return '\n'.join(lines)
+
+
+def dump(filename: str):
+    data = {name: {**stats, 'throughput': UnitStats(**stats).throughput}
+            for name, stats in snapshot().items()}
+    with open(filename, 'w') as fd:
+        json.dump(data, fd, indent=2)
+    logger.info(f'profile is written to {filename}')
@@ -0,0 +1,82 @@
+import numpy as np
+
+# A retention policy maps the n-th store() call of a probe onto a storage
+# slot: None drops the entry, a slot equal to the number of kept entries
+# appends it and any other slot overwrites an older entry.
+
+
+class KeepAll:
+    def slot(self, count: int):
+        return count
+
+
+class Ring:
+    # the last `size` entries
+    def __init__(self, size: int) -> None:
+        assert size > 0
+        self.size = size
+
+    def slot(self, count: int):
+        return count % self.size
+
+
+class First:
+    # the first `size` entries
+    def __init__(self, size: int) -> None:
+        assert size > 0
+        self.size = size
+
+    def slot(self, count: int):
+        return count if count < self.size else None
+
+
+class Decimate:
+    # every `step`-th entry, the last `size` of them if size is given
+    def __init__(self, step: int, size: int = None) -> None:
+        assert step > 0 and (size is None or size > 0)
+        self.step = step
+        self.size = size
+
+    def slot(self, count: int):
+        if count % self.step:
+            return None
+        idx = count // self.step
+        return idx if self.size is None else idx % self.size
+
+
+class Reservoir:
+    # uniform random sample of `size` entries over the whole run
+    def __init__(self, size: int, seed: int = None) -> None:
+        assert size > 0
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+
+    def slot(self, count: int):
+        if count < self.size:
+            return count
+        idx = int(self.rng.integers(0, count + 1))
+        return idx if idx < self.size else None
+
+
+POLICIES = {
+    'all': KeepAll,
+    'ring': Ring,
+    'first': First,
+    'decimate': Decimate,
+    'reservoir': Reservoir,
+}
+
+
+class RetentionPolicies:
+    # probe name -> {policy: <name>, **kwargs}, '*' matches unlisted probes
+    def __init__(self, probes: dict = None) -> None:
+        self.probes = probes or {}
+        self.impl = {}
+
+    def __getitem__(self, point: str):
+        policy = self.impl.get(point, None)
+        if policy is None:
+            spec = dict(self.probes.get(point, self.probes.get('*', {})))
+            policy = POLICIES[spec.pop('policy', 'all')](**spec)
+            self.impl[point] = policy
+        return policy
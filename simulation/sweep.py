@@ -0,0 +1,220 @@
+import os
+import re
+import copy
+import logging
+import itertools
+import importlib
+import traceback
+import multiprocessing
+
+import numpy as np
+import yaml
+
+from simulation import profiling
+from simulation.cache import ResultCache
+from simulation.distributed import run_remote
+from simulation.params import SimParams
+from simulation.context import SimContext
+from simulation.datastore import DataStore
+from simulation.datastore import DataStoreConfig
+
+logger = logging.getLogger('simulation.sweep')
+
+
+# YAML 1.1 floats need a dot, safe_load reads 4e3 and 1e-3 as strings
+SCIENTIFIC = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)[eE][-+]?\d+')
+
+
+def _numeric(value):
+    if isinstance(value, str) and SCIENTIFIC.fullmatch(value.strip()):
+        return float(value)
+    return value
+
+
+def parse_value(value: str):
+    parsed = yaml.safe_load(value)
+    # a quoted '4e3' stays a string
+    return _numeric(parsed) if parsed == value.strip() else parsed
+
+
+def parse_values(value: str) -> list:
+    # '[1, 2]' and "'a,b'" are single values, '1,2' is a sweep over two values
+    if value.strip().startswith(('[', '"', "'")):
+        return [parse_value(value)]
+    return [parse_value(v) for v in value.split(',')]
+
+
+def set_entry(config: dict, key: str, value):
+    *path, name = key.split('.')
+    field = config
+    for entry in path:
+        field = field.setdefault(entry, {})
+    field[name] = value
+
+
+def build_axes(config: dict, overrides: list) -> dict:
+    # sweep axes come from the `sweep` config section and multi valued --set
+    # args, single valued --set entries are written to the config directly
+    axes = {key: [_numeric(value) for value in values]
+            for key, values in (config.pop('sweep', None) or {}).items()}
+
+    for key, value in overrides or []:
+        values = parse_values(value)
+        if len(values) == 1:
+            set_entry(config, key, values[0])
+            axes.pop(key, None)
+        else:
+            axes[key] = values
+
+    return axes
+
+
+def expand_grid(axes: dict) -> list[dict]:
+    keys = list(axes.keys())
+    return [dict(zip(keys, values))
+            for values in itertools.product(*(axes[key] for key in keys))]
+
+
+def make_point_config(config: dict, point: dict) -> dict:
+    point_config = copy.deepcopy(config)
+    for key, value in point.items():
+        set_entry(point_config, key, value)
+    return point_config
+
+
+def run_point(scenario: str, config: dict, index: int = None) -> dict:
+    config = copy.deepcopy(config)
+    if index is not None:
+        dsconfig = config['DataStore']
+        dsconfig['path'] = os.path.join(dsconfig['path'], f'point_{index:04d}')
+
+    # reseed explicitly: forked workers share the parent RNG state
+    np.random.seed(config.get('seed', None))
+
+    ds = DataStore(config=DataStoreConfig(**config['DataStore']))
+    context = SimContext(params=SimParams(**config['SimParams']),
+                         datastore=ds)
+
+    try:
+        with context:
+            result = importlib.import_module(scenario).Scenario().run(config)
+        return {'result': result or {}, 'error': None,
+                'probes': _select_probes(ds, config)}
+
+    except Exception as e:
+        logging.critical(f"Oops: {type(e).__name__}: {e}. Simulation stopped")
+        traceback.print_exception(e)
+        return {'result': {}, 'error': f'{type(e).__name__}: {e}'}
+
+    finally:
+        ds.flush()
+
+
+def _select_probes(ds: DataStore, config: dict) -> dict:
+    # probes stored along with the result in the cache
+    names = (config.get('cache', None) or {}).get('probes', [])
+    handler = ds.data.get('__main__', None)
+    if not names or handler is None:
+        return {}
+
+    entries = handler.entries()
+    return {name: [np.array(entry) for entry in entries[name]]
+            for name in names if name in entries}
+
+
+def _init_worker(logging_config: dict, profile: bool):
+    logging.basicConfig(**logging_config)
+    if profile:
+        profiling.enable()
+
+
+def _run_job(job):
+    index, scenario, point, config = job
+    profiling.reset()
+    outcome = run_point(scenario, config, index)
+    outcome['index'] = index
+    outcome['point'] = point
+    outcome['profile'] = profiling.snapshot()
+    return outcome
+
+
+def run_sweep(scenario: str, config: dict, points: list[dict],
+              processes: int = None, profile: bool = False,
+              cache: ResultCache = None,
+              workers: list[str] = None) -> list[dict]:
+    results = [None] * len(points)
+    jobs, keys, configs = [], {}, {}
+    for idx, point in enumerate(points):
+        point_config = make_point_config(config, point)
+        keys[idx] = cache.key(scenario, point_config) if cache else None
+        configs[idx] = point_config
+
+        result = cache.get(keys[idx]) if cache else None
+        if result is not None:
+            results[idx] = {'point': point, 'result': result, 'error': None}
+        else:
+            jobs.append((idx, scenario, point, point_config))
+
+    logger.info(f'run {len(jobs)} of {len(points)} points over '
+                + (f'{len(workers)} workers' if workers else
+                   f'{processes or os.cpu_count()} processes')
+                + f', {len(points) - len(jobs)} are cached')
+    if not jobs:
+        return results
+
+    if workers:
+        for outcome in run_remote(jobs, workers, profile=profile):
+            _collect(outcome, results, scenario, keys, configs, cache)
+        return results
+
+    with multiprocessing.Pool(processes=processes,
+                              initializer=_init_worker,
+                              initargs=(config.get('logging', {}),
+                                        profile)) as pool:
+        for outcome in pool.imap_unordered(_run_job, jobs):
+            _collect(outcome, results, scenario, keys, configs, cache)
+
+    return results
+
+
+def _collect(outcome, results, scenario, keys, configs, cache):
+    # completed points are cached at once, an interrupted sweep resumes
+    idx = outcome.pop('index')
+    profiling.merge(outcome.pop('profile', {}))
+    probes = outcome.pop('probes', None)
+    logger.info(f'point {outcome["point"]} done: '
+                f'{outcome["result"] or outcome["error"]}')
+
+    if cache and not outcome['error']:
+        cache.put(keys[idx], scenario, configs[idx], outcome['result'], probes)
+    results[idx] = outcome
+
+
+def collect_table(results: list[dict]) -> tuple[list, list]:
+    columns = []
+    for outcome in results:
+        for key in list(outcome['point']) + list(outcome['result']):
+            if key not in columns:
+                columns.append(key)
+    if any(outcome['error'] for outcome in results):
+        columns.append('error')
+
+    rows = []
+    for outcome in results:
+        entry = {**outcome['point'], **outcome['result'],
+                 'error': outcome['error']}
+        rows.append([entry.get(key, '') for key in columns])
+
+    return columns, rows
+
+
+def format_table(columns: list, rows: list) -> str:
+    cells = [[str(c) for c in columns]] + \
+        [['' if v is None else f'{v:.6g}' if isinstance(v, float) else str(v)
+          for v in row] for row in rows]
+    widths = [max(len(row[k]) for row in cells) for k in range(len(columns))]
+
+    lines = ['  '.join(v.rjust(w) for v, w in zip(row, widths))
+             for row in cells]
+    lines.insert(1, '  '.join('-' * w for w in widths))
+    return '\n'.join(lines)
@@ -1,26 +1,61 @@
 import logging
+import functools
 
-from .params import SimParams
-from .datastore import DataStore
-from .datastore import NoStoreHandler
+from . import profiling
+from .context import SimContext
+from .datastore import NO_STORE
+
+
+def _bind_context(init):
+    @functools.wraps(init)
+    def __init__(self, *args, context: SimContext = None, **kwargs):
+        if context is None:
+            return init(self, *args, **kwargs)
+
+        with context:
+            return init(self, *args, **kwargs)
+
+    return __init__
 
 
 class SimUnit:
     def __init__(self) -> None:
-        self.params = SimParams()
-        storage = DataStore().data.get(self.full_cls_name, None)
-        if storage:
-            self.store = storage.store
-            self.logger.info(f"add DataStore entry")
+        self.context = SimContext.current()
+        self.params = self.context.params
+        storage = self.context.datastore.data.get(self.full_cls_name, NO_STORE)
+        self.store = storage.store
+        self.store_enabled = storage.enabled
 
+        if storage.enabled:
+            self.logger.info(f"add DataStore entry")
         else:
-            self.store = NoStoreHandler.store
             self.logger.info(f"is ignored by DataStore")
 
+    # Streaming contract: a long signal is fed with process_block() chunk by
+    # chunk, stateful units carry filter states, partial symbols and phase
+    # between the calls. flush() returns the output held back at the end of
+    # the stream (None if there is nothing), reset() starts a new stream.
+
+    def process_block(self, block):
+        return self.process(block)
+
+    def flush(self):
+        return None
+
+    def reset(self):
+        pass
+
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
 
         cls.full_cls_name = cls.__module__ + '.' + cls.__name__
         cls.logger = logging.getLogger(cls.full_cls_name)
 
+        # every unit accepts an explicit `context=` besides the active one
+        if '__init__' in cls.__dict__:
+            cls.__init__ = _bind_context(cls.__init__)
+
+        # the entry points are timed once profiling.enable() is called
+        profiling.register(cls)
+
         cls.__str__ = lambda self: f"{cls.__name__}, config={self.config}"
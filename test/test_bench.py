@@ -0,0 +1,40 @@
+import pytest
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from bench.core import Case
+from bench.core import run_cases
+from bench.core import compare
+from bench.cases import CASES
+
+
+@pytest.mark.quick
+def test_bench_cases():
+    cases = [Case(case.name, case.setup, {key: values[:1]
+                                          for key, values in case.grid.items()})
+             for case in CASES]
+
+    with SimContext(params=SimParams(fc=4000, fs=48000)):
+        results = run_cases(cases, repeat=1, min_time=0, log=lambda _: None)
+
+    assert len(results) == len(CASES)
+    for result in results.values():
+        assert result['latency'] > 0
+        assert result['throughput'] > 0
+
+
+@pytest.mark.quick
+def test_bench_compare():
+    def entry(**latency):
+        return {'results': {cid: {'latency': value}
+                            for cid, value in latency.items()}}
+
+    base = entry(a=1.0, b=1.0, c=1.0)
+    new = entry(a=1.05, b=1.5, d=1.0)
+
+    rows = {row[0]: row for row in compare(base, new, threshold=0.1)}
+
+    assert set(rows.keys()) == {'a', 'b'}
+    assert not rows['a'][-1]
+    assert rows['b'][-1]
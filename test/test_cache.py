@@ -0,0 +1,89 @@
+import os
+import copy
+import pytest
+import numpy as np
+
+from simulation.cache import ResultCache
+from simulation.cache import _dependencies
+
+SCENARIO = 'scenario.audio_ofdm'
+CONFIG = {
+    'seed': 1,
+    'SimParams': {'fs': 1000, 'fc': 4000},
+    'scenario': {'Nsymb': 1, 'constellation': {'order': 4}},
+    'DataStore': {'names': ['__main__'], 'path': 'out/dumps'},
+    'logging': {'level': 'DEBUG'},
+}
+
+
+@pytest.mark.quick
+def test_cache_key():
+    cache = ResultCache(':memory:')
+    key = cache.key(SCENARIO, CONFIG)
+
+    reordered = dict(reversed(list(copy.deepcopy(CONFIG).items())))
+    assert cache.key(SCENARIO, reordered) == key
+
+    ignored = copy.deepcopy(CONFIG)
+    ignored['logging']['level'] = 'INFO'
+    ignored['DataStore']['path'] = 'elsewhere'
+    assert cache.key(SCENARIO, ignored) == key
+
+    for section, entry, value in (('scenario', 'Nsymb', 2),
+                                  ('SimParams', 'fc', 5000)):
+        changed = copy.deepcopy(CONFIG)
+        changed[section][entry] = value
+        assert cache.key(SCENARIO, changed) != key
+
+    reseeded = copy.deepcopy(CONFIG)
+    reseeded['seed'] = 2
+    assert cache.key(SCENARIO, reseeded) != key
+    assert cache.key('scenario.audio_qpsk', CONFIG) != key
+
+    unseeded = copy.deepcopy(CONFIG)
+    del unseeded['seed']
+    assert cache.key(SCENARIO, unseeded) is None
+
+
+@pytest.mark.quick
+def test_cache_key_code(tmp_path, monkeypatch):
+    # a change anywhere in the imported project modules is a new key
+    package = tmp_path / 'cached_scenarios'
+    (package / 'units').mkdir(parents=True)
+    (package / '__init__.py').write_text('')
+    (package / 'units' / '__init__.py').write_text('')
+    (package / 'units' / 'gain.py').write_text('import numpy\nGAIN = 1\n')
+    (package / 'units' / 'unused.py').write_text('')
+    (package / 'scenario.py').write_text('from .units.gain import GAIN\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def key():
+        return ResultCache(':memory:').key('cached_scenarios.scenario', CONFIG)
+
+    first = key()
+    (package / 'units' / 'unused.py').write_text('UNUSED = 1\n')
+    assert key() == first
+    (package / 'units' / 'gain.py').write_text('import numpy\nGAIN = 2\n')
+    assert key() != first
+
+    sources, external = _dependencies(SCENARIO)
+    assert {'dsp.rx.ofdm.estimator', 'dsp.common.resampling.poly',
+            'simulation.unit'} <= set(sources)
+    assert {'numpy', 'scipy'} <= external
+
+
+@pytest.mark.quick
+def test_cache_store(tmp_path):
+    filename = os.path.join(tmp_path, 'cache.sqlite')
+    cache = ResultCache(filename)
+    key = cache.key(SCENARIO, CONFIG)
+
+    assert cache.get(key) is None
+
+    result = {'ber': np.float64(0.25), 'errors': np.int64(2), 'bits': 8}
+    probes = {'rx_symbols': [np.arange(4) + 1j]}
+    cache.put(key, SCENARIO, CONFIG, result, probes)
+
+    reopened = ResultCache(filename)
+    assert reopened.get(key) == {'ber': 0.25, 'errors': 2, 'bits': 8}
+    assert np.all(reopened.probes(key)['rx_symbols'][0] == np.arange(4) + 1j)
@@ -0,0 +1,95 @@
+import pytest
+import threading
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+from simulation.datastore import DataStore
+from simulation.datastore import DataStoreConfig
+
+from channel.path_loss import PathLossChannel
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+
+
+@pytest.mark.quick
+def test_unit_requires_context():
+    with pytest.raises(RuntimeError):
+        PathLossChannel(R=10)
+
+
+@pytest.mark.quick
+def test_explicit_context():
+    outer = SimContext(params=SimParams(fc=1e3, fs=1e3))
+    inner = SimContext(params=SimParams(fc=2e3, fs=2e3))
+
+    with outer:
+        implicit = PathLossChannel(R=10)
+        explicit = PathLossChannel(R=10, context=inner)
+        after = PathLossChannel(R=10)
+
+    assert implicit.params.fc == 1e3
+    assert explicit.params.fc == 2e3
+    assert explicit.context is inner
+    assert after.context is outer
+
+
+@pytest.mark.quick
+def test_nested_context():
+    outer = SimContext(params=SimParams(fc=1e3, fs=1e3))
+    inner = SimContext(params=SimParams(fc=2e3, fs=2e3))
+
+    with outer:
+        with inner:
+            assert SimContext.current() is inner
+        assert SimContext.current() is outer
+
+
+@pytest.mark.quick
+def test_datastore_per_context():
+    config = DataStoreConfig(
+        path='out/dumps',
+        names=['dsp.common.resampling.poly.PolyResampler'],
+    )
+    stored = SimContext(params=SimParams(fc=1e3, fs=1e3),
+                        datastore=DataStore(config=config))
+    ignored = SimContext(params=SimParams(fc=1e3, fs=1e3))
+
+    resampler_config = PolyResamplerConfig(fin=1, fout=2)
+    PolyResampler(resampler_config, context=stored).store(x=1)
+    PolyResampler(resampler_config, context=ignored)
+
+    assert stored.datastore.data[PolyResampler.full_cls_name].impl['x'] == [1]
+    assert not ignored.datastore.data
+
+
+@pytest.mark.quick
+def test_concurrent_contexts():
+    Nthreads = 8
+    barrier = threading.Barrier(Nthreads)
+    results = {}
+
+    def worker(idx):
+        with SimContext(params=SimParams(fc=idx * 1e3, fs=idx * 1e3)):
+            barrier.wait()  # all contexts are active at the same time
+            unit = PathLossChannel(R=10)
+            results[idx] = (SimContext.current().params.fc, unit.params.fc)
+
+    threads = [threading.Thread(target=worker, args=(idx + 1, ))
+               for idx in range(Nthreads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for idx, (current_fc, unit_fc) in results.items():
+        assert current_fc == idx * 1e3
+        assert unit_fc == idx * 1e3
+
+
+@pytest.mark.quick
+def test_unit_ignored_by_datastore():
+    with SimContext(params=SimParams(fc=1e3, fs=1e3)):
+        unit = PathLossChannel(R=10)
+
+    assert not unit.store_enabled
+    unit.store(x=1)  # no-op
@@ -0,0 +1,110 @@
+import pytest
+import numpy as np
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.common.nco import Nco
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+from dsp.tx.duc import DUC, DUCConfig
+from dsp.rx.ddc import DDC, DDCConfig
+from dsp.rx.ddc import B_BP, B_LO
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=4e3, fs=1e3)) as context:
+        yield context
+
+
+def envelope(rng, length, band=300):
+    # a complex baseband signal in +-band bins of the length
+    spectrum = np.zeros(length, dtype=np.complex128)
+    spectrum[:band] = rng.standard_normal(band) + \
+        1j * rng.standard_normal(band)
+    spectrum[-band:] = rng.standard_normal(band) + \
+        1j * rng.standard_normal(band)
+    return np.fft.ifft(spectrum) * np.sqrt(length / (2 * band))
+
+
+def chunked(unit, signal, block):
+    blocks = [unit.process_block(signal[start:start + block])
+              for start in range(0, len(signal), block)]
+    tail = unit.flush()
+    if tail is not None:
+        blocks.append(tail)
+    return np.concatenate(blocks)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("frequency, rate", (
+    (4e3, 48000), (1e3, 44100), (12345.678, 48000)))
+def test_nco_phase_continuous(frequency, rate):
+    nco = Nco(frequency, rate)
+    expected = np.exp(2j * np.pi * frequency / rate * np.arange(10000))
+
+    assert np.allclose(nco.phasors(0, 10000), expected)
+    assert np.allclose(nco.phasors(123, 100), expected[123:223])
+    blocks = [nco.process(n) for n in (1, 99, 3000, 6900)]
+    assert np.allclose(np.concatenate(blocks), expected)
+
+    nco.reset()
+    assert np.allclose(nco.process(10), expected[:10])
+
+
+@pytest.mark.quick
+def test_poly_resampler_custom_taps(context):
+    signal = np.random.default_rng(0).standard_normal(1000)
+    resampler = PolyResampler(PolyResamplerConfig(fin=48, fout=1, taps=B_LO))
+    again = PolyResampler(PolyResamplerConfig(fin=48, fout=1,
+                                              taps=list(B_LO)))
+    assert resampler.taps is again.taps
+
+    # the centre of the FIR lands on the kept samples, the half length
+    # of the 16 taps is 7
+    output = resampler.process(signal)
+    assert np.allclose(output, np.convolve(signal, B_LO)[7::48][:len(output)])
+
+    # a FIR at an unchanged rate is applied too
+    same = PolyResampler(PolyResamplerConfig(fin=1, fout=1, taps=(0, 1, 0)))
+    assert np.allclose(same.process(signal), signal)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("bandpass", (None, B_BP))
+def test_duc_ddc_round_trip(context, bandpass):
+    # the passband of the DUC is the real audio, the DDC gives the
+    # envelope back with no gain, phase or delay
+    rng = np.random.default_rng(1)
+    x = envelope(rng, 4096)
+    duc = DUC(config=DUCConfig(fc=4e3, rate=48000, interpolation=48))
+    ddc = DDC(config=DDCConfig(fc=4e3, rate=48000, decimation=48,
+                               bandpass=bandpass))
+
+    signal = duc.process(x)
+    assert not np.iscomplexobj(signal)
+    assert len(signal) == 48 * len(x)
+
+    y = ddc.process(signal)
+    assert len(y) == len(x)
+    interior = slice(100, -100)
+    error = np.sum(np.abs(y - x)[interior] ** 2) / \
+        np.sum(np.abs(x[interior]) ** 2)
+    assert error < (1e-5 if bandpass is None else 1e-2)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("bandpass", (None, B_BP))
+@pytest.mark.parametrize("block", (7, 100, 4800))
+def test_duc_ddc_streaming(context, bandpass, block):
+    rng = np.random.default_rng(2)
+    x = envelope(rng, 1000)
+    duc = DUC(config=DUCConfig(fc=4e3, rate=48000, interpolation=48))
+    ddc = DDC(config=DDCConfig(fc=4e3, rate=48000, decimation=48,
+                               bandpass=bandpass, lowpass=B_LO))
+
+    signal = duc.process(x)
+    for _ in range(2):  # reset by flush
+        assert np.allclose(chunked(duc, x, max(1, block // 48)), signal)
+        assert np.allclose(chunked(ddc, signal, block), ddc.process(signal))
@@ -0,0 +1,102 @@
+import pytest
+import numpy as np
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.rx.correlator import PreambleCorrelator
+from dsp.rx.correlator import PreambleCorrelatorConfig
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=48e3)) as context:
+        yield context
+
+
+def random_symbols(rng, n):
+    return np.exp(2j * np.pi * rng.random(n))
+
+
+def capture(rng, reference, positions, length, snr_db=10.0):
+    signal = np.sqrt(10 ** (-snr_db / 10) / 2) * \
+        (rng.standard_normal(length) + 1j * rng.standard_normal(length))
+    for position in positions:
+        signal[position:position + len(reference)] += reference
+    return signal
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("length", (64, 100, 257))
+def test_correlator_matches_numpy(context, length):
+    rng = np.random.default_rng(0)
+    reference = random_symbols(rng, length)
+    signal = random_symbols(rng, 5000)
+
+    corr = PreambleCorrelator(reference=reference).process(signal)
+    assert np.allclose(corr, np.correlate(signal, reference, mode='valid'))
+
+
+@pytest.mark.quick
+def test_correlator_peaks(context):
+    rng = np.random.default_rng(1)
+    reference = random_symbols(rng, 128)
+    positions = (300, 2000, 2500, 7000)
+    signal = capture(rng, reference, positions, 10000)
+
+    correlator = PreambleCorrelator(reference=reference)
+    correlator.process(signal)
+    assert [round(peak.index) for peak in correlator.peaks] == list(positions)
+    for peak in correlator.peaks:
+        assert abs(peak.value) == pytest.approx(128, rel=0.1)
+        assert peak.snr > correlator.config.threshold
+
+    # noise only
+    correlator.process(capture(rng, reference, (), 10000))
+    assert correlator.peaks == []
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("delay", (0.0, 0.25, 0.5, -0.3))
+def test_correlator_subsample(context, delay):
+    # a band limited preamble delayed by a fraction of a sample
+    rng = np.random.default_rng(2)
+    spectrum = np.zeros(1024, dtype=np.complex128)
+    spectrum[:64] = random_symbols(rng, 64)
+    spectrum[-64:] = random_symbols(rng, 64)
+    reference = np.fft.ifft(spectrum) * 32
+    delayed = np.fft.ifft(spectrum * np.exp(
+        -2j * np.pi * np.fft.fftfreq(1024) * delay)) * 32
+
+    signal = capture(rng, delayed, (3000, ), 8000, snr_db=30.0)
+    correlator = PreambleCorrelator(reference=reference)
+    correlator.process(signal)
+
+    assert len(correlator.peaks) == 1
+    assert correlator.peaks[0].index == pytest.approx(3000 + delay, abs=0.1)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("block", (1, 100, 1000, 4096))
+def test_correlator_streaming(context, block):
+    rng = np.random.default_rng(3)
+    reference = random_symbols(rng, 100)
+    signal = capture(rng, reference, (0, 1500, 5000, 9900), 10000)
+
+    config = PreambleCorrelatorConfig(guard=8, window=128)
+    batch = PreambleCorrelator(reference=reference, config=config)
+    corr = batch.process(signal)
+
+    streaming = PreambleCorrelator(reference=reference, config=config)
+    chunks = [streaming.process_block(signal[start:start + block])
+              for start in range(0, len(signal), block)]
+    streaming.flush()
+
+    assert np.allclose(np.concatenate(chunks), corr)
+    assert len(streaming.peaks) == 4
+    for peak, expected in zip(streaming.peaks, batch.peaks):
+        assert peak.index == pytest.approx(expected.index)
+        assert peak.value == pytest.approx(expected.value)
+
+    streaming.reset()
+    assert streaming.peaks == []
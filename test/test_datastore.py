@@ -0,0 +1,232 @@
+import os
+import pytest
+import pickle as pkl
+import numpy as np
+
+from dataclasses import dataclass
+
+from simulation.datastore import DataStore
+from simulation.datastore import DataStoreConfig
+from simulation.datastore import INDEX_NAME
+from simulation.datastore import Lazy
+from simulation.datastore import load_dump
+
+Ncalls = 10
+
+
+@pytest.mark.quick
+def test_memory_backend(tmp_path):
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+    ))
+
+    for idx in range(Ncalls):
+        ds.store(signal=np.arange(idx), idx=idx)
+    ds.flush()
+
+    with open(os.path.join(tmp_path, '__main__.pkl'), 'rb') as fd:
+        dump = pkl.load(fd)
+
+    assert dump['idx'] == list(range(Ncalls))
+    assert all(np.all(entry == np.arange(idx))
+               for idx, entry in enumerate(dump['signal']))
+
+
+@pytest.mark.quick
+def test_disk_backend(tmp_path):
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend='disk',
+    ))
+
+    signals = [np.random.randn(idx + 1) + 1j * np.random.randn(idx + 1)
+               for idx in range(Ncalls)]
+    for idx, signal in enumerate(signals):
+        ds.store(signal=signal, idx=idx)
+
+    # segments are readable before flush, i.e. after a crash
+    dump = load_dump(os.path.join(tmp_path, '__main__'))
+    assert len(dump['signal']) == Ncalls
+
+    ds.flush()
+    dump = load_dump(os.path.join(tmp_path, '__main__'))
+
+    assert set(dump.keys()) == {'signal', 'idx'}
+    assert [int(entry) for entry in dump['idx']] == list(range(Ncalls))
+    for signal, entry in zip(signals, dump['signal']):
+        assert isinstance(entry, np.memmap)
+        assert np.all(entry == signal)
+
+
+@pytest.mark.quick
+def test_disk_backend_interrupted_index(tmp_path):
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend='disk',
+    ))
+    for idx in range(Ncalls):
+        ds.store(signal=np.full(4, idx))
+    ds.flush()
+
+    index = os.path.join(tmp_path, '__main__', INDEX_NAME)
+    with open(index, 'a') as fd:
+        fd.write('{"point": "sig')  # torn record
+
+    dump = load_dump(os.path.join(tmp_path, '__main__'))
+    assert len(dump['signal']) == Ncalls
+    assert np.all(dump['signal'][-1] == Ncalls - 1)
+
+
+@dataclass
+class Record:
+    index: float
+
+
+@pytest.mark.quick
+def test_disk_backend_objects(tmp_path):
+    # values numpy does not save as plain arrays are pickled
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend='disk',
+        probes={'offset': {'policy': 'ring', 'size': 1}},
+    ))
+    ds.store(offset=None, peaks=[Record(1.5), Record(2.0)],
+             ragged=[np.zeros(2), np.zeros(3)])
+    with pytest.raises((pkl.PicklingError, AttributeError)):
+        ds.store(peaks=lambda: None)  # not picklable
+    ds.store(offset=42)  # the same slot as an array
+    ds.flush()
+
+    folder = os.path.join(tmp_path, '__main__')
+    dump = load_dump(folder)
+    assert dump['peaks'][0] == [Record(1.5), Record(2.0)]
+    assert [len(entry) for entry in dump['ragged'][0]] == [2, 3]
+    assert len(dump['offset']) == 1 and int(dump['offset'][0]) == 42
+    assert sorted(os.listdir(os.path.join(folder, 'offset'))) == \
+        ['000000.npy']
+    assert not any(name.endswith('.tmp')
+                   for _, _, names in os.walk(folder) for name in names)
+
+
+@pytest.mark.quick
+def test_disk_backend_index_bounded(tmp_path):
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend='disk',
+        probes={'idx': {'policy': 'ring', 'size': 3}},
+    ))
+    for idx in range(1000):
+        ds.store(idx=idx)
+
+        # readable at any time
+        if idx % 97 == 0:
+            dump = load_dump(os.path.join(tmp_path, '__main__'))
+            assert [int(entry) for entry in dump['idx']] == \
+                list(range(max(0, idx - 2), idx + 1))
+    ds.flush()
+
+    with open(os.path.join(tmp_path, '__main__', INDEX_NAME)) as fd:
+        assert len(fd.readlines()) <= 2 * 3 + 64
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("backend", ('memory', 'disk'))
+@pytest.mark.parametrize("policy, expected", (
+    ({'policy': 'all'}, list(range(Ncalls))),
+    ({'policy': 'ring', 'size': 3}, [7, 8, 9]),
+    ({'policy': 'first', 'size': 3}, [0, 1, 2]),
+    ({'policy': 'decimate', 'step': 4}, [0, 4, 8]),
+    ({'policy': 'decimate', 'step': 2, 'size': 2}, [6, 8]),
+))
+def test_retention_policy(tmp_path, backend, policy, expected):
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend=backend,
+        probes={'idx': policy},
+    ))
+
+    for idx in range(Ncalls):
+        ds.store(idx=idx, other=idx)
+    ds.flush()
+
+    if backend == 'memory':
+        with open(os.path.join(tmp_path, '__main__.pkl'), 'rb') as fd:
+            dump = pkl.load(fd)
+    else:
+        dump = load_dump(os.path.join(tmp_path, '__main__'))
+
+    assert [int(entry) for entry in dump['idx']] == expected
+    assert len(dump['other']) == Ncalls  # other probes are kept as is
+
+
+@pytest.mark.quick
+def test_reservoir_policy(tmp_path):
+    size = 16
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        probes={'*': {'policy': 'reservoir', 'size': size, 'seed': 0}},
+    ))
+
+    for idx in range(100 * size):
+        ds.store(idx=idx)
+    ds.flush()
+
+    with open(os.path.join(tmp_path, '__main__.pkl'), 'rb') as fd:
+        dump = pkl.load(fd)
+
+    assert len(dump['idx']) == size
+    assert dump['idx'] == sorted(set(dump['idx']))  # unique, call ordered
+    assert dump['idx'][-1] >= size  # not just the first entries
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("backend", ('memory', 'disk'))
+def test_lazy_probes(tmp_path, backend):
+    calls = []
+
+    def probe(idx):
+        calls.append(idx)
+        return idx
+
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+        backend=backend,
+        probes={'idx': {'policy': 'decimate', 'step': 5}},
+    ))
+
+    assert ds.enabled
+    for idx in range(Ncalls):
+        ds.store(idx=Lazy(probe, idx))
+
+    assert calls == [0, 5]  # dropped entries are never evaluated
+
+
+@pytest.mark.quick
+def test_callable_values(tmp_path):
+    # only Lazy values are evaluated, other callables are the values
+    ds = DataStore(config=DataStoreConfig(
+        path=str(tmp_path),
+        names=['__main__'],
+    ))
+    ds.store(fn=len, cls=Record, lazy=Lazy(len, [1, 2]))
+    entries = ds.data['__main__'].entries()
+    assert entries == {'fn': [len], 'cls': [Record], 'lazy': [2]}
+
+
+@pytest.mark.quick
+def test_disabled_probes():
+    ds = DataStore(config=DataStoreConfig(path='', names=[]))
+
+    def probe():
+        assert False, 'disabled probe is evaluated'
+
+    assert not ds.enabled
+    ds.store(idx=Lazy(probe))
@@ -0,0 +1,151 @@
+import socket
+import pytest
+import threading
+import multiprocessing
+import socketserver
+
+import numpy as np
+
+from simulation import profiling
+from simulation.sweep import run_sweep
+from simulation.sweep import run_point
+from simulation.sweep import make_point_config
+from simulation.distributed import WorkerServer
+from simulation.distributed import run_remote
+from simulation.distributed import _encode_array
+from simulation.distributed import _decode_array
+from simulation.distributed import _encode_probes
+
+SCENARIO = 'scenario.audio_ofdm'
+CONFIG = {
+    'seed': 1,
+    'SimParams': {'fs': 1000, 'fc': 4000},
+    'AudioChannelConfig': {'rate': 48000, 'channels': 1,
+                           'format': 'Int16', 'device': 'default'},
+    'OFDMconfig': {'Nsc': 64, 'guard_interval_length': 28,
+                   'guard_interval_type': 'cyclic_prefix'},
+    'scenario': {'Nsymb': 1, 'constellation': {'order': 4}},
+    'DataStore': {'names': [], 'path': ''},
+}
+POINTS = [{'seed': seed, 'scenario.snr_db': snr}
+          for seed in (1, 2) for snr in (0, 20)]
+
+
+def serve(ports):
+    with WorkerServer(('127.0.0.1', 0)) as server:
+        ports.put(server.server_address[1])
+        server.serve_forever()
+
+
+class DroppingHandler(socketserver.BaseRequestHandler):
+    # accepts a job and closes the connection without an answer
+    def handle(self):
+        self.request.recv(1 << 16)
+
+
+def drop(ports):
+    with socketserver.TCPServer(('127.0.0.1', 0), DroppingHandler) as server:
+        ports.put(server.server_address[1])
+        server.serve_forever()
+
+
+def start(target, count):
+    ports = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=target, args=(ports, ),
+                                         daemon=True) for _ in range(count)]
+    for process in processes:
+        process.start()
+    return processes, [f'127.0.0.1:{ports.get(timeout=10)}'
+                       for _ in processes]
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'127.0.0.1:{sock.getsockname()[1]}'
+
+
+@pytest.fixture
+def workers():
+    processes, addresses = start(serve, 2)
+    yield addresses
+    for process in processes:
+        process.terminate()
+
+
+@pytest.fixture
+def local_worker():
+    # in the test process, its profiling state is visible here
+    server = WorkerServer(('127.0.0.1', 0))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield '127.0.0.1:%d' % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.quick
+def test_distributed_sweep(workers):
+    results = run_sweep(SCENARIO, CONFIG, POINTS, workers=workers)
+
+    for point, outcome in zip(POINTS, results):
+        assert outcome['point'] == point
+        assert outcome['error'] is None
+        expected = run_point(SCENARIO, make_point_config(CONFIG, point))
+        assert outcome['result'] == pytest.approx(expected['result'])
+
+
+@pytest.mark.quick
+def test_distributed_retries(workers):
+    dropping, addresses = start(drop, 1)
+    try:
+        results = run_sweep(SCENARIO, CONFIG, POINTS,
+                            workers=workers + addresses + [closed_port()])
+    finally:
+        dropping[0].terminate()
+
+    assert [outcome['point'] for outcome in results] == POINTS
+    assert all(outcome['error'] is None for outcome in results)
+    assert all(np.isfinite(outcome['result']['ber']) for outcome in results)
+
+
+@pytest.mark.quick
+def test_distributed_no_workers():
+    with pytest.raises(RuntimeError):
+        run_sweep(SCENARIO, CONFIG, POINTS, workers=[closed_port()])
+
+
+@pytest.mark.quick
+def test_distributed_probes(local_worker, tmp_path):
+    # probes are sent as raw buffers of their dtype and shape, the profiling
+    # of a job is switched off once it is done
+    config = {**CONFIG,
+              'DataStore': {'names': ['__main__'], 'path': str(tmp_path)},
+              'cache': {'probes': ['payload', 'rx_symbols', 'mer_db']}}
+    expected = run_point(SCENARIO, config)['probes']
+    assert expected and not profiling.enabled()
+
+    outcome, = run_remote([(0, SCENARIO, {}, config)], [local_worker],
+                          profile=True)
+    assert not profiling.enabled()
+    assert outcome['error'] is None and outcome['profile']
+    assert set(outcome['probes']) == set(expected)
+    for name, entries in expected.items():
+        received = outcome['probes'][name]
+        assert len(received) == len(entries)
+        for entry, value in zip(entries, received):
+            assert value.dtype == entry.dtype and value.shape == entry.shape
+            assert np.array_equal(value, entry)
+
+
+@pytest.mark.quick
+def test_distributed_object_probes(caplog):
+    array = np.arange(12, dtype='>i2').reshape(3, 4)[:, ::2]
+    assert np.array_equal(_decode_array(_encode_array(array)), array)
+
+    objects = np.array([{'a': 1}, None], dtype=object)
+    encoded = _encode_probes({'plain': [array], 'objects': [objects]})
+    assert list(encoded) == ['plain']
+    assert any('objects' in record.message for record in caplog.records)
+    with pytest.raises(ValueError):
+        _decode_array({'dtype': '|O', 'shape': [2], 'data': ''})
@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+
+from dsp.metrics.evm import EvmMeter
+from dsp.metrics.errors import BitErrorCounter
+from dsp.metrics.errors import SymbolErrorCounter
+
+
+@pytest.mark.quick
+def test_bit_error_counter():
+    rng = np.random.default_rng(0)
+    tx = rng.integers(0, 256, 10000, dtype=np.uint8)
+    rx = tx ^ np.packbits(rng.random(80000) < 0.01)
+    tx_bits = np.unpackbits(tx)
+    rx_bits = np.unpackbits(rx)
+
+    packed, unpacked, merged = (BitErrorCounter() for _ in range(3))
+    packed.update(tx.tobytes(), rx.tobytes())
+    unpacked.update_bits(tx_bits, rx_bits)
+    for chunk in np.array_split(np.arange(len(tx)), 7):
+        counter = BitErrorCounter()
+        counter.update(tx[chunk], rx[chunk])
+        merged.merge(counter)
+
+    expected = np.count_nonzero(tx_bits != rx_bits)
+    assert packed == unpacked == merged
+    assert packed.errors == expected and packed.bits == 80000
+    assert packed.as_dict()['ber'] == expected / 80000
+
+
+@pytest.mark.quick
+def test_symbol_error_counter():
+    tx = np.arange(100) % 16
+    rx = tx.copy()
+    rx[::10] = (rx[::10] + 1) % 16
+
+    counter = SymbolErrorCounter()
+    counter.update(tx[:50], rx[:50])
+    other = SymbolErrorCounter()
+    other.update(tx[50:], rx[50:])
+    counter.merge(other)
+
+    assert counter.errors == 10 and counter.symbols == 100
+    assert counter.ser == 0.1
+
+
+@pytest.mark.quick
+def test_evm_meter():
+    Nsc, Nsymb = 16, 200
+    rng = np.random.default_rng(0)
+    reference = np.exp(2j * np.pi * rng.random((Nsymb, Nsc)))
+    noise_std = np.linspace(0.01, 0.1, Nsc)
+    received = reference + noise_std * (rng.standard_normal((Nsymb, Nsc)) +
+                                        1j * rng.standard_normal((Nsymb, Nsc)))
+
+    meter = EvmMeter(Nsc=Nsc)
+    meter.update(reference[:50].flatten(), received[:50].flatten())
+    other = EvmMeter(Nsc=Nsc)
+    other.update(reference[50:].flatten(), received[50:].flatten())
+    meter.merge(other)
+
+    error = np.abs(received - reference) ** 2
+    assert meter.symbols == Nsymb * Nsc
+    assert meter.evm == pytest.approx(np.sqrt(np.mean(error)))
+    assert np.allclose(meter.mer_db, -10 * np.log10(np.mean(error, axis=0)))
+    assert np.allclose(meter.mer_db, -10 * np.log10(2 * noise_std ** 2),
+                       atol=1)
+
+
+@pytest.mark.quick
+def test_evm_meter_subcarriers():
+    # data cells of a comb frame, pilot subcarriers have no MER
+    Nsc, Nsymb = 8, 300
+    rng = np.random.default_rng(1)
+    pilots = np.arange(Nsc) % 4 == 0
+    subcarriers = np.tile(np.flatnonzero(~pilots), Nsymb)
+    reference = np.exp(2j * np.pi * rng.random(len(subcarriers)))
+    noise_std = np.linspace(0.01, 0.1, Nsc)[subcarriers]
+    received = reference + noise_std * (
+        rng.standard_normal(len(reference)) +
+        1j * rng.standard_normal(len(reference)))
+
+    meter = EvmMeter(Nsc=Nsc)
+    meter.update(reference, received, subcarriers)
+    assert meter.symbols == len(reference)
+    assert np.all(np.isnan(meter.mer_db[pilots]))
+
+    error = np.abs(received - reference) ** 2
+    expected = [-10 * np.log10(np.mean(error[subcarriers == k]))
+                for k in np.flatnonzero(~pilots)]
+    assert np.allclose(meter.mer_db[~pilots], expected)
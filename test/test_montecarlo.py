@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+
+from scipy.stats import binom
+
+from simulation.montecarlo import INTERVALS
+from simulation.montecarlo import MonteCarloConfig
+from simulation.montecarlo import run_until
+
+from dsp.metrics.errors import BitErrorCounter
+
+
+def frame_source(ber, bits=1000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def frame():
+        return BitErrorCounter(errors=rng.binomial(bits, ber), bits=bits)
+    return frame
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("interval", INTERVALS.keys())
+def test_interval_coverage(interval):
+    bits, ber, confidence = 2000, 0.01, 0.95
+    errors = np.arange(bits + 1)
+    covered = [low <= ber <= high for low, high in
+               (INTERVALS[interval](e, bits, confidence) for e in errors)]
+
+    coverage = np.sum(binom.pmf(errors, bits, ber)[covered])
+    assert coverage > 0.93
+
+    low, high = INTERVALS[interval](0, bits, confidence)
+    assert low == pytest.approx(0) and 0 < high < 0.01
+
+
+@pytest.mark.quick
+def test_stop_by_errors():
+    estimate = run_until(frame_source(ber=0.01),
+                         MonteCarloConfig(target_errors=100))
+
+    assert estimate.stop_reason == 'errors'
+    assert estimate.errors >= 100
+    assert estimate.bits == estimate.frames * 1000
+    assert estimate.ci_low <= estimate.ber <= estimate.ci_high
+
+
+@pytest.mark.quick
+def test_stop_by_confidence():
+    estimate = run_until(frame_source(ber=0.05),
+                         MonteCarloConfig(target_errors=0, target_rel_ci=0.1,
+                                          interval='clopper_pearson'))
+
+    assert estimate.stop_reason == 'confidence'
+    assert (estimate.ci_high - estimate.ci_low) / 2 / estimate.ber <= 0.1
+
+
+@pytest.mark.quick
+def test_stop_by_budget():
+    estimate = run_until(frame_source(ber=0.0),
+                         MonteCarloConfig(target_errors=10, max_bits=20000))
+
+    assert estimate.stop_reason == 'budget'
+    assert estimate.errors == 0 and estimate.bits == 20000
+    assert estimate.ci_low == 0 and estimate.ci_high > 0
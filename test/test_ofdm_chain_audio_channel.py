@@ -3,6 +3,7 @@ import logging
 import numpy as np
 
 from simulation.params import SimParams
+from simulation.context import SimContext
 
 from dsp.tx.ofdm import OFDM, OFDMconfig
 
@@ -24,26 +25,29 @@ Scs = 1e3  # subcarrier spacing
 def test_ofdm_chain(fs):
     logging.basicConfig(level=logging.DEBUG)
 
-    SimParams(
-        fc=10e3,
-        fs=fs,
+    context = SimContext(
+        params=SimParams(
+            fc=10e3,
+            fs=fs,
+        ),
     )
 
-    logging.info(f'Test with SimParams: {SimParams()}')
+    logging.info(f'Test with SimParams: {context.params}')
 
-    Nsc = int(SimParams().fs / Scs)  # number of subcarriers
+    Nsc = int(context.params.fs / Scs)  # number of subcarriers
     test_ofdm_config = OFDMconfig(
         Nsc=Nsc,
         guard_interval_length=4,
         guard_interval_type='cyclic_prefix',
     )
 
-    ofdm_modulator = OFDM(config=test_ofdm_config)
-    ofdm_rx_chain = OFDMRxChain(
-        frontend=OFDMfrontend(config=test_ofdm_config),
-        estimator=OFDMChannleEstimator(),
-        equalizer=OFDMChannleEqualizer(),
-    )
+    with context:
+        ofdm_modulator = OFDM(config=test_ofdm_config)
+        ofdm_rx_chain = OFDMRxChain(
+            frontend=OFDMfrontend(config=test_ofdm_config),
+            estimator=OFDMChannleEstimator(),
+            equalizer=OFDMChannleEqualizer(),
+        )
 
     audio_ch_conf = AudioChannelConfig(
         fs=48000,
@@ -58,7 +62,7 @@ def test_ofdm_chain(fs):
 
     ofdm_signal = ofdm_modulator.process(tx_symbols)
 
-    with RawAudioChannel(config=audio_ch_conf) as channel:
+    with RawAudioChannel(config=audio_ch_conf, context=context) as channel:
         recv_ofdm_signal = channel.route_audio(ofdm_signal)  # propagation
 
     rx_symbols = ofdm_rx_chain.process(recv_ofdm_signal)
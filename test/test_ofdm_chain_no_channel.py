@@ -3,6 +3,7 @@ import logging
 import numpy as np
 
 from simulation.params import SimParams
+from simulation.context import SimContext
 from simulation.datastore import DataStore
 from simulation.datastore import DataStoreConfig
 
@@ -22,29 +23,31 @@ Scs = 1e3  # subcarrier spacing
 def test_ofdm_chain(fs):
     logging.basicConfig(level=logging.DEBUG)
 
-    SimParams(
-        fc=10e3,
-        fs=fs,
+    context = SimContext(
+        params=SimParams(
+            fc=10e3,
+            fs=fs,
+        ),
+        datastore=DataStore(config=DataStoreConfig(
+            path='out/dumps',
+            names=[]
+        )),
     )
 
-    DataStore(config=DataStoreConfig(
-        path='out/dumps',
-        names=[]
-    ))
-
-    Nsc = int(SimParams().fs / Scs)  # number of subcarriers
+    Nsc = int(context.params.fs / Scs)  # number of subcarriers
     test_ofdm_config = OFDMconfig(
         Nsc=Nsc,
         guard_interval_length=4,
         guard_interval_type='cyclic_prefix',
     )
 
-    ofdm_modulator = OFDM(config=test_ofdm_config)
-    ofdm_rx_chain = OFDMRxChain(
-        frontend=OFDMfrontend(config=test_ofdm_config),
-        estimator=OFDMChannleEstimator(),
-        equalizer=OFDMChannleEqualizer(),
-    )
+    with context:
+        ofdm_modulator = OFDM(config=test_ofdm_config)
+        ofdm_rx_chain = OFDMRxChain(
+            frontend=OFDMfrontend(config=test_ofdm_config),
+            estimator=OFDMChannleEstimator(),
+            equalizer=OFDMChannleEqualizer(),
+        )
 
     bitstream = np.random.randint(0, 2, Nsc * Nsymb)
 
@@ -60,3 +63,83 @@ def test_ofdm_chain(fs):
     bitstream_hat = (np.real(rx_symbols) > 0).astype(np.int64)
 
     assert np.all(bitstream == bitstream_hat)  # no noise no error
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("gi_type", ('cyclic_prefix', 'cyclic_suffix',
+                                     'zero_padding'))
+@pytest.mark.parametrize("gi_length", (0, 16))
+def test_ofdm_buffers(gi_type, gi_length):
+    config = OFDMconfig(Nsc=64, guard_interval_length=gi_length,
+                        guard_interval_type=gi_type)
+    symbol_len = config.Nsc + gi_length
+
+    with SimContext(params=SimParams(fc=10e3, fs=64e3)):
+        ofdm_modulator = OFDM(config=config)
+        frontend = OFDMfrontend(config=config)
+
+    symbols = np.exp(2j * np.pi * np.random.rand(config.Nsc * 10))
+    out = np.full(10 * symbol_len, np.nan, dtype=np.complex128)
+    ofdm_signal = ofdm_modulator.process(symbols, out=out)
+    assert ofdm_signal is out
+
+    frames = out.reshape(10, symbol_len)
+    body = np.fft.ifft(symbols.reshape(10, -1), axis=1)
+    if gi_type == 'cyclic_suffix':
+        assert np.allclose(frames[:, :config.Nsc], body)
+        assert np.allclose(frames[:, config.Nsc:], body[:, :gi_length])
+    else:
+        assert np.allclose(frames[:, gi_length:], body)
+        guard = body[:, config.Nsc - gi_length:] \
+            if gi_type == 'cyclic_prefix' else 0
+        assert np.allclose(frames[:, :gi_length], guard)
+
+    rx = np.empty((10, config.Nsc), dtype=np.complex128)
+    assert frontend.process(ofdm_signal, out=rx) is rx
+    assert np.allclose(rx.flatten(), symbols)
+
+    # partial trailing OFDM symbols are not wrapped around
+    with pytest.raises(ValueError):
+        frontend.process(ofdm_signal[:-1])
+    with pytest.raises(ValueError):
+        ofdm_modulator.process(symbols[:-1])
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("gi_type", ('cyclic_prefix', 'cyclic_suffix',
+                                     'zero_padding'))
+@pytest.mark.parametrize("fft_size, offset", ((None, 1), (512, 100)))
+def test_ofdm_real_baseband(gi_type, fft_size, offset):
+    config = OFDMconfig(Nsc=64, guard_interval_length=16,
+                        guard_interval_type=gi_type, baseband='real',
+                        fft_size=fft_size, subcarrier_offset=offset)
+    fft_len = fft_size or 2 * (offset + 64)
+
+    with SimContext(params=SimParams(fc=10e3, fs=64e3)):
+        ofdm_modulator = OFDM(config=config)
+        frontend = OFDMfrontend(config=config)
+
+    symbols = np.exp(2j * np.pi * np.random.rand(config.Nsc * 10))
+    ofdm_signal = ofdm_modulator.process(symbols)
+    assert ofdm_signal.dtype == np.float64
+    assert len(ofdm_signal) == 10 * (fft_len + 16)
+
+    # the subcarriers take their window of the one sided spectrum only
+    start = 0 if gi_type == 'cyclic_suffix' else 16
+    body = ofdm_signal.reshape(10, -1)[:, start:start + fft_len]
+    spectrum = np.fft.rfft(body, axis=1)
+    assert np.allclose(spectrum[:, offset:offset + 64],
+                       symbols.reshape(10, -1))
+    assert np.allclose(np.delete(spectrum, np.s_[offset:offset + 64], axis=1),
+                       0)
+
+    rx = frontend.process(ofdm_signal)
+    assert np.allclose(rx.flatten(), symbols)
+    rx = np.empty((10, config.Nsc), dtype=np.complex128)
+    assert frontend.process(ofdm_signal, out=rx) is rx
+    assert np.allclose(rx.flatten(), symbols)
+
+    with pytest.raises(AssertionError):
+        OFDMconfig(Nsc=64, guard_interval_length=16,
+                   guard_interval_type=gi_type, baseband='real',
+                   fft_size=128, subcarrier_offset=1)
@@ -0,0 +1,249 @@
+import pytest
+import numpy as np
+
+from scipy.signal import lfilter
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.tx.ofdm import OFDM, OFDMconfig
+from dsp.tx.qam import QAMModulator
+from dsp.rx.qam import QAMSoftDemodulator
+from dsp.common.qam import QAMConstellation
+from dsp.common.pilots import data_per_frame
+
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizerConfig
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.estimator import OFDMChannleEstimatorConfig
+from dsp.rx.ofdm.estimator import wiener_matrix
+from dsp.rx.ofdm.estimator import interpolation_matrix
+from dsp.common.pilots import pilot_mask
+from dsp.rx.ofdm.chain import OFDMRxChain
+
+Nframes = 50
+IR = np.array([1, 0.6j, -0.3, 0.1 + 0.1j])  # shorter than the guard interval
+
+PATTERNS = (('comb', 4, 1), ('block', 4, 4), ('scattered', 8, 4))
+
+
+def ofdm_config(pattern, spacing, period, gi=8):
+    return OFDMconfig(Nsc=64, guard_interval_length=gi,
+                      guard_interval_type='cyclic_prefix',
+                      pilot_pattern=pattern, pilot_spacing=spacing,
+                      pilot_period=period)
+
+
+def transmit(config, snr_db, seed=0, ir=IR):
+    rng = np.random.default_rng(seed)
+    ofdm_modulator = OFDM(config=config)
+    data = np.exp(2j * np.pi * rng.integers(0, 4, Nframes *
+                                            data_per_frame(config)) / 4)
+    signal = lfilter(ir, 1, ofdm_modulator.process(data))
+
+    # noise variance per subcarrier after the receiver FFT
+    noise_var = 10 ** (-snr_db / 10) * np.mean(np.abs(np.fft.fft(ir, 64)) ** 2)
+    noise = np.sqrt(noise_var / 64 / 2) * (rng.standard_normal(len(signal)) +
+                                           1j * rng.standard_normal(len(signal)))
+    return data, signal + noise, noise_var
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=64e3)) as context:
+        yield context
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("pattern, spacing, period", PATTERNS)
+@pytest.mark.parametrize("mode", ('ls', 'lmmse'))
+def test_ofdm_estimator(context, pattern, spacing, period, mode):
+    config = ofdm_config(pattern, spacing, period)
+    frontend = OFDMfrontend(config=config)
+    estimator = OFDMChannleEstimator(
+        ofdm_config=config,
+        config=OFDMChannleEstimatorConfig(mode=mode, delay_spread=1.0))
+
+    _, signal, noise_var = transmit(config, snr_db=20)
+    chest, noise_var_hat = estimator.process(frontend.process(signal))
+
+    assert chest.shape == (Nframes * period, 64)
+    assert noise_var_hat == pytest.approx(noise_var, rel=0.2)
+
+    true = np.fft.fft(IR, 64)
+    mse = np.mean(np.abs(chest - true) ** 2) / np.mean(np.abs(true) ** 2)
+    assert mse < 0.05
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("gi", (16, 28))
+@pytest.mark.parametrize("mode", ('ls', 'lmmse'))
+def test_ofdm_noise_repeated_pilots(context, caplog, gi, mode):
+    # 17 comb pilots do not span the noise of GI + 1 taps, the noise
+    # variance comes from the pilots repeated over the OFDM symbols
+    config = ofdm_config('comb', 4, 1, gi=gi)
+    frontend = OFDMfrontend(config=config)
+    estimator = OFDMChannleEstimator(
+        ofdm_config=config, config=OFDMChannleEstimatorConfig(mode=mode))
+
+    _, signal, noise_var = transmit(config, snr_db=20)
+    symbols = frontend.process(signal)
+    chest, noise_var_hat = estimator.process(symbols)
+    assert noise_var_hat == pytest.approx(noise_var, rel=0.2)
+    assert np.mean(np.abs(chest - np.fft.fft(IR, 64)) ** 2) < 0.05
+
+    # a single OFDM symbol has no estimate, it is told once
+    with np.errstate(all='raise'):
+        for _ in range(2):
+            assert estimator.process(symbols[:1])[1] is None
+        # nor has an empty block
+        chest, noise_var_hat = estimator.process(symbols[:0])
+    assert chest.shape == (0, 64) and noise_var_hat is None
+    for pattern, spacing, period in PATTERNS[1:]:
+        with np.errstate(all='raise'):
+            assert OFDMChannleEstimator(
+                ofdm_config=ofdm_config(pattern, spacing, period, gi=gi)
+            ).process(np.zeros((0, 64)))[1] is None
+    assert sum('noise_var is None' in record.message
+               for record in caplog.records) == 1
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("pattern, spacing, period", PATTERNS)
+def test_ofdm_interpolation_matrix(pattern, spacing, period):
+    # separable linear interpolation of the pilots, sparse at 1024
+    # subcarriers
+    config = OFDMconfig(Nsc=1024, guard_interval_length=16,
+                        guard_interval_type='cyclic_prefix',
+                        pilot_pattern=pattern, pilot_spacing=spacing,
+                        pilot_period=period)
+    mask = pilot_mask(config)
+    matrix = interpolation_matrix(config)
+    assert matrix.shape == (mask.size, np.count_nonzero(mask))
+    assert matrix.nnz <= 4 * mask.size
+
+    values = np.random.default_rng(3).standard_normal(matrix.shape[1])
+    grid = np.zeros(mask.shape)
+    grid[mask] = values
+    carriers = np.flatnonzero(np.any(mask, axis=0))
+    times = np.arange(mask.shape[0])
+    in_time = np.stack([np.interp(times, np.flatnonzero(mask[:, k]),
+                                  grid[mask[:, k], k]) for k in carriers], 1)
+    expected = np.stack([np.interp(np.arange(mask.shape[1]), carriers, row)
+                         for row in in_time])
+    assert np.allclose(matrix @ values, expected.ravel())
+
+
+@pytest.mark.quick
+def test_ofdm_lmmse_gain(context):
+    config = ofdm_config('comb', 4, 1)
+    frontend = OFDMfrontend(config=config)
+    _, signal, _ = transmit(config, snr_db=5)
+    symbols = frontend.process(signal)
+    true = np.fft.fft(IR, 64)
+
+    errors = {}
+    for mode in ('ls', 'lmmse'):
+        estimator = OFDMChannleEstimator(
+            ofdm_config=config, config=OFDMChannleEstimatorConfig(mode=mode))
+        chest, _ = estimator.process(symbols)
+        errors[mode] = np.mean(np.abs(chest - true) ** 2)
+
+    assert errors['lmmse'] < 0.7 * errors['ls']
+
+    # Wiener matrices are cached per pattern, delay spread and SNR bucket
+    wiener_matrix.cache_clear()
+    estimator.process(symbols)
+    estimator.process(symbols)
+    assert wiener_matrix.cache_info().hits == 1
+    assert wiener_matrix.cache_info().misses == 1
+    assert wiener_matrix.cache_info().maxsize is not None
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("pattern, spacing, period", PATTERNS[:2])
+@pytest.mark.parametrize("delay", (2, 6))
+def test_ofdm_lmmse_delay(context, pattern, spacing, period, delay):
+    # a capture delay or an early FFT window turns the phase over the
+    # subcarriers, the correlation model is centred on the mean delay
+    config = ofdm_config(pattern, spacing, period, gi=16)
+    ir = np.concatenate((np.zeros(delay), IR))
+    _, signal, _ = transmit(config, snr_db=20, ir=ir)
+    estimator = OFDMChannleEstimator(
+        ofdm_config=config, config=OFDMChannleEstimatorConfig(mode='lmmse'))
+    chest, _ = estimator.process(OFDMfrontend(config=config).process(signal))
+
+    true = np.fft.fft(ir, 64)
+    mse = np.mean(np.abs(chest - true) ** 2) / np.mean(np.abs(true) ** 2)
+    assert mse < 0.02
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("pattern, spacing, period", PATTERNS)
+@pytest.mark.parametrize("equalizer", ('zf', 'mmse'))
+def test_ofdm_chain_pilots(context, pattern, spacing, period, equalizer):
+    config = ofdm_config(pattern, spacing, period)
+    chain = OFDMRxChain(
+        frontend=OFDMfrontend(config=config),
+        estimator=OFDMChannleEstimator(ofdm_config=config),
+        equalizer=OFDMChannleEqualizer(
+            config=OFDMChannleEqualizerConfig(mode=equalizer)),
+    )
+
+    data, signal, _ = transmit(config, snr_db=25)
+    rx_data = chain.process(signal)
+
+    assert rx_data.shape == data.shape
+    assert chain.noise_var.shape == data.shape
+    decisions = np.exp(2j * np.pi * np.round(np.angle(rx_data) /
+                                             (np.pi / 2)) / 4)
+    assert np.allclose(decisions, data)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("pattern, spacing, period",
+                         PATTERNS + (('none', 4, 4), ))
+@pytest.mark.parametrize("mode, equalizer", (('ls', 'zf'), ('lmmse', 'mmse')))
+def test_ofdm_batch(context, pattern, spacing, period, mode, equalizer):
+    # independent transmissions at different SNRs, every frame of the batch
+    # is the same as processed on its own
+    config = ofdm_config(pattern, spacing, period)
+    constellation = QAMConstellation(order=16, mapping='gray')
+    modulator = QAMModulator(constellation=constellation)
+    demodulator = QAMSoftDemodulator(constellation=constellation, soft=True)
+
+    def chain():
+        return OFDMRxChain(
+            frontend=OFDMfrontend(config=config),
+            estimator=OFDMChannleEstimator(
+                ofdm_config=config,
+                config=OFDMChannleEstimatorConfig(mode=mode)),
+            equalizer=OFDMChannleEqualizer(
+                config=OFDMChannleEqualizerConfig(mode=equalizer)),
+        )
+
+    rng = np.random.default_rng(0)
+    nbits = 4 * data_per_frame(config) * 2
+    bits = rng.integers(0, 2, (5, nbits))
+    signals = OFDM(config=config).process_batch(modulator.process_batch(bits))
+    signals = signals + 10 ** (-np.arange(5)[:, None] * 0.5) * \
+        rng.standard_normal(signals.shape)
+
+    batch = chain()
+    rx_data = batch.process_batch(signals)
+    noise_var = batch.noise_var if batch.noise_var is not None else 1.0
+    llrs = demodulator.process_batch(rx_data, noise_var)
+    assert rx_data.shape == (5, nbits // 4)
+    assert llrs.shape == bits.shape
+
+    for k, signal in enumerate(signals):
+        single = chain()
+        assert np.allclose(rx_data[k], single.process(signal))
+        if single.noise_var is not None:
+            assert np.allclose(batch.noise_var[k], single.noise_var)
+            assert np.allclose(llrs[k], demodulator.process(
+                rx_data[k], single.noise_var), rtol=1e-4)
+
+    # the cleanest frame is error free
+    assert np.all((llrs[-1] < 0) == bits[-1])
@@ -0,0 +1,106 @@
+import pytest
+import numpy as np
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+from simulation.pipeline import Pipeline
+from simulation.unit import SimUnit
+
+from dsp.common.qam import QAMConstellation
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+
+from dsp.tx.qam import QAMModulator
+from dsp.rx.qam import QAMSoftDemodulator
+from dsp.tx.ofdm import OFDM, OFDMconfig
+
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.chain import OFDMRxChain
+
+Nblocks = 50
+Nbits = 1000
+
+
+class FailingUnit(SimUnit):
+    def __init__(self) -> None:
+        super().__init__()
+        self.config = []
+
+    def process(self, x):
+        raise ValueError('broken unit')
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=48e3)) as context:
+        yield context
+
+
+@pytest.mark.quick
+def test_pipeline_chain(context):
+    config = OFDMconfig(
+        Nsc=64,
+        guard_interval_length=16,
+        guard_interval_type='cyclic_prefix',
+    )
+    constellation = QAMConstellation(order=16)
+
+    pipeline = Pipeline([
+        QAMModulator(constellation=constellation),
+        OFDM(config=config),
+        PolyResampler(PolyResamplerConfig(fin=1, fout=1)),
+        OFDMRxChain(
+            frontend=OFDMfrontend(config=config),
+            estimator=OFDMChannleEstimator(),
+            equalizer=OFDMChannleEqualizer(),
+        ),
+        QAMSoftDemodulator(constellation=constellation),
+    ], queue_size=2)
+
+    blocks = [np.random.randint(0, 2, Nbits) for _ in range(Nblocks)]
+    output = np.concatenate(list(pipeline.run(iter(blocks))))
+
+    bits = np.concatenate(blocks)
+    assert np.all(output == bits[:len(output)])
+    # only the bits of the last incomplete OFDM symbol stay in the chain
+    assert len(bits) - len(output) < config.Nsc * constellation.pow
+
+    for stats in pipeline.stats:
+        assert stats.blocks == Nblocks
+        assert 0 <= stats.occupancy <= stats.occupancy_max <= 2
+
+
+@pytest.mark.quick
+def test_pipeline_failure(context):
+    pipeline = Pipeline([
+        PolyResampler(PolyResamplerConfig(fin=1, fout=2)),
+        FailingUnit(),
+        PolyResampler(PolyResamplerConfig(fin=2, fout=1)),
+    ])
+
+    blocks = (np.random.randn(100) for _ in range(Nblocks))
+    with pytest.raises(RuntimeError) as error:
+        list(pipeline.run(blocks))
+    assert isinstance(error.value.__cause__, ValueError)
+
+
+@pytest.mark.quick
+def test_pipeline_early_exit(context):
+    pipeline = Pipeline([PolyResampler(PolyResamplerConfig(fin=1, fout=2))])
+
+    blocks = (np.random.randn(100) for _ in range(10 * Nblocks))
+    for idx, _ in enumerate(pipeline.run(blocks)):
+        if idx == 3:
+            break  # the generator is closed, all threads have to finish
+
+
+@pytest.mark.quick
+def test_pipeline_stats_per_run(context):
+    pipeline = Pipeline([PolyResampler(PolyResamplerConfig(fin=1, fout=2))])
+
+    for count in (Nblocks, 3):
+        blocks = (np.random.randn(100) for _ in range(count))
+        list(pipeline.run(blocks))
+        assert [stats.blocks for stats in pipeline.stats] == [count]
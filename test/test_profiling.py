@@ -0,0 +1,102 @@
+import pytest
+import numpy as np
+
+from simulation import profiling
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.tx.ofdm import OFDM, OFDMconfig
+from dsp.tx.qam import QAMModulator
+from dsp.common.qam import QAMConstellation
+from dsp.rx.ddc import DDC, DDCConfig
+
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.chain import OFDMRxChain
+
+Nsymb = 100
+Ncalls = 3
+
+
+@pytest.fixture
+def profiler():
+    profiling.reset()
+    profiling.enable()
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+@pytest.mark.quick
+def test_unit_profiling(profiler):
+    config = OFDMconfig(
+        Nsc=64,
+        guard_interval_length=16,
+        guard_interval_type='cyclic_prefix',
+    )
+
+    with SimContext(params=SimParams(fc=10e3, fs=64e3)):
+        ofdm_modulator = OFDM(config=config)
+        ofdm_rx_chain = OFDMRxChain(
+            frontend=OFDMfrontend(config=config),
+            estimator=OFDMChannleEstimator(),
+            equalizer=OFDMChannleEqualizer(),
+        )
+
+    symbols = np.exp(1j * np.random.randn(Nsymb * config.Nsc))
+    for _ in range(Ncalls):
+        ofdm_rx_chain.process(ofdm_modulator.process(symbols))
+
+    stats = profiler.snapshot()
+
+    tx = stats[OFDM.full_cls_name]
+    assert tx['calls'] == Ncalls
+    assert tx['samples_in'] == Ncalls * Nsymb * config.Nsc
+    assert tx['samples_out'] == Ncalls * Nsymb * (config.Nsc + 16)
+    assert tx['peak_alloc'] > 0
+
+    chain = stats[OFDMRxChain.full_cls_name]
+    frontend = stats[OFDMfrontend.full_cls_name]
+    assert chain['self_time'] < chain['time']
+    assert chain['time'] >= frontend['time']
+    assert chain['peak_alloc'] >= frontend['peak_alloc']
+
+    assert OFDM.full_cls_name in profiler.report()
+
+
+@pytest.mark.quick
+def test_entry_points_profiling(profiler):
+    # the streaming, batch and byte entry points are reported apart from
+    # process(), which they may call
+    with SimContext(params=SimParams(fc=4e3, fs=1e3)):
+        ddc = DDC(config=DDCConfig(fc=4e3, rate=48000, decimation=48))
+        ofdm_modulator = OFDM(config=OFDMconfig(
+            Nsc=64, guard_interval_length=16,
+            guard_interval_type='cyclic_prefix'))
+        modulator = QAMModulator(constellation=QAMConstellation(order=16))
+
+    signal = np.random.randn(4800)
+    for start in range(0, len(signal), 480):
+        ddc.process_block(signal[start:start + 480])
+    ddc.flush()
+    ofdm_modulator.process_batch(np.ones((2, 64 * 3), dtype=np.complex128))
+    modulator.process_bytes(np.arange(10, dtype=np.uint8))
+
+    stats = profiler.snapshot()
+    block = stats[DDC.full_cls_name + '.process_block']
+    assert block['calls'] == 10 and block['samples_in'] == 4800
+    assert stats[DDC.full_cls_name + '.flush']['calls'] == 1
+    batch = stats[OFDM.full_cls_name + '.process_batch']
+    assert batch['calls'] == 1 and batch['samples_out'] == 2 * 3 * 80
+    assert stats[QAMModulator.full_cls_name + '.process_bytes']['calls'] == 1
+    assert DDC.full_cls_name + '.process_block' in profiler.report()
+
+
+@pytest.mark.quick
+def test_profiling_disabled():
+    assert not profiling.enabled()
+    for method in profiling.ENTRY_POINTS:
+        for unit in (OFDM, DDC, QAMModulator):
+            assert not getattr(getattr(unit, method, None), '__profiled__',
+                               False)
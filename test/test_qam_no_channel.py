@@ -3,6 +3,7 @@ import logging
 import numpy as np
 
 from simulation.params import SimParams
+from simulation.context import SimContext
 from simulation.datastore import DataStore
 from simulation.datastore import DataStoreConfig
 
@@ -18,22 +19,172 @@ Nsymb = 1000  # QAM symbols to simulate
 def test_qam_modulation_demodulation(order):
     logging.basicConfig(level=logging.DEBUG)
 
-    SimParams(
-        fc=10e3,  # no need, but has to configure
-        fs=100e3,
+    context = SimContext(
+        params=SimParams(
+            fc=10e3,  # no need, but has to configure
+            fs=100e3,
+        ),
+        datastore=DataStore(config=DataStoreConfig(
+            path='out/dumps',
+            names=[]
+        )),
     )
 
-    DataStore(config=DataStoreConfig(
-        path='out/dumps',
-        names=[]
-    ))
-
-    constellation = QAMConstellation(order=order)
-    modulator = QAMModulator(constellation=constellation)
-    demodulator = QAMSoftDemodulator(constellation=constellation)
+    with context:
+        constellation = QAMConstellation(order=order)
+        modulator = QAMModulator(constellation=constellation)
+        demodulator = QAMSoftDemodulator(constellation=constellation)
 
     bitstream = np.random.randint(0, 2, Nsymb * constellation.pow)
     symbols = modulator.process(bitstream)
     bitstream_hat = demodulator.process(symbols)
 
     assert np.all(bitstream == bitstream_hat)  # no noise no error
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("order, mapping, shape", (
+    (2, 'natural', 'rectangular'),
+    (4, 'natural', 'rectangular'),
+    (8, 'natural', 'rectangular'),
+    (16, 'natural', 'rectangular'),
+    (64, 'natural', 'rectangular'),
+    (64, 'gray', 'rectangular'),
+    (256, 'gray', 'rectangular'),
+    (32, 'gray', 'cross'),
+    (128, 'gray', 'cross'),
+))
+def test_qam_llr(order, mapping, shape):
+    Nsc = 8
+
+    with SimContext(params=SimParams(fc=10e3, fs=100e3)):
+        constellation = QAMConstellation(order=order, mapping=mapping,
+                                         shape=shape)
+        modulator = QAMModulator(constellation=constellation)
+        demodulator = QAMSoftDemodulator(constellation=constellation,
+                                         soft=True, chunk_size=100)
+
+    nbits = constellation.pow
+    bitstream = np.random.randint(0, 2, Nsymb * nbits)
+    noise_var = np.linspace(0.01, 0.1, Nsc) / order
+    symbols = modulator.process(bitstream) + \
+        np.sqrt(np.tile(noise_var, Nsymb // Nsc) / 2) * \
+        (np.random.randn(Nsymb) + 1j * np.random.randn(Nsymb))
+
+    llrs = demodulator.process(symbols, noise_var=noise_var)
+    assert llrs.dtype == np.float32
+    assert llrs.shape == bitstream.shape
+
+    # distances to all the constellation points
+    points, values = map(np.array, zip(*constellation.mapping))
+    dist = np.abs(symbols[:, None] - points[None, :]) ** 2
+    bits = (values[None, :] >> np.arange(nbits)[:, None]) & 1
+    expected = np.stack([
+        np.min(np.where(bits[b] == 1, dist, np.inf), axis=1) -
+        np.min(np.where(bits[b] == 0, dist, np.inf), axis=1)
+        for b in range(nbits)], axis=1)
+    expected /= np.tile(noise_var, Nsymb // Nsc)[:, None]
+
+    assert np.allclose(llrs, expected.flatten(), rtol=1e-3, atol=1e-2)
+
+    demodulator.soft = False
+    assert np.all((llrs < 0) == demodulator.process(symbols))
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("order, shape, sigma", (
+    (16, 'rectangular', 0.2), (64, 'rectangular', 0.1),
+    (32, 'cross', 0.1), (32, 'cross', 0.3),
+    (128, 'cross', 0.05), (512, 'cross', 0.03)))
+def test_qam_decisions_nearest(order, shape, sigma):
+    # hard decisions are the maximum likelihood ones, the nearest points,
+    # also next to the cross corners and outside of the grid
+    rng = np.random.default_rng(0)
+    with SimContext(params=SimParams(fc=10e3, fs=100e3)):
+        constellation = QAMConstellation(order=order, mapping='gray',
+                                         shape=shape)
+        modulator = QAMModulator(constellation=constellation)
+        demodulator = QAMSoftDemodulator(constellation=constellation)
+
+    nsymb = 20000
+    bitstream = rng.integers(0, 2, nsymb * constellation.pow)
+    symbols = modulator.process(bitstream) + sigma / np.sqrt(2) * \
+        (rng.standard_normal(nsymb) + 1j * rng.standard_normal(nsymb))
+    nearest = np.argmin(np.abs(symbols[:, None] -
+                               constellation.points[None, :]), axis=1)
+    bits = (nearest[:, None] >> np.arange(constellation.pow)) & 1
+
+    assert np.array_equal(demodulator.process(symbols), bits.flatten())
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("order", (2, 4, 8, 16, 32, 64, 128, 256, 512, 1024,
+                                   2048, 4096))
+@pytest.mark.parametrize("nbytes", (0, 1, 7, 100))
+def test_qam_bytes(order, nbytes):
+    with SimContext(params=SimParams(fc=10e3, fs=100e3)):
+        constellation = QAMConstellation(order=order)
+        modulator = QAMModulator(constellation=constellation)
+        demodulator = QAMSoftDemodulator(constellation=constellation)
+
+    payload = np.random.bytes(nbytes)
+    symbols = modulator.process_bytes(payload)
+    assert len(symbols) == -(-8 * nbytes // constellation.pow)
+
+    # the same bit order as the bit-per-element API
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8),
+                         bitorder='little')
+    bits = np.pad(bits, (0, len(symbols) * constellation.pow - len(bits)))
+    assert np.all(symbols == modulator.process(bits))
+
+    payload_hat = demodulator.process_bytes(symbols)
+    assert payload_hat.dtype == np.uint8
+    # over 8 bits per symbol, the padding may make a zero byte
+    padding = len(payload_hat) - nbytes
+    assert padding == 0 or constellation.pow > 8 and padding == 1
+    assert payload_hat.tobytes() == payload + bytes(padding)
+    assert demodulator.process_bytes(symbols, nbytes).tobytes() == payload
+
+    buffer = memoryview(bytearray(payload))
+    assert np.all(modulator.process_bytes(buffer) == symbols)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("order, shape", ((64, 'rectangular'),
+                                          (1024, 'rectangular'),
+                                          (4096, 'rectangular'),
+                                          (32, 'cross'), (128, 'cross')))
+def test_qam_gray(order, shape):
+    with SimContext(params=SimParams(fc=10e3, fs=100e3)):
+        constellation = QAMConstellation(order=order, mapping='gray',
+                                         shape=shape)
+        modulator = QAMModulator(constellation=constellation)
+        demodulator = QAMSoftDemodulator(constellation=constellation)
+
+    assert QAMConstellation(order, 'gray', shape).points is \
+        constellation.points  # memoized
+    assert sorted(v for _, v in constellation.mapping) == list(range(order))
+
+    # neighbours differ in a single bit, everywhere for rectangular grids
+    values = constellation.values
+    flips = [bin(a ^ b).count('1')
+             for grid in (values, values.T) for row in grid
+             for a, b in zip(row[:-1], row[1:]) if a >= 0 and b >= 0]
+    if shape == 'rectangular':
+        assert set(flips) == {1}
+    else:
+        assert np.mean(np.array(flips) == 1) > 0.8
+
+    # decisions are the nearest points
+    step = 2 / (constellation.symbols.shape[1] - 1)
+    bitstream = np.random.randint(0, 2, Nsymb * constellation.pow)
+    symbols = modulator.process(bitstream) + 0.4 * step * \
+        (np.random.rand(Nsymb) - 0.5 + 1j * (np.random.rand(Nsymb) - 0.5))
+    nearest = np.argmin(np.abs(symbols[:, None] -
+                               constellation.points[None, :]), axis=1)
+    bits = np.unpackbits(nearest.astype('<u2').view(np.uint8)
+                         .reshape((-1, 2)), axis=1,
+                         bitorder='little')[:, :constellation.pow].flatten()
+
+    assert np.all(demodulator.process(symbols) == bits)
+    assert np.all(bits == bitstream)
@@ -0,0 +1,168 @@
+import pytest
+import numpy as np
+
+from scipy.signal import resample
+from scipy.signal import resample_poly
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.common.resampling.fft import FftUpsampler
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=48e3)) as context:
+        yield context
+
+
+def random_signal(rng, shape, complex_):
+    signal = rng.standard_normal(shape)
+    return signal + 1j * rng.standard_normal(shape) if complex_ else signal
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("complex_", (False, True))
+@pytest.mark.parametrize("length", (64, 1000, 1024))
+def test_fft_upsampler_fast_lengths(context, complex_, length):
+    # fast FFT lengths are not padded: the periodic interpolation, the
+    # Nyquist bin is split between both sides
+    rng = np.random.default_rng(0)
+    signal = random_signal(rng, length, complex_)
+    output = FftUpsampler(scale=4).process(signal)
+
+    assert np.iscomplexobj(output) == complex_
+    assert np.allclose(output, resample(signal, 4 * length))
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("complex_", (False, True))
+@pytest.mark.parametrize("length", (1, 63, 97, 1001, 1009, 4801))
+def test_fft_upsampler_any_length(context, complex_, length):
+    rng = np.random.default_rng(1)
+    signal = random_signal(rng, length, complex_)
+    output = FftUpsampler(scale=3).process(signal)
+
+    assert output.shape == (3 * length, )
+    assert np.allclose(output[::3], signal)
+    # the same periodic interpolation as at fast lengths
+    assert np.allclose(output, resample(signal, 3 * length))
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("scale", (1, 2, 3))
+def test_fft_upsampler_mixed_calls(context, scale):
+    # real and complex inputs, or two lengths, may take spectra of the
+    # same shape, a call does not see the bins of the previous one
+    rng = np.random.default_rng(2)
+    upsampler = FftUpsampler(scale=scale)
+    for length, complex_ in ((2, True), (3, False), (500, True), (999, False),
+                             (4, False), (5, False), (999, True), (1000, False)):
+        signal = random_signal(rng, length, complex_)
+        assert np.allclose(upsampler.process(signal),
+                           resample(signal, scale * length))
+
+
+@pytest.mark.quick
+def test_fft_upsampler_nyquist(context):
+    signal = np.cos(np.pi * np.arange(64))
+    output = FftUpsampler(scale=4).process(signal)
+    assert np.allclose(output, np.cos(np.pi * np.arange(256) / 4))
+
+    output = FftUpsampler(scale=4).process(signal.astype(np.complex128))
+    assert np.allclose(output, np.cos(np.pi * np.arange(256) / 4))
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("complex_", (False, True))
+def test_fft_upsampler_axis(context, complex_):
+    rng = np.random.default_rng(2)
+    frames = random_signal(rng, (3, 5, 100), complex_)
+
+    upsampler = FftUpsampler(scale=4, axis=1)
+    output = upsampler.process(frames)
+    assert output.shape == (3, 20, 100)
+
+    single = FftUpsampler(scale=4)
+    for i in range(3):
+        for j in range(100):
+            assert np.allclose(output[i, :, j], single.process(frames[i, :, j]))
+
+    # a repeated shape reuses the spectrum buffer
+    assert np.allclose(upsampler.process(frames), output)
+
+
+@pytest.mark.quick
+def test_fft_upsampler_streaming_axis(context):
+    # two band limited channels in columns
+    t = np.arange(3000)[:, None]
+    signal = np.cos(2 * np.pi * 0.01 * t * np.array([[1, 2]]))
+    upsampler = FftUpsampler(scale=4, margin=256, axis=0)
+
+    blocks = [upsampler.process_block(signal[start:start + 700])
+              for start in range(0, len(signal), 700)]
+    blocks.append(upsampler.flush())
+    output = np.concatenate(blocks, axis=0)
+
+    t = np.arange(4 * 3000)[:, None] / 4
+    expected = np.cos(2 * np.pi * 0.01 * t * np.array([[1, 2]]))
+    assert output.shape == expected.shape
+    interior = slice(4 * 300, -4 * 300)  # ends see zero input
+    assert np.max(np.abs(output - expected)[interior]) < 1e-2
+
+
+RATES = ((1, 2), (2, 1), (3, 7), (48000, 1000), (1000, 48000), (48000, 44100))
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("fin, fout", RATES)
+@pytest.mark.parametrize("length", (1, 100, 5000))
+def test_poly_resampler(context, fin, fout, length):
+    resampler = PolyResampler(PolyResamplerConfig(fin=fin, fout=fout))
+    signal = np.random.default_rng(0).standard_normal(length)
+
+    expected = resample_poly(signal, resampler.up, resampler.down)
+    output = resampler.process(signal)
+    assert output.shape == expected.shape
+    assert np.allclose(output, expected)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("fin, fout", RATES)
+@pytest.mark.parametrize("block", (1, 7, 480, 4096))
+def test_poly_resampler_chunking(context, fin, fout, block):
+    # two channels along the first axis, any block size gives the same
+    # output, the integer ratios stream through a matmul and round apart
+    # from upfirdn in the last bits
+    rng = np.random.default_rng(1)
+    signal = rng.standard_normal((2000, 2)) + \
+        1j * rng.standard_normal((2000, 2))
+    resampler = PolyResampler(PolyResamplerConfig(fin=fin, fout=fout))
+    expected = resampler.process(signal)
+
+    for _ in range(2):  # reset by flush
+        blocks = [resampler.process_block(signal[start:start + block])
+                  for start in range(0, len(signal), block)]
+        tail = resampler.flush()
+        if tail is not None:
+            blocks.append(tail)
+        assert np.allclose(np.concatenate(blocks), expected, rtol=0,
+                           atol=1e-12)
+
+
+@pytest.mark.quick
+def test_poly_resampler_filter_cache(context):
+    first = PolyResampler(PolyResamplerConfig(fin=48000, fout=44100))
+    second = PolyResampler(PolyResamplerConfig(fin=48000, fout=44100))
+    assert first.taps is second.taps
+    assert not first.taps.flags.writeable
+
+    # a yaml list window
+    kaiser = PolyResampler(PolyResamplerConfig(fin=48000, fout=44100,
+                                             window=['kaiser', 8.0]))
+    assert kaiser.taps is not first.taps
+    signal = np.random.default_rng(2).standard_normal(1000)
+    assert np.allclose(kaiser.process(signal), resample_poly(
+        signal, 147, 160, window=('kaiser', 8.0)))
@@ -0,0 +1,34 @@
+import pytest
+
+from run_simulation import load_config
+from simulation.sweep import run_point
+
+# the complex baseband fills the band up to the Nyquist rate, the edge
+# subcarriers are in the transition of the DUC and DDC filters: QPSK only
+REAL_BASEBAND = {'baseband': 'real', 'fft_size': 3072,
+                 'subcarrier_offset': 224, 'guard_interval_length': 1344}
+LMMSE = {'estimator': {'mode': 'lmmse'}, 'equalizer': {'mode': 'mmse'}}
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("seed", (0, 1, 2))
+@pytest.mark.parametrize("scenario_cfg, ofdm_cfg", (
+    ({}, {}),  # the shipped defaults
+    ({}, {'pilot_pattern': 'block'}),
+    ({}, REAL_BASEBAND),
+    ({**LMMSE, 'constellation': {'order': 16}}, REAL_BASEBAND),
+    ({'constellation': {'order': 64}},
+     {**REAL_BASEBAND, 'pilot_pattern': 'scattered'}),
+))
+def test_audio_ofdm_noise_free(tmp_path, seed, scenario_cfg, ofdm_cfg):
+    # the whole chain over a random capture delay decodes without errors
+    config = load_config('configs/ofdm.yaml')
+    config['DataStore'] = {'path': str(tmp_path), 'names': []}
+    config['seed'] = seed
+    config['scenario'].update(scenario_cfg)
+    config['OFDMconfig'].update(ofdm_cfg)
+
+    outcome = run_point('scenario.audio_ofdm', config)
+    assert outcome['error'] is None
+    assert outcome['result']['bits'] > 0
+    assert outcome['result']['ber'] == 0.0
@@ -0,0 +1,129 @@
+import pytest
+import numpy as np
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from channel.channel_base import ChannelBase
+
+from dsp.common.qam import QAMConstellation
+from dsp.common.resampling.fft import FftUpsampler
+from dsp.common.resampling.poly import PolyResampler
+from dsp.common.resampling.poly import PolyResamplerConfig
+
+from dsp.tx.qam import QAMModulator
+from dsp.tx.ofdm import OFDM, OFDMconfig
+
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.chain import OFDMRxChain
+
+Nsamples = 5000
+
+
+class MultipathChannel(ChannelBase):
+    def __init__(self, ir) -> None:
+        self.ir = ir
+        super().__init__()
+
+    def _pass_loss(self):
+        return 0.5
+
+    def _impulse_responce(self):
+        return self.ir
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=48e3)) as context:
+        yield context
+
+
+def random_blocks(signal, seed=0):
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(rng.integers(0, len(signal), 20))
+    return np.split(signal, bounds)  # includes empty blocks
+
+
+def stream(unit, signal, seed=0):
+    unit.reset()
+    outputs = [unit.process_block(block)
+               for block in random_blocks(signal, seed)]
+    tail = unit.flush()
+    if tail is not None:
+        outputs.append(tail)
+    return np.concatenate(outputs)
+
+
+def ofdm_config():
+    return OFDMconfig(
+        Nsc=64,
+        guard_interval_length=16,
+        guard_interval_type='cyclic_prefix',
+    )
+
+
+@pytest.mark.quick
+def test_channel_streaming(context):
+    channel = MultipathChannel(ir=np.array([1, 0.5j, -0.25, 0.1]))
+    signal = np.random.randn(Nsamples) + 1j * np.random.randn(Nsamples)
+
+    assert np.allclose(stream(channel, signal), channel.process(signal))
+
+
+@pytest.mark.quick
+def test_qam_modulator_streaming(context):
+    modulator = QAMModulator(constellation=QAMConstellation(order=16))
+    bits = np.random.randint(0, 2, 4 * Nsamples)
+
+    assert np.all(stream(modulator, bits) == modulator.process(bits))
+
+
+@pytest.mark.quick
+def test_ofdm_streaming(context):
+    ofdm_modulator = OFDM(config=ofdm_config())
+    ofdm_rx_chain = OFDMRxChain(
+        frontend=OFDMfrontend(config=ofdm_config()),
+        estimator=OFDMChannleEstimator(),
+        equalizer=OFDMChannleEqualizer(),
+    )
+    symbols = np.exp(2j * np.pi * np.random.rand(64 * 100))
+
+    ofdm_signal = stream(ofdm_modulator, symbols)
+    assert np.allclose(ofdm_signal, ofdm_modulator.process(symbols))
+
+    rx_symbols = stream(ofdm_rx_chain, ofdm_signal, seed=1)
+    assert np.allclose(rx_symbols, symbols)
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("fin, fout", ((48000, 1000), (1000, 48000),
+                                       (44100, 48000), (3, 2)))
+def test_poly_resampler_streaming(context, fin, fout):
+    resampler = PolyResampler(PolyResamplerConfig(fin=fin, fout=fout))
+    signal = np.random.randn(Nsamples) + 1j * np.random.randn(Nsamples)
+
+    expected = resampler.process(signal)
+    for seed in range(3):
+        output = stream(resampler, signal, seed)
+        assert output.shape == expected.shape
+        assert np.allclose(output, expected)
+
+
+@pytest.mark.quick
+def test_fft_upsampler_streaming(context):
+    scale = 4
+    upsampler = FftUpsampler(scale=scale, margin=256)
+
+    # band limited well below the Nyquist frequency
+    t = np.arange(Nsamples)
+    signal = np.cos(2 * np.pi * 0.01 * t) + 0.5 * np.sin(2 * np.pi * 0.03 * t)
+
+    output = stream(upsampler, signal)
+    expected = np.cos(2 * np.pi * 0.01 * np.arange(Nsamples * scale) / scale) + \
+        0.5 * np.sin(2 * np.pi * 0.03 * np.arange(Nsamples * scale) / scale)
+
+    assert output.shape == expected.shape
+    interior = slice(scale * 300, -scale * 300)  # ends see zero input
+    assert np.max(np.abs(output - expected)[interior]) < 1e-2
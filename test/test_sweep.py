@@ -0,0 +1,27 @@
+import pytest
+
+from simulation.sweep import parse_value
+from simulation.sweep import parse_values
+from simulation.sweep import build_axes
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("text, value", (
+    ('4e3', 4000.0), ('1e-3', 0.001), ('-2.5E+2', -250.0), ('.5e1', 5.0),
+    ('4000', 4000), ('4.0e3', 4000.0), ('1.5', 1.5), ('lmmse', 'lmmse'),
+    ("'4e3'", '4e3'), ('e3', 'e3'), ('[1, 2]', [1, 2])))
+def test_parse_value(text, value):
+    parsed = parse_value(text)
+    assert parsed == value and type(parsed) is type(value)
+
+
+@pytest.mark.quick
+def test_build_axes_scientific():
+    config = {'SimParams': {'fs': 1000}, 'sweep': {'scenario.snr_db': ['1e1']}}
+    axes = build_axes(config, [('SimParams.fc', '4e3'),
+                               ('scenario.max_delay', '1e2,2e2')])
+
+    assert config['SimParams'] == {'fs': 1000, 'fc': 4000.0}
+    assert axes == {'scenario.snr_db': [10.0],
+                    'scenario.max_delay': [100.0, 200.0]}
+    assert parse_values('1e3,2') == [1000.0, 2]
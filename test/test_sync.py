@@ -0,0 +1,171 @@
+import time
+import pytest
+import numpy as np
+
+from scipy.signal import lfilter
+
+from simulation.params import SimParams
+from simulation.context import SimContext
+
+from dsp.tx.ofdm import OFDM, OFDMconfig
+from dsp.tx.preamble import SchmidlCoxPreamble
+from dsp.common.pilots import data_per_frame
+from dsp.rx.sync import SchmidlCoxSync
+from dsp.rx.sync import SchmidlCoxSyncConfig
+from dsp.rx.ofdm.frontend import OFDMfrontend
+from dsp.rx.ofdm.equalizer import OFDMChannleEqualizer
+from dsp.rx.ofdm.estimator import OFDMChannleEstimator
+from dsp.rx.ofdm.chain import OFDMRxChain
+
+CONFIG = OFDMconfig(Nsc=64, guard_interval_length=16,
+                    guard_interval_type='cyclic_prefix')
+
+
+@pytest.fixture
+def context():
+    with SimContext(params=SimParams(fc=10e3, fs=48e3)) as context:
+        yield context
+
+
+def capture(rng, ofdm_signal, delay, cfo, snr_db, ir=np.ones(1)):
+    preamble = SchmidlCoxPreamble(config=CONFIG)
+    signal = np.concatenate((np.zeros(delay), preamble.process(ofdm_signal),
+                             np.zeros(500)))
+    signal = lfilter(ir, 1, signal) * \
+        np.exp(2j * np.pi * cfo * np.arange(len(signal)))
+
+    power = np.mean(np.abs(ofdm_signal) ** 2)
+    noise = rng.standard_normal(len(signal)) + \
+        1j * rng.standard_normal(len(signal))
+    return signal + np.sqrt(power / 2 * 10 ** (-snr_db / 10)) * noise
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("cfo", (0.0, 0.3 / 64, -0.9 / 64))
+def test_schmidl_cox_sync(context, cfo):
+    rng = np.random.default_rng(0)
+    ofdm_signal = OFDM(config=CONFIG).process(
+        np.exp(2j * np.pi * rng.integers(0, 4, 64 * 20) / 4))
+    sync = SchmidlCoxSync(ofdm_config=CONFIG)
+
+    for delay in rng.integers(0, 3000, 5):
+        rx = capture(rng, ofdm_signal, delay, cfo, snr_db=15)
+        synced = sync.process(rx)
+
+        # early starts only eat into the cyclic prefix
+        assert sync.detected
+        assert delay + 64 + 8 <= sync.offset <= delay + 64 + 16
+        assert sync.cfo == pytest.approx(cfo, abs=0.05 / 64)
+        assert len(synced) == len(rx) - sync.offset
+
+        # the CFO is removed up to a constant phase, the residual one turns
+        # the phase slowly
+        shift = delay + 64 + 16 - sync.offset
+        aligned = synced[shift:shift + 5 * 80]
+        similarity = np.abs(np.vdot(aligned, ofdm_signal[:5 * 80])) / \
+            np.linalg.norm(aligned) / np.linalg.norm(ofdm_signal[:5 * 80])
+        assert similarity > 0.95
+
+
+@pytest.mark.quick
+def test_schmidl_cox_multipath(context):
+    rng = np.random.default_rng(1)
+    ofdm_signal = OFDM(config=CONFIG).process(
+        np.exp(2j * np.pi * rng.random(64 * 20)))
+    sync = SchmidlCoxSync(ofdm_config=CONFIG)
+
+    rx = capture(rng, ofdm_signal, 1234, 0.0, snr_db=20,
+                 ir=np.array([1, 0, 0.5, 0, 0.2]))
+    sync.process(rx)
+
+    assert sync.detected
+    assert 1234 + 64 + 8 <= sync.offset <= 1234 + 64 + 16 + 2
+
+
+@pytest.mark.quick
+@pytest.mark.parametrize("gi", (16, 28))
+@pytest.mark.parametrize("snr_db", (None, 20))
+def test_schmidl_cox_frontend(context, gi, snr_db):
+    # the FFT windows of the synchronized data symbols stay inside the
+    # cyclic prefix, the comb pilots take the early start out
+    config = OFDMconfig(Nsc=64, guard_interval_length=gi,
+                        guard_interval_type='cyclic_prefix',
+                        pilot_pattern='comb')
+    rng = np.random.default_rng(4)
+    sync = SchmidlCoxSync(ofdm_config=config)
+    chain = OFDMRxChain(frontend=OFDMfrontend(config=config),
+                        estimator=OFDMChannleEstimator(ofdm_config=config),
+                        equalizer=OFDMChannleEqualizer())
+
+    for delay in rng.integers(0, 1000, 10):
+        symbols = np.exp(2j * np.pi * (
+            rng.integers(0, 4, 10 * data_per_frame(config)) + 0.5) / 4)
+        ofdm_signal = OFDM(config=config).process(symbols)
+        signal = np.concatenate((
+            np.zeros(delay), SchmidlCoxPreamble(config=config).process(
+                ofdm_signal), np.zeros(200)))
+        if snr_db is not None:
+            power = np.mean(np.abs(ofdm_signal) ** 2)
+            signal = signal + np.sqrt(power / 2 * 10 ** (-snr_db / 10)) * (
+                rng.standard_normal(len(signal)) +
+                1j * rng.standard_normal(len(signal)))
+
+        synced = sync.process(signal)[:len(ofdm_signal)]
+        assert delay + 64 <= sync.offset <= delay + 64 + gi
+        rx_symbols = chain.process(synced)[:len(symbols)]
+
+        decided = np.round(np.angle(rx_symbols) / (np.pi / 2) - 0.5) % 4
+        sent = np.round(np.angle(symbols) / (np.pi / 2) - 0.5) % 4
+        assert np.array_equal(decided, sent)
+
+
+@pytest.mark.quick
+def test_schmidl_cox_real_baseband(context):
+    # a real passband training symbol at the audio rate
+    config = OFDMconfig(Nsc=64, guard_interval_length=1344,
+                        guard_interval_type='cyclic_prefix', baseband='real',
+                        fft_size=3072, subcarrier_offset=224)
+    rng = np.random.default_rng(2)
+    ofdm_signal = OFDM(config=config).process(
+        np.exp(2j * np.pi * rng.random(64 * 4)))
+    signal = np.concatenate((np.zeros(1000),
+                             SchmidlCoxPreamble(config=config).process(
+                                 ofdm_signal), np.zeros(500)))
+    rx = signal + 0.1 * np.std(ofdm_signal) * \
+        rng.standard_normal(len(signal))
+
+    sync = SchmidlCoxSync(ofdm_config=config,
+                          config=SchmidlCoxSyncConfig(backoff=64))
+    synced = sync.process(rx)
+
+    assert sync.detected and sync.cfo == 0.0
+    assert np.isrealobj(synced)
+    # within the cyclic prefix of the first data symbol
+    assert 1000 + 4416 - 1344 <= sync.offset <= 1000 + 4416
+
+
+@pytest.mark.quick
+def test_schmidl_cox_no_preamble(context):
+    rng = np.random.default_rng(2)
+    sync = SchmidlCoxSync(ofdm_config=CONFIG)
+    noise = rng.standard_normal(5000) + 1j * rng.standard_normal(5000)
+
+    assert sync.process(noise) is noise
+    assert not sync.detected
+
+
+@pytest.mark.quick
+def test_schmidl_cox_linear_time(context):
+    # 10 s of a 48 kHz capture
+    rng = np.random.default_rng(3)
+    ofdm_signal = OFDM(config=CONFIG).process(
+        np.exp(2j * np.pi * rng.random(64 * 100)))
+    rx = capture(rng, ofdm_signal, 470000, 0.0, snr_db=20)
+    sync = SchmidlCoxSync(ofdm_config=CONFIG)
+
+    start = time.perf_counter()
+    sync.process(rx)
+    elapsed = time.perf_counter() - start
+
+    assert 470000 + 64 + 8 <= sync.offset <= 470000 + 64 + 16
+    assert elapsed < 0.5
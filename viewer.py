@@ -1,3 +1,4 @@
+import os
 import argparse
 import pickle as pkl
 from functools import partial
@@ -7,6 +8,8 @@ import matplotlib.pyplot as plt
 
 import multiprocessing
 
+from simulation.datastore import load_dump
+
 
 def action_plot(name, data):
     fig, axs = plt.subplots(2, 1)
@@ -53,7 +56,8 @@ action_dict = {
 
 parser = argparse.ArgumentParser(description='viewer for datastore artifats')
 
-parser.add_argument('filename', type=str, help='pkl file with stored data')
+parser.add_argument('filename', type=str,
+                    help='pkl file or disk backend directory with stored data')
 parser.add_argument('--list', action='store_true',
                     default=False, help='list all entries')
 parser.add_argument('-f', '--filter', type=str, nargs='+',
@@ -65,8 +69,11 @@ parser.add_argument('-a', '--action', type=str, nargs='+', default=['plot', 'pri
 if __name__ == '__main__':
     args = parser.parse_args()
 
-    with open(args.filename, 'rb') as fd:
-        dumps = pkl.load(fd, fix_imports=True, errors='strict', buffers=None)
+    if os.path.isdir(args.filename):
+        dumps = load_dump(args.filename)  # segments are mapped on access
+    else:
+        with open(args.filename, 'rb') as fd:
+            dumps = pkl.load(fd, fix_imports=True, errors='strict', buffers=None)
 
     if args.list:
         for name in dumps.keys():